@@ -0,0 +1,120 @@
+import heapq
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+# Put each new album in the account with the most space remaining, which
+# spreads the albums out across the accounts
+WORST_FIT = "worst_fit"
+
+# Put each new album in the account with the least space remaining that still
+# fits it, which keeps the most space free in other accounts for big albums
+BEST_FIT = "best_fit"
+
+
+@dataclass
+class AlbumPlacement:
+    # The index of the account of each new album, or None if no account has
+    # space for it
+    album_title_to_client_idx: dict[str, int | None]
+
+    # The space remaining in each account after the albums are added to them
+    space_remaining: list[int]
+
+
+def place_new_albums(
+    space_remaining: list[int],
+    album_title_to_space_needed: dict[str, int],
+    policy: str = WORST_FIT,
+) -> AlbumPlacement:
+    """
+    Picks the account of each new album, placing the biggest albums first so
+    that small albums fill in the space left over by them.
+
+    For N accounts, each WORST_FIT placement takes O(log N) time with a heap.
+    Each BEST_FIT placement finds the account in O(log N) time with a binary
+    search, but takes O(N) time to move it in the sorted list of accounts.
+
+    Parameters:
+        space_remaining (list[int]): the space remaining in each account.
+        album_title_to_space_needed (dict[str, int]): the space needed by
+          each new album.
+        policy (str): how to pick the account of each album, which is either
+          WORST_FIT or BEST_FIT.
+
+    Returns:
+        AlbumPlacement: the account of each new album, and the space that
+          remains in each account.
+
+    Raises:
+        ValueError: if the policy is unknown.
+    """
+    pick_client: _WorstFitPicker | _BestFitPicker
+    if policy == WORST_FIT:
+        pick_client = _WorstFitPicker(space_remaining)
+    elif policy == BEST_FIT:
+        pick_client = _BestFitPicker(space_remaining)
+    else:
+        raise ValueError(f"Unknown album placement policy {policy}")
+
+    # Sorting is stable, so albums of the same size keep their order
+    album_titles = sorted(
+        album_title_to_space_needed,
+        key=lambda album_title: album_title_to_space_needed[album_title],
+        reverse=True,
+    )
+
+    new_space_remaining = list(space_remaining)
+    album_title_to_client_idx: dict[str, int | None] = {}
+    for album_title in album_titles:
+        space_needed = album_title_to_space_needed[album_title]
+        client_idx = pick_client(space_needed)
+        album_title_to_client_idx[album_title] = client_idx
+
+        if client_idx is not None:
+            new_space_remaining[client_idx] -= space_needed
+
+    return AlbumPlacement(album_title_to_client_idx, new_space_remaining)
+
+
+class _WorstFitPicker:
+    def __init__(self, space_remaining: list[int]):
+        # A max heap of the space remaining, with the first account winning ties
+        self._heap = [
+            (-space, client_idx) for client_idx, space in enumerate(space_remaining)
+        ]
+        heapq.heapify(self._heap)
+
+    def __call__(self, space_needed: int) -> int | None:
+        if len(self._heap) == 0:
+            return None
+
+        negated_space, client_idx = self._heap[0]
+        if not _fits(-negated_space, space_needed):
+            return None
+
+        heapq.heapreplace(self._heap, (negated_space + space_needed, client_idx))
+        return client_idx
+
+
+class _BestFitPicker:
+    def __init__(self, space_remaining: list[int]):
+        # The accounts sorted by space remaining, with the first account
+        # winning ties. There are only a few accounts, so moving an account
+        # in the list is cheap
+        self._accounts = sorted(
+            (space, client_idx) for client_idx, space in enumerate(space_remaining)
+        )
+
+    def __call__(self, space_needed: int) -> int | None:
+        # An account with no space left cannot take even an empty album
+        i = bisect_left(self._accounts, (max(space_needed, 1), -1))
+        if i == len(self._accounts):
+            return None
+
+        space, client_idx = self._accounts.pop(i)
+        insort(self._accounts, (space - space_needed, client_idx))
+        return client_idx
+
+
+def _fits(space_remaining: int, space_needed: int) -> bool:
+    return space_remaining > 0 and space_needed <= space_remaining
@@ -1,5 +1,9 @@
 import logging
-from dataclasses import dataclass
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from collections import Counter
+from dataclasses import dataclass, field
 from event_bus import EventBus
 
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
@@ -7,13 +11,21 @@ from sharded_google_photos.shared.gphotos_client import GPhotosClient
 from .group_diffs_with_metadata import group_diffs_with_metadata, GroupedDiffs
 from .shared_album_repository import SharedAlbumRepository
 from .media_item_repository import MediaItemRepository
+from .media_item_index import MediaItemIndex
+from .album_placement import place_new_albums, WORST_FIT
+from .storage_quota_tracker import StorageQuotaTracker
+from .records import Album
 from .gphotos_uploader import GPhotosUploader
+from .upload_token_cache import UploadTokenCache
 from . import gphotos_uploader_events
 from . import gphotos_backup_events as events
 from .add_new_metadata import add_new_metadata, Diff, DiffWithMetadata
 
 logger = logging.getLogger(__name__)
 
+# The maximum number of upload tokens that mediaItems:batchCreate accepts
+MAX_UPLOAD_TOKEN_LENGTH_PER_CALL = 50
+
 
 class NoAvailableSpaceInExistingAlbumException(Exception):
     """Exception raised when there is no space in an existing album"""
@@ -25,16 +37,53 @@ class NoAvailableSpaceInExistingAlbumException(Exception):
         self.album_title = album_title
 
 
+class NoAvailableSpaceForNewAlbumException(Exception):
+    """Exception raised when no account has space for a new album"""
+
+    def __init__(self, album_title: str):
+        super().__init__(f"Can't find space to create new album {album_title}")
+        self.album_title = album_title
+
+
 @dataclass
 class GPhotosBackupResults:
-    # A list of newly created albums
-    new_albums: list[object]
+    # A list of newly created albums, in the order of their first diff
+    new_albums: list[Album]
+
+    # The fraction of each account's storage that is used once the photos in
+    # the backup are added to it
+    fill_ratios: list[float] = field(default_factory=list)
+
+    # The number of photos uploaded by each upload method (ex: "raw", "resumable")
+    upload_method_counts: dict[str, int] = field(default_factory=dict)
 
 
 class GPhotosBackup:
-    def __init__(self, gphoto_clients: list[GPhotosClient], event_bus: EventBus = None):
+    def __init__(
+        self,
+        gphoto_clients: list[GPhotosClient],
+        event_bus: EventBus = None,
+        max_uploads_per_client: int = 1,
+        max_clients_in_parallel: int = 1,
+        max_albums_per_client: int = 1,
+        upload_token_cache: UploadTokenCache | None = None,
+        raw_upload_threshold_in_bytes: int = 0,
+        media_item_index: MediaItemIndex | None = None,
+        storage_quota_tracker: StorageQuotaTracker | None = None,
+        album_placement_policy: str = WORST_FIT,
+    ):
         self.gphoto_clients = gphoto_clients
         self.event_bus = event_bus if event_bus is not None else EventBus()
+        self.max_uploads_per_client = max_uploads_per_client
+        self.max_clients_in_parallel = max_clients_in_parallel
+        self.max_albums_per_client = max_albums_per_client
+        self.upload_token_cache = upload_token_cache
+        self.raw_upload_threshold_in_bytes = raw_upload_threshold_in_bytes
+        self.media_item_index = media_item_index
+        self.storage_quota_tracker = storage_quota_tracker
+        self.album_placement_policy = album_placement_policy
+
+        self.__lock = threading.Lock()
 
     def backup(self, diffs: list[Diff]) -> GPhotosBackupResults:
         """
@@ -43,13 +92,24 @@ class GPhotosBackup:
         It uploads photos to the same album if the album exists.
 
         If no album exists, it creates a new album in a Google Photos account
-        with the most amount of space available.
+        picked by album_placement_policy, which is the account with the most
+        amount of space available by default. New albums are placed from the
+        biggest to the smallest.
+
+        Albums in different Google Photos accounts are backed up at the same
+        time, with up to max_clients_in_parallel accounts and up to
+        max_albums_per_client albums per account at once. The albums of an
+        account share its max_uploads_per_client uploads.
 
         If no Google Photos account has availability to create a new album or
         there is no more space to upload a photo to an existing Google Photos
         album, it will throw a NoAvailableSpaceInExistingAlbumException
         exception.
 
+        If there is a storage quota tracker, the storage quotas that it has
+        cached are used, and they are fetched again before giving up on
+        finding space.
+
         Args:
             diffs (list[Diff]): A list of diffs.
 
@@ -58,6 +118,7 @@ class GPhotosBackup:
 
         Raises:
             NoAvailableSpaceInExistingAlbumException: if there is no space in an existing album.
+            NoAvailableSpaceForNewAlbumException: if there is no space for a new album.
         """
         # Insert new metadata in the diffs
         new_diffs = add_new_metadata(diffs)
@@ -68,17 +129,23 @@ class GPhotosBackup:
         logger.debug("Step 2: Split the diff")
 
         # Find all the albums in all accounts with an index to which account
-        shared_album_repository = SharedAlbumRepository(self.gphoto_clients)
+        shared_album_repository = SharedAlbumRepository(
+            self.gphoto_clients, self.max_clients_in_parallel
+        )
         shared_album_repository.setup()
         logger.debug("Step 3: Found existing shared albums")
 
-        assigned_albums = self.__get_album_assignment_for_chunked_diffs(
+        # Report the titles shared by many albums, since only one of them is used
+        duplicate_album_titles = shared_album_repository.get_duplicate_album_titles()
+        for album_title, albums in duplicate_album_titles.items():
+            self.event_bus.emit(events.FOUND_DUPLICATE_ALBUM_TITLE, album_title, albums)
+
+        assigned_albums, fill_ratios = self.__get_album_assignment_for_chunked_diffs(
             shared_album_repository, grouped_diffs
         )
-        logger.debug("Step 4: Assigned albums to diffs")
+        logger.debug(f"Step 4: Assigned albums to diffs, filling {fill_ratios}")
         for album_title in grouped_diffs:
             client_idx = assigned_albums[album_title]["client_idx"]
-            client = self.gphoto_clients[client_idx]
             logger.debug(f"{album_title} -> {client_idx}")
 
         # Emit the number of photos we need to upload
@@ -93,91 +160,253 @@ class GPhotosBackup:
         )
         self.event_bus.emit(events.STARTED_DELETING, num_photos_to_delete)
 
-        # Handle each folder one by one
-        for album_title in grouped_diffs:
-            album = assigned_albums[album_title]["album"]
-            client = self.gphoto_clients[assigned_albums[album_title]["client_idx"]]
+        # Handle the folders, running independent accounts at the same time
+        upload_method_counts: Counter[str] = Counter()
+        client_idx_to_upload_slots = [
+            threading.BoundedSemaphore(self.max_uploads_per_client)
+            for _ in self.gphoto_clients
+        ]
+        self.__run_for_each_album(
+            list(grouped_diffs),
+            {t: assigned_albums[t]["client_idx"] for t in grouped_diffs},
+            lambda album_title: self.__backup_album(
+                shared_album_repository,
+                album_title,
+                assigned_albums[album_title],
+                grouped_diffs[album_title],
+                upload_method_counts,
+                client_idx_to_upload_slots[assigned_albums[album_title]["client_idx"]],
+            ),
+        )
 
-            # Find the existing photos that are in that album
-            media_item_repository = MediaItemRepository(album["id"], client)
-            media_item_repository.setup()
-            logger.debug(f"Step 5: Find the existing photos in {album_title}")
+        self.event_bus.emit(events.FINISHED_UPLOADING)
+        self.event_bus.emit(events.FINISHED_DELETING)
 
-            # Remove the files to delete out of the album
-            media_ids_to_remove = []
-            media_item_paths_removed = []
-            for deletion_diff in grouped_diffs[album_title].get("-", []):
-                file_name = deletion_diff["file_name"]
+        return GPhotosBackupResults(
+            new_albums=[
+                assigned_albums[t]["album"]
+                for t in grouped_diffs
+                if assigned_albums[t]["is_new_album"]
+            ],
+            upload_method_counts=dict(upload_method_counts),
+            fill_ratios=fill_ratios,
+        )
 
-                if media_item_repository.contains_file_name(file_name):
-                    media_item = media_item_repository.get_media_item_from_file_name(
-                        file_name
-                    )
-                    media_ids_to_remove.append(media_item["id"])
-                    media_item_paths_removed.append(deletion_diff["abs_path"])
+    def __run_for_each_album(
+        self,
+        album_titles: list[str],
+        album_title_to_client_idx: dict[str, int],
+        fn: Callable[[str], None],
+    ):
+        """
+        Calls fn on each album title, running albums from up to
+        max_clients_in_parallel accounts at once with up to
+        max_albums_per_client albums per account.
 
-            media_item_repository.remove_media_items(media_ids_to_remove)
+        Albums are started in the order of album_titles whenever their
+        account has room, so with both limits at 1 they run one by one in order.
+        """
+        max_workers = self.max_clients_in_parallel * self.max_albums_per_client
+        pending_titles = list(album_titles)
+        num_running_per_client: dict[int, int] = {}
+        running_futures: dict[Future, str] = {}
+
+        def can_start(client_idx: int) -> bool:
+            num_running = num_running_per_client.get(client_idx, 0)
+            if num_running > 0:
+                return num_running < self.max_albums_per_client
+            return len(num_running_per_client) < self.max_clients_in_parallel
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while len(pending_titles) > 0 or len(running_futures) > 0:
+                    for album_title in list(pending_titles):
+                        client_idx = album_title_to_client_idx[album_title]
+                        if not can_start(client_idx):
+                            continue
+
+                        pending_titles.remove(album_title)
+                        num_running_per_client[client_idx] = (
+                            num_running_per_client.get(client_idx, 0) + 1
+                        )
+                        future = executor.submit(fn, album_title)
+                        running_futures[future] = album_title
+
+                    done, _ = wait(running_futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        client_idx = album_title_to_client_idx[
+                            running_futures.pop(future)
+                        ]
+                        num_running_per_client[client_idx] -= 1
+                        if num_running_per_client[client_idx] == 0:
+                            del num_running_per_client[client_idx]
+
+                        future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    def __backup_album(
+        self,
+        shared_album_repository: SharedAlbumRepository,
+        album_title: str,
+        assigned_album: dict,
+        album_diffs: dict[str, list[DiffWithMetadata]],
+        upload_method_counts: Counter[str],
+        upload_slots: threading.Semaphore,
+    ):
+        album = assigned_album["album"]
+        client = self.gphoto_clients[assigned_album["client_idx"]]
 
-            # Emit the photos we deleted
-            for removed_media_item_path in media_item_paths_removed:
-                self.event_bus.emit(events.DELETED_PHOTO, removed_media_item_path)
+        # Find the existing photos that are in that album
+        media_item_repository = MediaItemRepository(
+            album.id, client, self.media_item_index
+        )
+        # Only list the album's photos if there are photos to delete from it or
+        # it might be empty, since uploads alone do not need to look them up
+        media_item_repository.setup_lazily(album.media_items_count)
+        logger.debug(f"Step 5: Find the existing photos in {album_title}")
+
+        # Remove the files to delete out of the album
+        media_ids_to_remove = []
+        media_item_paths_removed = []
+        for deletion_diff in album_diffs.get("-", []):
+            file_name = deletion_diff["file_name"]
+
+            if media_item_repository.contains_file_name(file_name):
+                media_item = media_item_repository.get_media_item_from_file_name(
+                    file_name
+                )
+                media_ids_to_remove.append(media_item.id)
+                media_item_paths_removed.append(deletion_diff["abs_path"])
 
-            logger.debug(
-                f"Step 6: Removing {len(media_ids_to_remove)} photos from {album_title}"
-            )
+        media_item_repository.remove_media_items(media_ids_to_remove)
 
-            # Upload the additional files
-            gphotos_uploader_event_bus = EventBus()
-            uploader = GPhotosUploader(client, gphotos_uploader_event_bus)
-            added_diffs = grouped_diffs[album_title].get("+", [])
+        # Emit the photos we deleted
+        for removed_media_item_path in media_item_paths_removed:
+            self.__emit(events.DELETED_PHOTO, removed_media_item_path)
 
-            @gphotos_uploader_event_bus.on(gphotos_uploader_events.UPLOADED_PHOTO)
-            def handle_uploaded_photo(photo_file_path: str):
-                self.event_bus.emit(events.UPLOADED_PHOTO, photo_file_path)
+        logger.debug(
+            f"Step 6: Removing {len(media_ids_to_remove)} photos from {album_title}"
+        )
 
-            upload_tokens = uploader.upload_photos(
-                file_paths=[a["abs_path"] for a in added_diffs],
-                file_names=[a["file_name"] for a in added_diffs],
-            )
+        # Upload the additional files
+        gphotos_uploader_event_bus = EventBus()
+        uploader = GPhotosUploader(
+            client,
+            gphotos_uploader_event_bus,
+            self.max_uploads_per_client,
+            self.upload_token_cache,
+            self.raw_upload_threshold_in_bytes,
+            upload_slots,
+        )
+        added_diffs = album_diffs.get("+", [])
+
+        @gphotos_uploader_event_bus.on(gphotos_uploader_events.UPLOADED_PHOTO)
+        def handle_uploaded_photo(photo_file_path: str):
+            self.__emit(events.UPLOADED_PHOTO, photo_file_path)
+
+        # Attach them to gphotos album in chunks of 50 as soon as each chunk
+        # is uploaded, while the rest of the files are still uploading
+        num_uploaded = 0
+        for added_diff_indices, upload_tokens in uploader.upload_photos_in_batches(
+            file_paths=[a["abs_path"] for a in added_diffs],
+            file_names=[a["file_name"] for a in added_diffs],
+            batch_size=MAX_UPLOAD_TOKEN_LENGTH_PER_CALL,
+        ):
+            media_item_repository.add_uploaded_photos(upload_tokens)
+            if self.upload_token_cache is not None:
+                self.upload_token_cache.remove_upload_tokens(upload_tokens)
+
+            if self.storage_quota_tracker is not None:
+                self.storage_quota_tracker.add_usage(
+                    client.name,
+                    sum(
+                        added_diffs[i]["file_size_in_bytes"] for i in added_diff_indices
+                    ),
+                )
+
+            num_uploaded += len(upload_tokens)
             logger.debug(
-                f"Step 7: Uploaded {len(upload_tokens)} photos to {album_title}"
+                f"Step 7: Uploaded and added {num_uploaded} / {len(added_diffs)} "
+                + f"photos to {album_title}"
             )
 
-            # Attach them to gphotos album in chunks of 50
-            self.__add_uploaded_photos_safely(media_item_repository, upload_tokens)
-            logger.debug(f"Step 8: Added uploaded photos to {album_title}")
+        logger.debug(f"Step 8: Added uploaded photos to {album_title}")
 
-            logger.debug("Step 9: Added hash to each image")
+        with self.__lock:
+            upload_method_counts.update(uploader.upload_method_counts)
 
-            # Rename the album if it's currently empty
-            if media_item_repository.get_num_media_items() == 0:
-                new_album_name = f"To delete/{album['title']}"
-                new_album = shared_album_repository.rename_album(
-                    album["id"], new_album_name
-                )
-                logger.debug(f"Step 10: Marked empty album {album_title} to be deleted")
+        logger.debug("Step 9: Added hash to each image")
 
-                self.gphoto_clients[new_album["client_idx"]].albums().unshare_album(
-                    new_album["id"]
+        # Rename the album if it's currently empty
+        if media_item_repository.get_num_media_items() == 0:
+            new_album_name = f"To delete/{album.title}"
+            with self.__lock:
+                new_album = shared_album_repository.rename_album(
+                    album.id, new_album_name
                 )
-                logger.debug(f"Step 11: Unshared empty album {album_title}")
+            logger.debug(f"Step 10: Marked empty album {album_title} to be deleted")
 
-        self.event_bus.emit(events.FINISHED_UPLOADING)
-        self.event_bus.emit(events.FINISHED_DELETING)
+            self.gphoto_clients[new_album.client_idx].albums().unshare_album(
+                new_album.id
+            )
+            logger.debug(f"Step 11: Unshared empty album {album_title}")
 
-        return GPhotosBackupResults(
-            new_albums=[
-                x["album"] for x in assigned_albums.values() if x["is_new_album"]
-            ]
-        )
+    def __emit(self, event: str, *args):
+        # Albums can be backed up from different threads, so emit one at a time
+        with self.__lock:
+            self.event_bus.emit(event, *args)
 
     def __get_album_assignment_for_chunked_diffs(
         self,
         shared_album_repository: SharedAlbumRepository,
         chunked_new_diffs: GroupedDiffs,
-    ):
+    ) -> tuple[dict[str, dict], list[float]]:
+        try:
+            results, fill_ratios = self.__assign_albums_to_clients(
+                shared_album_repository, chunked_new_diffs
+            )
+        except (
+            NoAvailableSpaceInExistingAlbumException,
+            NoAvailableSpaceForNewAlbumException,
+        ):
+            tracker = self.storage_quota_tracker
+            if tracker is None or not any(
+                tracker.is_cached(c.name) for c in self.gphoto_clients
+            ):
+                raise
+
+            # The cached quotas might have drifted from the real ones, like
+            # after photos were deleted, so check them before giving up
+            logger.debug("Fetching storage quotas again to find space")
+            for gphoto_client in self.gphoto_clients:
+                tracker.expire(gphoto_client.name)
+            results, fill_ratios = self.__assign_albums_to_clients(
+                shared_album_repository, chunked_new_diffs
+            )
+
+        # Create albums that are not created yet
+        for album_title in chunked_new_diffs:
+            if not results[album_title]["is_new_album"]:
+                continue
+
+            results[album_title]["album"] = shared_album_repository.create_shared_album(
+                results[album_title]["client_idx"], album_title
+            )
+
+        logger.debug("Created new albums")
+
+        return results, fill_ratios
+
+    def __assign_albums_to_clients(
+        self,
+        shared_album_repository: SharedAlbumRepository,
+        chunked_new_diffs: GroupedDiffs,
+    ) -> tuple[dict[str, dict], list[float]]:
         results = {}
-        space_remaining = [self.__get_remaining_storage(c) for c in self.gphoto_clients]
+        storage_quotas = [self.__get_storage_quota(c) for c in self.gphoto_clients]
+        space_remaining = [limit - usage for limit, usage in storage_quotas]
 
         logger.debug(f"Current space remaining: {space_remaining}")
 
@@ -191,11 +420,11 @@ class GPhotosBackup:
             )
 
             album = shared_album_repository.get_album_from_title(album_title)
-            client_idx = album["client_idx"]
+            client_idx = album.client_idx
 
             if space_remaining[client_idx] - space_needed <= 0:
                 raise NoAvailableSpaceInExistingAlbumException(
-                    client_idx, album["id"], album_title
+                    client_idx, album.id, album_title
                 )
 
             space_remaining[client_idx] -= space_needed
@@ -208,82 +437,44 @@ class GPhotosBackup:
         logger.debug("Assigned existing albums to clients")
 
         # Go through all the albums that do not exist yet
-        for album_title in chunked_new_diffs:
-            if shared_album_repository.contains_album_title(album_title):
-                continue
-
-            add_diffs = chunked_new_diffs[album_title].get("+", [])
-            space_needed = self.__get_new_storage_needed(add_diffs)
-
-            # Get the best client to allocate to
-            best_client_idx = self.__find_best_client_for_new_album(
-                space_remaining, space_needed
-            )
+        placement = place_new_albums(
+            space_remaining,
+            {
+                album_title: self.__get_new_storage_needed(
+                    chunked_new_diffs[album_title].get("+", [])
+                )
+                for album_title in chunked_new_diffs
+                if not shared_album_repository.contains_album_title(album_title)
+            },
+            self.album_placement_policy,
+        )
 
-            if best_client_idx is None:
-                raise Exception(f"Can't find space to create new album {album_title}")
+        for album_title, new_client_idx in placement.album_title_to_client_idx.items():
+            if new_client_idx is None:
+                raise NoAvailableSpaceForNewAlbumException(album_title)
 
-            client_idx = best_client_idx
-            space_remaining[client_idx] -= space_needed
             results[album_title] = {
                 "album": None,
-                "client_idx": client_idx,
+                "client_idx": new_client_idx,
                 "is_new_album": True,
             }
 
+        space_remaining = placement.space_remaining
         logger.debug("Assigned new albums to clients")
         logger.debug(f"New client spaces remaining: {space_remaining}")
 
-        # Create albums that are not created yet
-        for album_title in chunked_new_diffs:
-            if not results[album_title]["is_new_album"]:
-                continue
-
-            results[album_title]["album"] = shared_album_repository.create_shared_album(
-                results[album_title]["client_idx"], album_title
-            )
-
-        logger.debug("Created new albums")
-
-        return results
+        fill_ratios = [
+            (limit - space) / limit if limit > 0 else 1.0
+            for (limit, _), space in zip(storage_quotas, space_remaining)
+        ]
+        return results, fill_ratios
 
     def __get_new_storage_needed(self, diffs: list[DiffWithMetadata]) -> int:
         return sum([diff["file_size_in_bytes"] for diff in diffs])
 
-    def __get_remaining_storage(self, gphoto_client: GPhotosClient) -> int:
-        storage_quota = gphoto_client.get_storage_quota()
-        max_limit = int(storage_quota["limit"])
-        usage = int(storage_quota["usage"])
-        return max_limit - usage
-
-    def __find_best_client_for_new_album(
-        self, space_remaining: int, space_needed: int
-    ) -> int:
-        max_remaining_space = float("-inf")
-        best_client_idx = None
-
-        for client_idx in range(len(self.gphoto_clients)):
-            remaining_space = space_remaining[client_idx]
-
-            if space_needed > remaining_space:
-                continue
-
-            if remaining_space <= 0:
-                continue
-
-            if max_remaining_space < remaining_space:
-                max_remaining_space = remaining_space
-                best_client_idx = client_idx
-
-        return best_client_idx
+    def __get_storage_quota(self, gphoto_client: GPhotosClient) -> tuple[int, int]:
+        if self.storage_quota_tracker is not None:
+            return self.storage_quota_tracker.get_storage_quota(gphoto_client)
 
-    def __add_uploaded_photos_safely(
-        self, media_item_repository: MediaItemRepository, upload_tokens: list[str]
-    ):
-        MAX_UPLOAD_TOKEN_LENGTH_PER_CALL = 50
-
-        for i in range(0, len(upload_tokens), MAX_UPLOAD_TOKEN_LENGTH_PER_CALL):
-            chunked_upload_tokens = upload_tokens[
-                i : i + MAX_UPLOAD_TOKEN_LENGTH_PER_CALL
-            ]
-            media_item_repository.add_uploaded_photos(chunked_upload_tokens)
+        storage_quota = gphoto_client.get_storage_quota()
+        return int(storage_quota["limit"]), int(storage_quota["usage"])
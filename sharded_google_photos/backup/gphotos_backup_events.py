@@ -9,3 +9,5 @@ FINISHED_UPLOADING = "backup:finished_uploading"
 STARTED_DELETING = "backup:started_deleting"
 DELETED_PHOTO = "backup:deleted_photo"
 FINISHED_DELETING = "backup:finished_deleting"
+
+FOUND_DUPLICATE_ALBUM_TITLE = "backup:found_duplicate_album_title"
@@ -1,35 +1,180 @@
+import os
+import logging
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from event_bus import EventBus
 
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
 
 from . import gphotos_uploader_events as events
+from .upload_token_cache import UploadTokenCache
+
+logger = logging.getLogger(__name__)
+
+# The ways a photo can be uploaded, which are the keys of upload_method_counts
+RAW_UPLOAD = "raw"
+RESUMABLE_UPLOAD = "resumable"
+CACHED_UPLOAD = "cached"
 
 
 class GPhotosUploader:
-    def __init__(self, gphoto_client: GPhotosClient, event_bus: EventBus = None):
+    def __init__(
+        self,
+        gphoto_client: GPhotosClient,
+        event_bus: EventBus = None,
+        max_workers: int = 1,
+        upload_token_cache: UploadTokenCache | None = None,
+        raw_upload_threshold_in_bytes: int = 0,
+        upload_slots: threading.Semaphore | None = None,
+    ):
         self.gphoto_client = gphoto_client
         self.event_bus = event_bus if event_bus is not None else EventBus()
+        self.max_workers = max_workers
+        self.upload_token_cache = upload_token_cache
+        self.raw_upload_threshold_in_bytes = raw_upload_threshold_in_bytes
+
+        # Uploaders of the same account can share the slots to cap the number
+        # of uploads to the account across all of them
+        self.upload_slots = upload_slots
+
+        # The number of photos uploaded by each upload method
+        self.upload_method_counts: Counter[str] = Counter()
 
     def upload_photos(self, file_paths: list[str], file_names: list[str]) -> list[str]:
         """
         Uploads a list of photos
 
+        Photos smaller than raw_upload_threshold_in_bytes are uploaded in one
+        request, and the rest are uploaded in chunks with a resumable upload.
+        Photos that were uploaded recently but not added to Google Photos
+        are not uploaded again if an upload_token_cache is given.
+
+        Up to max_workers photos are uploaded at the same time, and each upload
+        takes one of the upload_slots if they are given. The
+        UPLOADED_PHOTO event is emitted as soon as each photo finishes
+        uploading, so with more than one worker the events may not follow
+        the order of file_paths.
+
+        Args:
+            file_paths (list[str]): A list of the photos' file paths to upload
+            file_names (list[str]): A list of the corresponding photos' file names
+
+        Returns:
+            list[str]: A list of upload tokens to add to a Google Photos album,
+              in the same order as file_paths
+        """
+        num_files = min(len(file_paths), len(file_names))
+        idx_to_upload_token = dict(
+            self.__upload_photos_as_completed(file_paths, file_names)
+        )
+
+        return [idx_to_upload_token[idx] for idx in range(num_files)]
+
+    def upload_photos_in_batches(
+        self, file_paths: list[str], file_names: list[str], batch_size: int
+    ) -> Iterator[tuple[list[int], list[str]]]:
+        """
+        Uploads a list of photos, yielding their upload tokens in batches
+
+        A batch is yielded as soon as batch_size photos have finished
+        uploading, so the caller can add them to Google Photos while the rest
+        of the photos are still uploading. The last batch may be smaller.
+
         Args:
             file_paths (list[str]): A list of the photos' file paths to upload
             file_names (list[str]): A list of the corresponding photos' file names
+            batch_size (int): The maximum number of upload tokens in a batch
 
         Returns:
-            list[str]: A list of upload tokens to add to a Google Photos album
+            Iterator[tuple[list[int], list[str]]]: Batches of the indices in
+              file_paths of the photos and their upload tokens, in the order
+              that the photos finished uploading
         """
-        upload_tokens = []
+        batch_indices: list[int] = []
+        batch: list[str] = []
+        for idx, upload_token in self.__upload_photos_as_completed(
+            file_paths, file_names
+        ):
+            batch_indices.append(idx)
+            batch.append(upload_token)
+
+            if len(batch) == batch_size:
+                yield batch_indices, batch
+                batch_indices = []
+                batch = []
+
+        if len(batch) > 0:
+            yield batch_indices, batch
+
+    def __upload_photos_as_completed(
+        self, file_paths: list[str], file_names: list[str]
+    ) -> Iterator[tuple[int, str]]:
+        num_files = min(len(file_paths), len(file_names))
         self.event_bus.emit(events.STARTED_UPLOADING, file_paths)
 
-        for file_path, file_name in zip(file_paths, file_names):
-            upload_token = self.gphoto_client.media_items().upload_photo_in_chunks(
-                file_path, file_name
-            )
-            self.event_bus.emit(events.UPLOADED_PHOTO, file_path)
-            upload_tokens.append(upload_token)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_idx = {
+                executor.submit(self.__upload_photo, file_paths[i], file_names[i]): i
+                for i in range(num_files)
+            }
+
+            try:
+                for future in as_completed(future_to_idx):
+                    idx = future_to_idx[future]
+                    upload_token, upload_method = future.result()
+                    self.upload_method_counts[upload_method] += 1
+                    self.event_bus.emit(events.UPLOADED_PHOTO, file_paths[idx])
+                    yield idx, upload_token
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
 
         self.event_bus.emit(events.FINISHED_UPLOADING)
-        return upload_tokens
+
+    def __upload_photo(self, file_path: str, file_name: str) -> tuple[str, str]:
+        if self.upload_token_cache is not None:
+            upload_token = self.upload_token_cache.get_upload_token(
+                self.gphoto_client.name, file_path
+            )
+            if upload_token is not None:
+                logger.debug(f"Reusing upload token for {file_path}")
+                return upload_token, CACHED_UPLOAD
+
+        upload_method = self.__choose_upload_method(file_path)
+        if self.upload_slots is not None:
+            with self.upload_slots:
+                upload_token = self.__upload_photo_with(
+                    upload_method, file_path, file_name
+                )
+        else:
+            upload_token = self.__upload_photo_with(upload_method, file_path, file_name)
+
+        if self.upload_token_cache is not None:
+            self.upload_token_cache.save_upload_token(
+                self.gphoto_client.name, file_path, upload_token
+            )
+
+        return upload_token, upload_method
+
+    def __upload_photo_with(
+        self, upload_method: str, file_path: str, file_name: str
+    ) -> str:
+        if upload_method == RAW_UPLOAD:
+            return self.gphoto_client.media_items().upload_photo(file_path, file_name)
+
+        return self.gphoto_client.media_items().upload_photo_in_chunks(
+            file_path, file_name
+        )
+
+    def __choose_upload_method(self, file_path: str) -> str:
+        # A raw upload takes one request, while a resumable upload needs an
+        # extra request to start it, so only use resumable uploads for big files
+        if self.raw_upload_threshold_in_bytes <= 0:
+            return RESUMABLE_UPLOAD
+
+        if os.stat(file_path).st_size < self.raw_upload_threshold_in_bytes:
+            return RAW_UPLOAD
+
+        return RESUMABLE_UPLOAD
@@ -0,0 +1,163 @@
+import json
+import time
+import logging
+from contextlib import closing
+
+from sharded_google_photos.shared.sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+# Re-list an album from Google Photos at least once a day, in case it was
+# changed outside of this package
+DEFAULT_MAX_AGE_IN_SECONDS = 24 * 60 * 60
+
+
+class MediaItemIndex:
+    """
+    An index on disk of the media items in each album of each account, so that
+    the media items of an album do not need to be listed from Google Photos on
+    every backup.
+
+    The index is kept up to date with the media items that this package adds
+    and removes. An album whose media items were listed more than
+    max_age_in_seconds ago is treated as missing from the index, so that it is
+    listed again to pick up changes made outside of this package.
+
+    Example:
+        >>> index = MediaItemIndex("media-items.db")
+        >>> index.set_media_items("bob@gmail.com", "album-1", [{"id": "1", ...}])
+        >>> index.get_media_items("bob@gmail.com", "album-1")
+        [{'id': '1', ...}]
+    """
+
+    def __init__(
+        self,
+        db_file_path: str,
+        max_age_in_seconds: float = DEFAULT_MAX_AGE_IN_SECONDS,
+    ):
+        self.db_file_path = db_file_path
+        self.max_age_in_seconds = max_age_in_seconds
+
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS albums (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    listed_at REAL NOT NULL,
+                    PRIMARY KEY (account, album_id)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS media_items (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    media_item_id TEXT NOT NULL,
+                    media_item TEXT NOT NULL,
+                    PRIMARY KEY (account, album_id, media_item_id)
+                )
+                """
+            )
+
+    def get_media_items(self, account: str, album_id: str) -> list[dict] | None:
+        """
+        Returns the media items of an album, if the album is in the index.
+
+        Parameters:
+            account (str): the name of the account that owns the album.
+            album_id (str): the ID of the album.
+
+        Returns:
+            list[dict] | None: the media items, or None if the album is not in
+              the index or it needs to be listed again.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            row = conn.execute(
+                """
+                SELECT 1 FROM albums
+                WHERE account = ? AND album_id = ? AND listed_at > ?
+                """,
+                (account, album_id, time.time() - self.max_age_in_seconds),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            rows = conn.execute(
+                """
+                SELECT media_item FROM media_items
+                WHERE account = ? AND album_id = ?
+                """,
+                (account, album_id),
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def set_media_items(self, account: str, album_id: str, media_items: list[dict]):
+        """
+        Replaces the media items of an album, such as after listing the album
+        from Google Photos.
+
+        Parameters:
+            account (str): the name of the account that owns the album.
+            album_id (str): the ID of the album.
+            media_items (list[dict]): all of the media items in the album.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                "DELETE FROM media_items WHERE account = ? AND album_id = ?",
+                (account, album_id),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO media_items VALUES (?, ?, ?, ?)",
+                self.__get_rows(account, album_id, media_items),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO albums VALUES (?, ?, ?)",
+                (account, album_id, time.time()),
+            )
+
+        logger.debug(f"Indexed {len(media_items)} media items in album {album_id}")
+
+    def add_media_items(self, account: str, album_id: str, media_items: list[dict]):
+        """
+        Adds media items to an album in the index.
+
+        Parameters:
+            account (str): the name of the account that owns the album.
+            album_id (str): the ID of the album.
+            media_items (list[dict]): the media items that were added.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO media_items VALUES (?, ?, ?, ?)",
+                self.__get_rows(account, album_id, media_items),
+            )
+
+    def remove_media_items(self, account: str, album_id: str, media_ids: list[str]):
+        """
+        Removes media items from an album in the index.
+
+        Parameters:
+            account (str): the name of the account that owns the album.
+            album_id (str): the ID of the album.
+            media_ids (list[str]): the IDs of the media items that were removed.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.executemany(
+                """
+                DELETE FROM media_items
+                WHERE account = ? AND album_id = ? AND media_item_id = ?
+                """,
+                [(account, album_id, media_id) for media_id in media_ids],
+            )
+
+    def __get_rows(
+        self, account: str, album_id: str, media_items: list[dict]
+    ) -> list[tuple[str, str, str, str]]:
+        return [
+            (account, album_id, media_item["id"], json.dumps(media_item))
+            for media_item in media_items
+        ]
@@ -2,8 +2,14 @@ import logging
 
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
 
+from .media_item_index import MediaItemIndex
+from .records import MediaItem
+
 logger = logging.getLogger(__name__)
 
+# The only fields of a media item that the backup looks at
+MEDIA_ITEM_FIELDS = "id,filename"
+
 
 class MediaItemRepository:
     """
@@ -17,34 +23,55 @@ class MediaItemRepository:
         50
     """
 
-    def __init__(self, album_id: str, gphoto_client: GPhotosClient):
+    def __init__(
+        self,
+        album_id: str,
+        gphoto_client: GPhotosClient,
+        media_item_index: MediaItemIndex | None = None,
+    ):
         self.__album_id = album_id
         self.__gphoto_client = gphoto_client
+        self.__media_item_index = media_item_index
 
-        self.__media_id_to_obj = {}
-        self.__file_name_to_media_ids = {}
+        self.__media_id_to_media_item: dict[str, MediaItem] = {}
+        self.__file_name_to_media_ids: dict[str, str] = {}
+
+        # Whether the media items were queried, and how many there are if not
+        self.__is_listed = False
+        self.__num_unlisted_media_items = 0
 
     def setup(self) -> None:
         """
         Sets up the repository by first querying Google Photos
         for all of the media items in a particular album.
 
+        If there is a media item index, the media items are read from the
+        index instead, and Google Photos is only queried when the album is
+        not in the index or it needs to be listed again.
+
         This should be called before calling other instance methods
         below.
         """
-        self.__media_id_to_obj = {}
-        self.__file_name_to_media_ids = {}
+        self.__list_media_items()
 
-        media_items = self.__gphoto_client.media_items().search_for_media_items(
-            album_id=self.__album_id
-        )
+    def setup_lazily(self, num_media_items: int) -> None:
+        """
+        Sets up the repository without querying Google Photos.
 
-        for media_item in media_items:
-            file_name = media_item["filename"]
-            media_id = media_item["id"]
+        The media items are only queried the first time that a method below
+        needs them, so an album that only gets photos added is never queried.
+        Until then, the number of media items is counted from num_media_items.
 
-            self.__file_name_to_media_ids[file_name] = media_item["id"]
-            self.__media_id_to_obj[media_id] = media_item
+        This should be called instead of setup().
+
+        Parameters:
+            num_media_items (int): the number of media items in the album,
+              like the album's mediaItemsCount.
+        """
+        self.__media_id_to_media_item = {}
+        self.__file_name_to_media_ids = {}
+        self.__is_listed = False
+        self.__num_unlisted_media_items = num_media_items
 
     def contains_file_name(self, file_name: str) -> bool:
         """
@@ -56,9 +83,10 @@ class MediaItemRepository:
         Returns:
             boolean: true if it exists; else false
         """
+        self.__list_media_items_if_needed()
         return file_name in self.__file_name_to_media_ids
 
-    def get_media_item_from_file_name(self, file_name: str) -> object:
+    def get_media_item_from_file_name(self, file_name: str) -> MediaItem:
         """
         Returns the media item from a file name.
 
@@ -66,16 +94,17 @@ class MediaItemRepository:
             file_name (str): the file name.
 
         Returns:
-            object: the media item.
+            MediaItem: the media item.
 
         Raises:
             Exception: if no file name exists in this repository.
         """
+        self.__list_media_items_if_needed()
         if file_name not in self.__file_name_to_media_ids:
             raise Exception(f"Media item {file_name} not found")
 
         media_id = self.__file_name_to_media_ids[file_name]
-        return self.__media_id_to_obj[media_id]
+        return self.__media_id_to_media_item[media_id]
 
     def get_num_media_items(self) -> int:
         """
@@ -84,8 +113,12 @@ class MediaItemRepository:
         Returns:
             int: the number of media items.
         """
+        # An empty count might be out of date, so check it before trusting it
+        if not self.__is_listed and self.__num_unlisted_media_items > 0:
+            return self.__num_unlisted_media_items
 
-        return len(self.__media_id_to_obj)
+        self.__list_media_items_if_needed()
+        return len(self.__media_id_to_media_item)
 
     def remove_media_items(self, media_ids: list[str]) -> None:
         """
@@ -102,13 +135,13 @@ class MediaItemRepository:
         if len(media_ids) == 0:
             return
 
+        self.__list_media_items_if_needed()
         for media_id in media_ids:
-            if media_id not in self.__media_id_to_obj:
+            if media_id not in self.__media_id_to_media_item:
                 raise Exception("Media item is not found")
 
-            media_item = self.__media_id_to_obj[media_id]
-            del self.__media_id_to_obj[media_id]
-            del self.__file_name_to_media_ids[media_item["filename"]]
+            media_item = self.__media_id_to_media_item.pop(media_id)
+            del self.__file_name_to_media_ids[media_item.file_name]
 
         for i in range(0, len(media_ids), MAX_REMOVE_ITEMS_LENGTH_PER_CALL):
             chunked_media_ids = media_ids[i : i + MAX_REMOVE_ITEMS_LENGTH_PER_CALL]
@@ -116,6 +149,11 @@ class MediaItemRepository:
                 self.__album_id, chunked_media_ids
             )
 
+            if self.__media_item_index is not None:
+                self.__media_item_index.remove_media_items(
+                    self.__gphoto_client.name, self.__album_id, chunked_media_ids
+                )
+
         logger.debug(f"Media items removed from album {self.__album_id}: {media_ids}")
 
     def add_uploaded_photos(self, upload_tokens: list[str]) -> None:
@@ -136,7 +174,49 @@ class MediaItemRepository:
         media_items = [obj["mediaItem"] for obj in results["newMediaItemResults"]]
 
         for media_item in media_items:
-            self.__media_id_to_obj[media_item["id"]] = media_item
-            self.__file_name_to_media_ids[media_item["filename"]] = media_item["id"]
+            self.__add_media_item(MediaItem.from_json(media_item))
+
+        if not self.__is_listed:
+            self.__num_unlisted_media_items += len(media_items)
+
+        if self.__media_item_index is not None:
+            self.__media_item_index.add_media_items(
+                self.__gphoto_client.name, self.__album_id, media_items
+            )
 
         logger.debug(f"Added new media items: {media_items}")
+
+    def __list_media_items_if_needed(self):
+        if not self.__is_listed:
+            self.__list_media_items()
+
+    def __list_media_items(self):
+        self.__media_id_to_media_item = {}
+        self.__file_name_to_media_ids = {}
+
+        media_items = None
+        if self.__media_item_index is not None:
+            media_items = self.__media_item_index.get_media_items(
+                self.__gphoto_client.name, self.__album_id
+            )
+
+        if media_items is None:
+            media_items = self.__gphoto_client.media_items().search_for_media_items(
+                album_id=self.__album_id, fields=MEDIA_ITEM_FIELDS
+            )
+
+            if self.__media_item_index is not None:
+                self.__media_item_index.set_media_items(
+                    self.__gphoto_client.name, self.__album_id, media_items
+                )
+        else:
+            logger.debug(f"Found media items of album {self.__album_id} in the index")
+
+        for media_item in media_items:
+            self.__add_media_item(MediaItem.from_json(media_item))
+
+        self.__is_listed = True
+
+    def __add_media_item(self, media_item: MediaItem):
+        self.__media_id_to_media_item[media_item.id] = media_item
+        self.__file_name_to_media_ids[media_item.file_name] = media_item.id
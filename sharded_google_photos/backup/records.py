@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class MediaItem:
+    """
+    The fields of a Google Photos media item that the backup uses.
+
+    It is much smaller than the media item's JSON, which matters when an
+    album has hundreds of thousands of media items.
+    """
+
+    id: str
+    file_name: str
+
+    @staticmethod
+    def from_json(media_item: dict) -> "MediaItem":
+        """
+        Creates a MediaItem from a media item returned by Google Photos.
+
+        Parameters:
+            media_item (dict): the media item's JSON.
+
+        Returns:
+            MediaItem: the media item.
+        """
+        return MediaItem(id=media_item["id"], file_name=media_item["filename"])
+
+
+@dataclass(frozen=True, slots=True)
+class Album:
+    """The fields of a Google Photos album that the backup uses."""
+
+    id: str
+    title: str
+
+    # The number of media items in the album when it was fetched
+    media_items_count: int
+
+    # The index of the Google Photos account that has the album
+    client_idx: int
+
+    # The URL that others can join the album with, which is only set on
+    # albums that the backup shared itself
+    shareable_url: str | None = None
+
+    @staticmethod
+    def from_json(album: dict, client_idx: int) -> "Album":
+        """
+        Creates an Album from an album returned by Google Photos.
+
+        Parameters:
+            album (dict): the album's JSON.
+            client_idx (int): the index of the Google Photos account that
+              has the album.
+
+        Returns:
+            Album: the album.
+        """
+        return Album(
+            id=album["id"],
+            title=album["title"],
+            # Google Photos leaves out the count of empty albums
+            media_items_count=int(album.get("mediaItemsCount", 0)),
+            client_idx=client_idx,
+        )
@@ -1,9 +1,16 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
 
+from .records import Album
+
 logger = logging.getLogger(__name__)
 
+# The only fields of an album that the backup looks at
+ALBUM_FIELDS = "id,title,mediaItemsCount"
+
 
 class SharedAlbumRepository:
     """
@@ -17,38 +24,75 @@ class SharedAlbumRepository:
         true
     """
 
-    def __init__(self, gphoto_clients: list[GPhotosClient]):
+    def __init__(
+        self, gphoto_clients: list[GPhotosClient], max_clients_in_parallel: int = 1
+    ):
         self.__gphoto_clients = gphoto_clients
+        self.__max_clients_in_parallel = max_clients_in_parallel
 
-        self.__album_id_to_album = {}
-        self.__album_title_to_album_id = {}
+        self.__album_id_to_album: dict[str, Album] = {}
+        self.__album_title_to_album_id: dict[str, str] = {}
+        self.__duplicate_album_titles: dict[str, list[Album]] = {}
 
     def setup(self) -> None:
         """
         Sets up the albums repository.
 
-        It will query for all albums from all google photo clients.
+        It will query for all albums from all google photo clients, with up to
+        max_clients_in_parallel clients at the same time.
+
+        If more than one album has the same title, the album from the last
+        client wins, and the albums can be found with
+        get_duplicate_album_titles().
 
         This function should be called before calling other instance
         methods below.
         """
         self.__album_id_to_album = {}
         self.__album_title_to_album_id = {}
-
-        for client_idx in range(len(self.__gphoto_clients)):
-            client_albums = (
-                self.__gphoto_clients[client_idx].albums().list_shared_albums()
+        self.__duplicate_album_titles = {}
+
+        with ThreadPoolExecutor(max_workers=self.__max_clients_in_parallel) as executor:
+            albums_per_client = list(
+                executor.map(
+                    lambda client: client.albums().list_shared_albums(
+                        fields=ALBUM_FIELDS
+                    ),
+                    self.__gphoto_clients,
+                )
             )
 
-            for client_album_idx in range(len(client_albums)):
-                album = client_albums[client_album_idx]
-                album["client_idx"] = client_idx
-
-                album_title = album["title"]
-                album_id = album["id"]
+        # Merge them in the order of the clients so that the same album wins
+        # no matter which client finished listing first
+        album_title_to_albums: dict[str, dict[str, Album]] = {}
+        for client_idx, client_albums in enumerate(albums_per_client):
+            for album_json in client_albums:
+                album = Album.from_json(album_json, client_idx)
+
+                self.__album_id_to_album[album.id] = album
+                self.__album_title_to_album_id[album.title] = album.id
+                album_title_to_albums.setdefault(album.title, {})[album.id] = album
+
+        # An album shared with many clients is listed once per client, so only
+        # different album IDs with the same title are duplicates
+        for album_title, album_id_to_album in album_title_to_albums.items():
+            if len(album_id_to_album) > 1:
+                albums = list(album_id_to_album.values())
+                logger.warning(
+                    f"Found {len(albums)} albums titled {album_title}: "
+                    + f"{[(a.client_idx, a.id) for a in albums]}"
+                )
+                self.__duplicate_album_titles[album_title] = albums
+
+    def get_duplicate_album_titles(self) -> dict[str, list[Album]]:
+        """
+        Returns the album titles that are used by more than one album.
 
-                self.__album_id_to_album[album_id] = album
-                self.__album_title_to_album_id[album_title] = album_id
+        Returns:
+            dict[str, list[Album]]: a map of each duplicated title to all of
+              the albums with that title, in the order of the clients.
+        """
+        return self.__duplicate_album_titles
 
     def contains_album_title(self, title: str) -> bool:
         """
@@ -62,7 +106,7 @@ class SharedAlbumRepository:
         """
         return title in self.__album_title_to_album_id
 
-    def get_album_from_title(self, title: str) -> object:
+    def get_album_from_title(self, title: str) -> Album:
         """
         Returns an album from a title.
 
@@ -70,7 +114,7 @@ class SharedAlbumRepository:
             title (str): the album title.
 
         Returns:
-            object: an Album object.
+            Album: the album.
 
         Raises:
             Exception: thrown when no album exists with that title.
@@ -81,7 +125,7 @@ class SharedAlbumRepository:
         album_id = self.__album_title_to_album_id[title]
         return self.__album_id_to_album[album_id]
 
-    def create_shared_album(self, client_idx: int, title: str) -> object:
+    def create_shared_album(self, client_idx: int, title: str) -> Album:
         """
         Creates a new shared album under a particular Google Photos account.
 
@@ -91,7 +135,7 @@ class SharedAlbumRepository:
             title (str): the album name
 
         Returns:
-            object: the object of the newly created album.
+            Album: the newly created album.
 
         Raises:
             Exception: thrown if the title already exists.
@@ -99,20 +143,16 @@ class SharedAlbumRepository:
         if title in self.__album_title_to_album_id:
             raise Exception(f"Album {title} already exists")
 
-        new_album = self.__gphoto_clients[client_idx].albums().create_album(title)
-        new_album["client_idx"] = client_idx
+        albums_client = self.__gphoto_clients[client_idx].albums()
+        new_album = Album.from_json(albums_client.create_album(title), client_idx)
+        share_info = albums_client.share_album(new_album.id)["shareInfo"]
+        new_album = replace(new_album, shareable_url=share_info["shareableUrl"])
 
-        new_album_id = new_album["id"]
-        share_info = (
-            self.__gphoto_clients[client_idx].albums().share_album(new_album_id)
-        )
-        new_album["shareInfo"] = share_info["shareInfo"]
-
-        self.__album_id_to_album[new_album_id] = new_album
-        self.__album_title_to_album_id[title] = new_album_id
+        self.__album_id_to_album[new_album.id] = new_album
+        self.__album_title_to_album_id[title] = new_album.id
         return new_album
 
-    def rename_album(self, album_id: str, new_title: str) -> object:
+    def rename_album(self, album_id: str, new_title: str) -> Album:
         """
         Renames an album with a new name. It returns the object of that
         album with that new name.
@@ -122,7 +162,7 @@ class SharedAlbumRepository:
             new_title (str): the new name of the album
 
         Returns:
-            object: the album object with the new name
+            Album: the album with the new name
 
         Raises:
             Exception: thrown if album id does not exist or the
@@ -135,18 +175,17 @@ class SharedAlbumRepository:
             raise Exception(f"Album with name {new_title} already exists")
 
         old_album = self.__album_id_to_album[album_id]
-        old_title = old_album["title"]
-        client_idx = old_album["client_idx"]
-
-        new_album = (
-            self.__gphoto_clients[client_idx].albums().update_album(album_id, new_title)
+        updated_album = (
+            self.__gphoto_clients[old_album.client_idx]
+            .albums()
+            .update_album(album_id, new_title)
         )
-        new_album["client_idx"] = client_idx
+        new_album = replace(old_album, title=updated_album["title"])
 
         del self.__album_id_to_album[album_id]
-        del self.__album_title_to_album_id[old_title]
+        del self.__album_title_to_album_id[old_album.title]
 
-        self.__album_id_to_album[new_album["id"]] = new_album
-        self.__album_title_to_album_id[new_album["title"]] = new_album["id"]
+        self.__album_id_to_album[new_album.id] = new_album
+        self.__album_title_to_album_id[new_album.title] = new_album.id
 
         return new_album
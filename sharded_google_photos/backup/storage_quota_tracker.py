@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+
+from sharded_google_photos.shared.gphotos_client import GPhotosClient
+
+logger = logging.getLogger(__name__)
+
+# Ask Google for the storage quota again every so often, in case photos were
+# added or deleted outside of this package
+DEFAULT_MAX_AGE_IN_SECONDS = 60 * 60
+
+
+class StorageQuotaTracker:
+    """
+    A cache in memory of the storage quota of each account, so that backups
+    that run one after another do not need to ask Google for it every time.
+
+    The photos added by a backup are counted against the cached quota. A
+    quota that is older than max_age_in_seconds, or that was expired, is
+    fetched again the next time that it is needed.
+
+    Example:
+        >>> tracker = StorageQuotaTracker()
+        >>> tracker.get_storage_quota(client)
+        (1000, 0)
+        >>> tracker.add_usage(client.name, 200)
+        >>> tracker.get_storage_quota(client)
+        (1000, 200)
+    """
+
+    def __init__(self, max_age_in_seconds: float = DEFAULT_MAX_AGE_IN_SECONDS):
+        self.max_age_in_seconds = max_age_in_seconds
+
+        self.__lock = threading.Lock()
+
+        # The limit, usage, and fetch time of the quota of each account
+        self.__account_to_quota: dict[str, tuple[int, int, float]] = {}
+
+    def get_storage_quota(self, gphoto_client: GPhotosClient) -> tuple[int, int]:
+        """
+        Returns the storage limit of an account and how much of it is used.
+
+        Parameters:
+            gphoto_client (GPhotosClient): the client of the account.
+
+        Returns:
+            tuple[int, int]: the limit and the usage, in bytes.
+        """
+        account = gphoto_client.name
+        with self.__lock:
+            quota = self.__get_fresh_quota(account)
+            if quota is not None:
+                return quota[0], quota[1]
+
+        storage_quota = gphoto_client.get_storage_quota()
+        limit = int(storage_quota["limit"])
+        usage = int(storage_quota["usage"])
+        logger.debug(f"Fetched storage quota of {account}: {usage} / {limit}")
+
+        with self.__lock:
+            self.__account_to_quota[account] = (limit, usage, time.time())
+
+        return limit, usage
+
+    def is_cached(self, account: str) -> bool:
+        """
+        Returns true if the quota of an account is cached and not too old.
+
+        Parameters:
+            account (str): the name of the account.
+
+        Returns:
+            bool: true if the quota will not be fetched again; else false.
+        """
+        with self.__lock:
+            return self.__get_fresh_quota(account) is not None
+
+    def add_usage(self, account: str, num_bytes: int) -> None:
+        """
+        Counts bytes that were just added to an account against its quota.
+
+        Parameters:
+            account (str): the name of the account.
+            num_bytes (int): the number of bytes that were added.
+        """
+        with self.__lock:
+            quota = self.__account_to_quota.get(account)
+            if quota is not None:
+                self.__account_to_quota[account] = (
+                    quota[0],
+                    quota[1] + num_bytes,
+                    quota[2],
+                )
+
+    def expire(self, account: str) -> None:
+        """
+        Makes the quota of an account be fetched again the next time.
+
+        Parameters:
+            account (str): the name of the account.
+        """
+        with self.__lock:
+            self.__account_to_quota.pop(account, None)
+
+    def __get_fresh_quota(self, account: str) -> tuple[int, int, float] | None:
+        quota = self.__account_to_quota.get(account)
+        if quota is None or quota[2] <= time.time() - self.max_age_in_seconds:
+            return None
+        return quota
@@ -0,0 +1,122 @@
+import time
+import logging
+from contextlib import closing
+
+from sharded_google_photos.shared.sqlite_store import connect, get_file_key
+
+logger = logging.getLogger(__name__)
+
+# Google Photos keeps upload tokens for a day, so stop using them well before
+DEFAULT_MAX_AGE_IN_SECONDS = 12 * 60 * 60
+
+
+class UploadTokenCache:
+    """
+    A cache on disk of the upload tokens of files that were uploaded but not
+    added to Google Photos yet, so that a failed or interrupted backup does not
+    need to upload them again.
+
+    Upload tokens only work for the account that uploaded them, so they are
+    keyed by the account's name along with the file's absolute path, size,
+    and modified time. Tokens older than max_age_in_seconds are evicted.
+
+    Example:
+        >>> cache = UploadTokenCache("upload-tokens.db")
+        >>> cache.save_upload_token("bob@gmail.com", "1.jpg", "token-1")
+        >>> cache.get_upload_token("bob@gmail.com", "1.jpg")
+        'token-1'
+    """
+
+    def __init__(
+        self,
+        db_file_path: str,
+        max_age_in_seconds: float = DEFAULT_MAX_AGE_IN_SECONDS,
+    ):
+        self.db_file_path = db_file_path
+        self.max_age_in_seconds = max_age_in_seconds
+
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_tokens (
+                    account TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_size_in_bytes INTEGER NOT NULL,
+                    file_mtime_ns INTEGER NOT NULL,
+                    upload_token TEXT NOT NULL,
+                    uploaded_at REAL NOT NULL,
+                    PRIMARY KEY (account, file_path, file_size_in_bytes, file_mtime_ns)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS upload_tokens_by_token
+                ON upload_tokens (upload_token)
+                """
+            )
+
+        self.evict_expired_upload_tokens()
+
+    def get_upload_token(self, account: str, file_path: str) -> str | None:
+        """
+        Returns the upload token of a file, if it was uploaded recently.
+
+        Parameters:
+            account (str): the name of the account that uploaded the file.
+            file_path (str): the path to the file.
+
+        Returns:
+            str | None: the upload token, or None if there is none or it expired.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            row = conn.execute(
+                """
+                SELECT upload_token FROM upload_tokens
+                WHERE account = ? AND file_path = ? AND file_size_in_bytes = ?
+                    AND file_mtime_ns = ? AND uploaded_at > ?
+                """,
+                (account,)
+                + get_file_key(file_path)
+                + (time.time() - self.max_age_in_seconds,),
+            ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def save_upload_token(self, account: str, file_path: str, upload_token: str):
+        """
+        Saves the upload token of a file that was just uploaded.
+
+        Parameters:
+            account (str): the name of the account that uploaded the file.
+            file_path (str): the path to the file.
+            upload_token (str): the upload token.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_tokens VALUES (?, ?, ?, ?, ?, ?)",
+                (account,) + get_file_key(file_path) + (upload_token, time.time()),
+            )
+
+    def remove_upload_tokens(self, upload_tokens: list[str]):
+        """
+        Removes upload tokens, such as after they were added to Google Photos.
+
+        Parameters:
+            upload_tokens (list[str]): the upload tokens to remove.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.executemany(
+                "DELETE FROM upload_tokens WHERE upload_token = ?",
+                [(upload_token,) for upload_token in upload_tokens],
+            )
+
+    def evict_expired_upload_tokens(self):
+        """Removes all of the upload tokens that are too old to be used."""
+        with closing(connect(self.db_file_path)) as conn, conn:
+            num_evicted = conn.execute(
+                "DELETE FROM upload_tokens WHERE uploaded_at <= ?",
+                (time.time() - self.max_age_in_seconds,),
+            ).rowcount
+
+        logger.debug(f"Evicted {num_evicted} expired upload tokens")
@@ -0,0 +1,314 @@
+import sqlite3
+import logging
+from contextlib import closing
+from datetime import datetime
+
+from sharded_google_photos.shared.sqlite_store import connect
+
+logger = logging.getLogger(__name__)
+
+
+class CleanerState:
+    """
+    The state on disk of the last run of the cleaner on each account, so that
+    the next run only needs to list what changed since then.
+
+    For each account, it keeps the media items in each shared album along
+    with the album's number of media items, the creation time of the newest
+    media item that was checked, and when all of the media items were last
+    checked.
+
+    A run stages the albums that it lists, and only commits them along with
+    the new watermark once its media items are trashed. That way a run that
+    crashes or fails to trash media items is redone by the next run.
+
+    Example:
+        >>> state = CleanerState("cleaner-state.db")
+        >>> state.stage_album_media_item_ids("bob@gmail.com", "album-1", 1, ["1"])
+        >>> state.commit_staged_changes("bob@gmail.com", None)
+        >>> state.get_album_media_items_counts("bob@gmail.com")
+        {'album-1': 1}
+    """
+
+    def __init__(self, db_file_path: str):
+        self.db_file_path = db_file_path
+
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    account TEXT NOT NULL PRIMARY KEY,
+                    creation_time TEXT NOT NULL,
+                    full_scan_time TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS albums (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    media_items_count INTEGER NOT NULL,
+                    PRIMARY KEY (account, album_id)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS album_media_items (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    media_item_id TEXT NOT NULL,
+                    PRIMARY KEY (account, album_id, media_item_id)
+                )
+                """
+            )
+
+            # An album with no count is staged to be removed
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS staged_albums (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    media_items_count INTEGER,
+                    PRIMARY KEY (account, album_id)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS staged_album_media_items (
+                    account TEXT NOT NULL,
+                    album_id TEXT NOT NULL,
+                    media_item_id TEXT NOT NULL,
+                    PRIMARY KEY (account, album_id, media_item_id)
+                )
+                """
+            )
+
+    def get_watermark(self, account: str) -> datetime | None:
+        """
+        Returns the creation time of the newest media item that was checked.
+
+        Parameters:
+            account (str): the name of the account.
+
+        Returns:
+            datetime | None: the creation time, or None if the cleaner has not
+              finished a run on the account yet.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            row = conn.execute(
+                "SELECT creation_time FROM watermarks WHERE account = ?",
+                (account,),
+            ).fetchone()
+
+        return datetime.fromisoformat(row[0]) if row is not None else None
+
+    def get_last_full_scan_time(self, account: str) -> datetime | None:
+        """
+        Returns when all of the media items were last checked.
+
+        Parameters:
+            account (str): the name of the account.
+
+        Returns:
+            datetime | None: the start time of the last run that checked all
+              of the media items, or None if no such run has finished yet.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            row = conn.execute(
+                "SELECT full_scan_time FROM watermarks WHERE account = ?",
+                (account,),
+            ).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+
+        return datetime.fromisoformat(row[0])
+
+    def get_album_media_items_counts(self, account: str) -> dict[str, int]:
+        """
+        Returns the number of media items in each album of an account, as of
+        when the album was last listed.
+
+        Parameters:
+            account (str): the name of the account.
+
+        Returns:
+            dict[str, int]: a map of each album ID to its number of media items.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            rows = conn.execute(
+                "SELECT album_id, media_items_count FROM albums WHERE account = ?",
+                (account,),
+            ).fetchall()
+
+        return {album_id: media_items_count for album_id, media_items_count in rows}
+
+    def get_album_media_item_ids(self, account: str, album_id: str) -> list[str]:
+        """
+        Returns the IDs of the media items in an album.
+
+        Parameters:
+            account (str): the name of the account.
+            album_id (str): the ID of the album.
+
+        Returns:
+            list[str]: the IDs of the media items.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            rows = conn.execute(
+                """
+                SELECT media_item_id FROM album_media_items
+                WHERE account = ? AND album_id = ?
+                """,
+                (account, album_id),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def stage_album_media_item_ids(
+        self,
+        account: str,
+        album_id: str,
+        media_items_count: int,
+        media_item_ids: list[str],
+    ):
+        """
+        Stages the media items of an album to replace its media items on the
+        next commit.
+
+        Parameters:
+            account (str): the name of the account.
+            album_id (str): the ID of the album.
+            media_items_count (int): the album's mediaItemsCount.
+            media_item_ids (list[str]): the IDs of all of the media items in
+              the album.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                DELETE FROM staged_album_media_items
+                WHERE account = ? AND album_id = ?
+                """,
+                (account, album_id),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO staged_album_media_items VALUES (?, ?, ?)",
+                [
+                    (account, album_id, media_item_id)
+                    for media_item_id in media_item_ids
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO staged_albums VALUES (?, ?, ?)",
+                (account, album_id, media_items_count),
+            )
+
+    def stage_album_removal(self, account: str, album_id: str):
+        """
+        Stages an album to be removed on the next commit.
+
+        Parameters:
+            account (str): the name of the account.
+            album_id (str): the ID of the album.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                DELETE FROM staged_album_media_items
+                WHERE account = ? AND album_id = ?
+                """,
+                (account, album_id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO staged_albums VALUES (?, ?, NULL)",
+                (account, album_id),
+            )
+
+    def commit_staged_changes(
+        self,
+        account: str,
+        watermark: datetime | None,
+        full_scan_time: datetime | None = None,
+    ):
+        """
+        Applies the staged albums of an account and saves its watermark, all
+        at once.
+
+        Parameters:
+            account (str): the name of the account.
+            watermark (datetime | None): the creation time of the newest media
+              item that was checked, or None to keep the current watermark.
+            full_scan_time (datetime | None): the start time of the run if it
+              checked all of the media items, or None to keep the current one.
+        """
+        staged_album_ids = "SELECT album_id FROM staged_albums WHERE account = ?"
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                f"""
+                DELETE FROM album_media_items
+                WHERE account = ? AND album_id IN ({staged_album_ids})
+                """,
+                (account, account),
+            )
+            conn.execute(
+                """
+                INSERT INTO album_media_items
+                SELECT account, album_id, media_item_id
+                FROM staged_album_media_items WHERE account = ?
+                """,
+                (account,),
+            )
+            conn.execute(
+                f"""
+                DELETE FROM albums
+                WHERE account = ? AND album_id IN ({staged_album_ids})
+                """,
+                (account, account),
+            )
+            conn.execute(
+                """
+                INSERT INTO albums
+                SELECT account, album_id, media_items_count FROM staged_albums
+                WHERE account = ? AND media_items_count IS NOT NULL
+                """,
+                (account,),
+            )
+            self.__delete_staged_changes(conn, account)
+
+            if watermark is not None:
+                conn.execute(
+                    """
+                    INSERT INTO watermarks VALUES (?, ?, ?)
+                    ON CONFLICT (account) DO UPDATE SET
+                        creation_time = excluded.creation_time,
+                        full_scan_time = COALESCE(
+                            excluded.full_scan_time, full_scan_time
+                        )
+                    """,
+                    (
+                        account,
+                        watermark.isoformat(),
+                        full_scan_time.isoformat() if full_scan_time else None,
+                    ),
+                )
+
+        logger.debug(f"Committed staged albums of {account}")
+
+    def discard_staged_changes(self, account: str):
+        """
+        Drops the staged albums of an account, such as after a run failed.
+
+        Parameters:
+            account (str): the name of the account.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            self.__delete_staged_changes(conn, account)
+
+    def __delete_staged_changes(self, conn: sqlite3.Connection, account: str):
+        conn.execute(
+            "DELETE FROM staged_album_media_items WHERE account = ?", (account,)
+        )
+        conn.execute("DELETE FROM staged_albums WHERE account = ?", (account,))
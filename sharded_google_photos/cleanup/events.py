@@ -4,5 +4,16 @@ A module used to store events emitted from the GPhotosCleaner class.
 
 FOUND_TRASH_ALBUM = "cleanup:found_trash_album"
 CREATED_TRASH_ALBUM = "cleanup:created_trash_album"
-FOUND_MEDIA_ITEMS_IN_ALBUMS = "cleanup:found_media_items_in_albums"
+
+# Emitted with the number of media items in shared albums
+FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS = "cleanup:found_num_media_items_in_albums"
+
+# Emitted once at the end with the IDs of all media items added to the trash
 ADDED_MEDIA_ITEMS_TO_TRASH = "cleanup:added_media_items_to_trash"
+
+# Emitted with the IDs of each chunk of media items that is added to the trash
+ADDED_MEDIA_ITEMS_TO_TRASH_BATCH = "cleanup:added_media_items_to_trash_batch"
+
+# Emitted with the IDs of a chunk of media items that could not be added to the
+# trash, and the error
+FAILED_TO_ADD_MEDIA_ITEMS_TO_TRASH = "cleanup:failed_to_add_media_items_to_trash"
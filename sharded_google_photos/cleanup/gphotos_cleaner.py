@@ -1,33 +1,246 @@
 import logging
+import threading
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from event_bus import EventBus
 
 from . import events
+from .cleaner_state import CleanerState
+from .media_item_id_set import MediaItemIdSet
+from sharded_google_photos.shared.bandwidth_limiter import BandwidthLimiter
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
 
 
 logger = logging.getLogger(__name__)
 
+# The maximum number of media items that albums:batchAddMediaItems accepts
+MAX_MEDIA_ITEMS_LENGTH_PER_CALL = 50
+
+# The maximum number of media items to hold on to while the albums are
+# scanned, after which listing the media items waits for the albums
+MAX_MEDIA_ITEM_IDS_WAITING_FOR_ALBUM_SCANS = 10000
+
+# The fields needed to tell if a shared album changed since the last run
+SHARED_ALBUM_FIELDS = "id,mediaItemsCount"
+
+# The fields needed to move the watermark of the last run forward
+LIBRARY_MEDIA_ITEM_FIELDS = "id,mediaMetadata/creationTime"
+
+# How often to list all of the media items instead of only the newest ones
+DEFAULT_FULL_SCAN_INTERVAL = timedelta(days=7)
+
+
+@dataclass
+class GPhotosCleanerResults:
+    # The number of media items that were added to the trash album
+    num_media_items_trashed: int
+
+    # The number of media items that could not be added to the trash album
+    num_media_items_failed_to_trash: int = 0
+
+
+@dataclass
+class _CleanerRun:
+    # The media items in the albums that were listed in this run
+    media_item_ids_in_albums: MediaItemIdSet = field(default_factory=MediaItemIdSet)
+
+    # The albums, with their number of media items, that were not listed in
+    # this run since their number of media items did not change
+    unchanged_albums: list[tuple[str, int]] = field(default_factory=list)
+
+    # The media items in those albums as of the last run
+    media_item_ids_in_unchanged_albums: MediaItemIdSet = field(
+        default_factory=MediaItemIdSet
+    )
+
+    # The media items that left albums since the last run
+    media_item_ids_removed_from_albums: set[str] = field(default_factory=set)
+
 
 class GPhotosCleaner:
     """
     A class that is responsible for cleaning up and deleting photos that are no longer
     in albums anymore.
+
+    The shared albums are listed on up to max_albums_in_parallel threads, while
+    all of the media items are listed at the same time. Listing the media items
+    pauses if too many of them are waiting for the albums to be listed.
+
+    If there is a cleaner state, each run only lists the media items created
+    since the newest media item of the last run, and the albums whose number
+    of media items changed since then. The media items that left those albums
+    are checked again as well. Before trashing a media item that is in no
+    album, the albums that were not listed are listed too, since media items
+    could have been swapped in them. The state is only saved once the media
+    items are trashed.
+
+    Google Photos only filters media items by their creation time, which is
+    when the photo was taken and not when it was uploaded. So a photo taken
+    before the last run but uploaded since then is missed until a run lists
+    all of the media items again. That happens on the first run, and then
+    once every full_scan_interval unless it is None. The newest creation time
+    is capped at the start of the run, so that a photo dated in the future
+    cannot make the next runs skip the media items uploaded until then.
+
+    The media items to trash are added in chunks on up to
+    max_trash_batches_in_parallel threads, with at most
+    max_trash_batches_per_second chunks sent each second. A chunk that still
+    fails after retrying is reported, and the rest of the chunks are added.
+    The cleaner state is then left as it was, so that the next run checks
+    those media items again.
+
+    Example:
+        >>> cleaner = GPhotosCleaner(
+        >>>     GPhotosClient(...),
+        >>>     max_albums_in_parallel=4,
+        >>>     cleaner_state=CleanerState("cleaner-state.db"),
+        >>>     max_trash_batches_in_parallel=4,
+        >>>     max_trash_batches_per_second=5,
+        >>> )
+        >>> cleaner.mark_unalbumed_photos_to_trash()
     """
 
-    def __init__(self, gphoto_client: GPhotosClient, event_bus: EventBus = None):
+    def __init__(
+        self,
+        gphoto_client: GPhotosClient,
+        event_bus: EventBus = None,
+        max_albums_in_parallel: int = 1,
+        cleaner_state: CleanerState | None = None,
+        max_trash_batches_in_parallel: int = 1,
+        max_trash_batches_per_second: float | None = None,
+        full_scan_interval: timedelta | None = DEFAULT_FULL_SCAN_INTERVAL,
+    ):
         self.gphoto_client = gphoto_client
         self.event_bus = event_bus if event_bus is not None else EventBus()
+        self.max_albums_in_parallel = max_albums_in_parallel
+        self.cleaner_state = cleaner_state
+        self.max_trash_batches_in_parallel = max_trash_batches_in_parallel
+        self.full_scan_interval = full_scan_interval
+
+        # Each chunk of media items to trash takes one token
+        self.__trash_batch_limiter = BandwidthLimiter(max_trash_batches_per_second)
+
+        self.__lock = threading.Lock()
 
-    def mark_unalbumed_photos_to_trash(self) -> None:
+        # The creation time of the newest media item listed in the current run
+        self.__newest_creation_time: datetime | None = None
+
+    def mark_unalbumed_photos_to_trash(self) -> GPhotosCleanerResults:
         """
         Finds all of the photos that are not in an album, and puts it in a
         dedicated "Trash" album to be deleted by the user manually.
+
+        Returns:
+            GPhotosCleanerResults: the number of photos put in the trash.
         """
 
         # Find the trash album
         logger.debug("Step 1: Find the trash album, and if not, create one")
+        trash_album = self.__find_or_create_trash_album()
+        logger.debug(f"Trash album: {trash_album['id']}")
+
+        account = self.gphoto_client.name
+        start_time = datetime.now(timezone.utc)
+        watermark = None
+        album_id_to_last_media_items_count = {}
+        if self.cleaner_state is not None:
+            # Drop what a run that crashed had staged
+            self.cleaner_state.discard_staged_changes(account)
+            if not self.__is_full_scan_due(self.cleaner_state, account, start_time):
+                watermark = self.cleaner_state.get_watermark(account)
+            album_id_to_last_media_items_count = (
+                self.cleaner_state.get_album_media_items_counts(account)
+            )
+
+        # Find all of the media item ids in all shared albums, and all of the
+        # media items, at the same time
+        logger.debug("Step 2: Find all media item ids in shared albums")
+        run = _CleanerRun()
+        with ThreadPoolExecutor(max_workers=self.max_albums_in_parallel) as executor:
+            album_scans: deque[Future] = deque()
+            for shared_album in self.gphoto_client.albums().iter_shared_albums(
+                fields=SHARED_ALBUM_FIELDS
+            ):
+                album_scans.append(
+                    executor.submit(
+                        self.__scan_album,
+                        run,
+                        shared_album,
+                        album_id_to_last_media_items_count.pop(
+                            shared_album["id"], None
+                        ),
+                    )
+                )
+
+            # The media items of albums that are no longer shared left them too
+            if self.cleaner_state is not None:
+                for album_id in album_id_to_last_media_items_count:
+                    media_item_ids = self.cleaner_state.get_album_media_item_ids(
+                        account, album_id
+                    )
+                    with self.__lock:
+                        run.media_item_ids_removed_from_albums.update(media_item_ids)
+                    self.cleaner_state.stage_album_removal(account, album_id)
+
+            # Go through all of the media items, and if they are not in albums,
+            # move them to trash in chunks while the rest of them are listed
+            logger.debug(
+                "Step 3: Find all media item ids not in a shared album, and trash them"
+            )
+            self.__newest_creation_time = watermark
+            results = self.__add_photos_to_trash_in_batches(
+                trash_album["id"],
+                self.__iter_media_item_ids_to_trash(
+                    executor, run, album_scans, watermark
+                ),
+            )
+
+        logger.debug(f"Media item ids moved to trash: {results}")
+
+        # Save the albums, and only list the media items created since then on
+        # the next run, now that their media items are trashed
+        if self.cleaner_state is not None:
+            if results.num_media_items_failed_to_trash > 0:
+                # Check the media items that failed again on the next run
+                self.cleaner_state.discard_staged_changes(account)
+                logger.debug("Kept the last state since media items failed to trash")
+            else:
+                # Media items dated in the future were checked in this run too
+                new_watermark = start_time
+                if self.__newest_creation_time is not None:
+                    new_watermark = min(self.__newest_creation_time, start_time)
+
+                self.cleaner_state.commit_staged_changes(
+                    account, new_watermark, start_time if watermark is None else None
+                )
+                logger.debug(f"Saved watermark: {new_watermark}")
+
+        return results
+
+    def __is_full_scan_due(
+        self, cleaner_state: CleanerState, account: str, start_time: datetime
+    ) -> bool:
+        last_full_scan_time = cleaner_state.get_last_full_scan_time(account)
+        if last_full_scan_time is None:
+            return True
+
+        if self.full_scan_interval is None:
+            return False
+
+        return start_time - last_full_scan_time >= self.full_scan_interval
+
+    def __find_or_create_trash_album(self) -> dict:
         trash_album = None
-        for album in self.gphoto_client.albums().list_albums():
+        for album in self.gphoto_client.albums().iter_albums():
             if album["title"] == "Trash":
                 trash_album = album
 
@@ -38,49 +251,286 @@ class GPhotosCleaner:
         else:
             self.event_bus.emit(events.FOUND_TRASH_ALBUM, trash_album)
 
-        logger.debug(f"Trash album: {trash_album['id']}")
+        return trash_album
 
-        # Find all of the media item ids in all shared albums
-        logger.debug("Step 2: Find all media item ids in shared albums")
-        media_item_ids_in_albums = set()
-        for shared_album in self.gphoto_client.albums().list_shared_albums():
-            shared_album_id = shared_album["id"]
-            for media_items in self.gphoto_client.media_items().search_for_media_items(
-                shared_album_id
-            ):
-                media_item_ids_in_albums.add(media_items["id"])
+    def __scan_album(
+        self,
+        run: "_CleanerRun",
+        shared_album: dict,
+        last_media_items_count: int | None,
+    ):
+        album_id = shared_album["id"]
+        media_items_count = int(shared_album.get("mediaItemsCount", 0))
 
-        logger.debug(f"Media item ids in albums: {media_item_ids_in_albums}")
-        self.event_bus.emit(
-            events.FOUND_MEDIA_ITEMS_IN_ALBUMS, media_item_ids_in_albums
-        )
+        # An album with the same number of media items is assumed to be
+        # unchanged until a media item turns up that is in no album
+        if (
+            self.cleaner_state is not None
+            and last_media_items_count == media_items_count
+        ):
+            media_item_ids = self.cleaner_state.get_album_media_item_ids(
+                self.gphoto_client.name, album_id
+            )
+            with self.__lock:
+                run.unchanged_albums.append((album_id, media_items_count))
+                for media_item_id in media_item_ids:
+                    run.media_item_ids_in_unchanged_albums.add(media_item_id)
+            return
 
-        # Go through all of the media items, and if they are not in albums, move it to trash
-        logger.debug(
-            "Step 3: Find all media item ids not in a shared album, and trash them"
+        self.__list_album(
+            run, album_id, media_items_count, last_media_items_count is not None
         )
-        media_item_ids_to_trash = []
-        for media_item in self.gphoto_client.media_items().search_for_media_items():
-            media_item_id = media_item["id"]
-            if media_item_id not in media_item_ids_in_albums:
-                media_item_ids_to_trash.append(media_item_id)
 
-        if len(media_item_ids_to_trash) > 0:
-            self.__add_photos_to_album_safely(
-                trash_album["id"], media_item_ids_to_trash
+    def __list_album(
+        self,
+        run: "_CleanerRun",
+        album_id: str,
+        media_items_count: int,
+        was_listed_before: bool,
+    ):
+        account = self.gphoto_client.name
+        media_item_ids = [
+            media_item["id"]
+            for media_item in self.gphoto_client.media_items().iter_media_items(
+                album_id, fields="id"
+            )
+        ]
+
+        media_item_ids_removed = set()
+        if self.cleaner_state is not None:
+            if was_listed_before:
+                last_media_item_ids = self.cleaner_state.get_album_media_item_ids(
+                    account, album_id
+                )
+                media_item_ids_removed = set(last_media_item_ids) - set(media_item_ids)
+
+            self.cleaner_state.stage_album_media_item_ids(
+                account, album_id, media_items_count, media_item_ids
             )
 
-        logger.debug(f"Media item ids moved to trash: {len(media_item_ids_to_trash)}")
-        self.event_bus.emit(events.ADDED_MEDIA_ITEMS_TO_TRASH, media_item_ids_to_trash)
+        with self.__lock:
+            run.media_item_ids_removed_from_albums.update(media_item_ids_removed)
+            for media_item_id in media_item_ids:
+                run.media_item_ids_in_albums.add(media_item_id)
+
+    def __iter_media_item_ids_to_trash(
+        self,
+        executor: ThreadPoolExecutor,
+        run: "_CleanerRun",
+        album_scans: deque[Future],
+        watermark: datetime | None,
+    ) -> Iterator[str]:
+        for media_item_id in self.__iter_media_item_ids_after_album_scans(
+            run, album_scans, watermark
+        ):
+            if not self.__is_in_album(executor, run, media_item_id):
+                # Check each media item once, even if it also left an album
+                run.media_item_ids_removed_from_albums.discard(media_item_id)
+                yield media_item_id
+
+        # Listing the unchanged albums again can find more media items that
+        # left them, so keep going until every one of them is checked
+        checked_media_item_ids: set[str] = set()
+        while True:
+            media_item_ids = (
+                run.media_item_ids_removed_from_albums - checked_media_item_ids
+            )
+            if len(media_item_ids) == 0:
+                break
+
+            for media_item_id in media_item_ids:
+                checked_media_item_ids.add(media_item_id)
+                if not self.__is_in_album(executor, run, media_item_id):
+                    yield media_item_id
+
+    def __is_in_album(
+        self, executor: ThreadPoolExecutor, run: "_CleanerRun", media_item_id: str
+    ) -> bool:
+        if media_item_id in run.media_item_ids_in_albums:
+            return True
 
-    def __add_photos_to_album_safely(self, album_id: str, media_item_ids: list[str]):
-        MAX_MEDIA_ITEMS_LENGTH_PER_CALL = 50
+        if len(run.unchanged_albums) == 0:
+            return False
 
-        for i in range(0, len(media_item_ids), MAX_MEDIA_ITEMS_LENGTH_PER_CALL):
-            chunked_media_item_ids = media_item_ids[
-                i : i + MAX_MEDIA_ITEMS_LENGTH_PER_CALL
-            ]
+        if media_item_id in run.media_item_ids_in_unchanged_albums:
+            return True
+
+        # An album can keep its number of media items while media items are
+        # swapped in it, so list the unchanged albums before trashing anything
+        logger.debug(f"Listing {len(run.unchanged_albums)} unchanged albums again")
+        album_scans = [
+            executor.submit(self.__list_album, run, album_id, media_items_count, True)
+            for album_id, media_items_count in run.unchanged_albums
+        ]
+        for album_scan in album_scans:
+            album_scan.result()
+
+        run.unchanged_albums = []
+        run.media_item_ids_in_unchanged_albums = MediaItemIdSet()
+
+        return media_item_id in run.media_item_ids_in_albums
+
+    def __iter_media_item_ids_after_album_scans(
+        self,
+        run: "_CleanerRun",
+        album_scans: deque[Future],
+        watermark: datetime | None,
+    ) -> Iterator[str]:
+        # Hold on to the media items listed before all of the albums are
+        # scanned, since they cannot be checked against the albums until then
+        unchecked_media_item_ids = []
+
+        def have_albums_been_scanned(wait: bool) -> bool:
+            while len(album_scans) > 0 and (wait or album_scans[0].done()):
+                album_scans.popleft().result()
+            return len(album_scans) == 0
+
+        def emit_found_media_items_in_albums():
+            num_media_items_in_albums = len(run.media_item_ids_in_albums) + len(
+                run.media_item_ids_in_unchanged_albums
+            )
+            logger.debug(f"Media items in albums: {num_media_items_in_albums}")
+            self.event_bus.emit(
+                events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS, num_media_items_in_albums
+            )
+
+        is_waiting_for_album_scans = True
+        for media_item_id in self.__iter_media_item_ids_since(watermark):
+            if not is_waiting_for_album_scans:
+                yield media_item_id
+                continue
+
+            # Stop listing media items once too many of them are held
+            unchecked_media_item_ids.append(media_item_id)
+            if not have_albums_been_scanned(
+                len(unchecked_media_item_ids)
+                >= MAX_MEDIA_ITEM_IDS_WAITING_FOR_ALBUM_SCANS
+            ):
+                continue
 
+            is_waiting_for_album_scans = False
+            emit_found_media_items_in_albums()
+            yield from unchecked_media_item_ids
+            unchecked_media_item_ids = []
+
+        if is_waiting_for_album_scans:
+            have_albums_been_scanned(True)
+            emit_found_media_items_in_albums()
+            yield from unchecked_media_item_ids
+
+    def __iter_media_item_ids_since(self, watermark: datetime | None) -> Iterator[str]:
+        filters = None
+        if watermark is not None:
+            # Date filters are in whole days, so the watermark's day is listed
+            # again, up to a day from now to cover every time zone
+            end_date = datetime.now(timezone.utc) + timedelta(days=1)
+            filters = {
+                "dateFilter": {
+                    "ranges": [
+                        {
+                            "startDate": self.__get_date(watermark),
+                            "endDate": self.__get_date(end_date),
+                        }
+                    ]
+                }
+            }
+
+        fields = LIBRARY_MEDIA_ITEM_FIELDS if self.cleaner_state is not None else "id"
+        for media_item in self.gphoto_client.media_items().iter_media_items(
+            filters=filters, fields=fields
+        ):
+            creation_time = media_item.get("mediaMetadata", {}).get("creationTime")
+            if creation_time is not None:
+                creation_time = datetime.fromisoformat(creation_time)
+                if (
+                    self.__newest_creation_time is None
+                    or creation_time > self.__newest_creation_time
+                ):
+                    self.__newest_creation_time = creation_time
+
+            yield media_item["id"]
+
+    def __get_date(self, time: datetime) -> dict:
+        return {"year": time.year, "month": time.month, "day": time.day}
+
+    def __add_photos_to_trash_in_batches(
+        self, trash_album_id: str, media_item_ids: Iterator[str]
+    ) -> GPhotosCleanerResults:
+        num_media_items_to_trash = 0
+        media_item_ids_trashed: list[str] = []
+        running_batches: set[Future] = set()
+
+        def wait_for_batches(return_when: str):
+            nonlocal running_batches
+            done, running_batches = wait(running_batches, return_when=return_when)
+            for batch in done:
+                media_item_ids_trashed.extend(batch.result())
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_trash_batches_in_parallel
+        ) as executor:
+            media_item_ids_to_trash = []
+            for media_item_id in media_item_ids:
+                num_media_items_to_trash += 1
+                media_item_ids_to_trash.append(media_item_id)
+                if len(media_item_ids_to_trash) < MAX_MEDIA_ITEMS_LENGTH_PER_CALL:
+                    continue
+
+                # Keep the chunks waiting to be sent to a few at a time
+                if len(running_batches) >= self.max_trash_batches_in_parallel:
+                    wait_for_batches(FIRST_COMPLETED)
+
+                running_batches.add(
+                    executor.submit(
+                        self.__add_photos_to_trash,
+                        trash_album_id,
+                        media_item_ids_to_trash,
+                    )
+                )
+                media_item_ids_to_trash = []
+
+            if len(media_item_ids_to_trash) > 0:
+                running_batches.add(
+                    executor.submit(
+                        self.__add_photos_to_trash,
+                        trash_album_id,
+                        media_item_ids_to_trash,
+                    )
+                )
+
+            wait_for_batches(ALL_COMPLETED)
+
+        self.event_bus.emit(events.ADDED_MEDIA_ITEMS_TO_TRASH, media_item_ids_trashed)
+
+        return GPhotosCleanerResults(
+            num_media_items_trashed=len(media_item_ids_trashed),
+            num_media_items_failed_to_trash=(
+                num_media_items_to_trash - len(media_item_ids_trashed)
+            ),
+        )
+
+    def __add_photos_to_trash(
+        self, trash_album_id: str, media_item_ids: list[str]
+    ) -> list[str]:
+        self.__trash_batch_limiter.acquire(1)
+
+        # The client already retries failed requests, so report a chunk that
+        # still fails and move on to the rest of them
+        try:
             self.gphoto_client.albums().add_photos_to_album(
-                album_id, chunked_media_item_ids
+                trash_album_id, media_item_ids
+            )
+        except Exception as error:
+            logger.error(f"Failed to add {len(media_item_ids)} media items: {error}")
+            self.__emit(
+                events.FAILED_TO_ADD_MEDIA_ITEMS_TO_TRASH, media_item_ids, error
             )
+            return []
+
+        self.__emit(events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH, media_item_ids)
+        return media_item_ids
+
+    def __emit(self, event: str, *args):
+        # Chunks can be added from different threads, so emit one at a time
+        with self.__lock:
+            self.event_bus.emit(event, *args)
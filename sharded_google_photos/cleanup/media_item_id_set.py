@@ -0,0 +1,84 @@
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+
+# The number of new IDs that are sorted at a time, which bounds the number of
+# Python ints that exist at once while sorting
+SORT_CHUNK_SIZE = 64 * 1024
+
+
+class MediaItemIdSet:
+    """
+    A set of media item IDs that takes 8 bytes per ID, so that the IDs of
+    every media item in an account can be kept in memory.
+
+    Each ID is stored as a 64-bit hash in a sorted array, and looked up with a
+    binary search. Two IDs can have the same hash, but the chance of it is
+    tiny, and it only makes an ID look like it is in the set.
+
+    New IDs are sorted in place a chunk at a time, and then merged with the
+    sorted IDs into a new array, so sorting needs at most twice the memory of
+    the array.
+
+    Example:
+        >>> media_item_ids = MediaItemIdSet()
+        >>> media_item_ids.add("1")
+        >>> "1" in media_item_ids
+        True
+        >>> "2" in media_item_ids
+        False
+    """
+
+    def __init__(self):
+        self.__hashes = array("Q")
+
+        # The IDs after this many IDs are new, and are sorted on the first
+        # lookup after adding them
+        self.__num_sorted = 0
+
+    def add(self, media_item_id: str) -> None:
+        """
+        Adds a media item ID to the set.
+
+        Parameters:
+            media_item_id (str): the ID of the media item.
+        """
+        self.__hashes.append(self.__hash(media_item_id))
+
+    def __contains__(self, media_item_id: str) -> bool:
+        self.__sort_if_needed()
+        value = self.__hash(media_item_id)
+        i = bisect_left(self.__hashes, value)
+        return i < len(self.__hashes) and self.__hashes[i] == value
+
+    def __len__(self) -> int:
+        self.__sort_if_needed()
+        return len(self.__hashes)
+
+    def __sort_if_needed(self):
+        hashes = self.__hashes
+        if self.__num_sorted == len(hashes):
+            return
+
+        # Sort the new IDs in place, a chunk at a time
+        run_starts = [0] if self.__num_sorted > 0 else []
+        for start in range(self.__num_sorted, len(hashes), SORT_CHUNK_SIZE):
+            end = min(start + SORT_CHUNK_SIZE, len(hashes))
+            hashes[start:end] = array("Q", sorted(hashes[start:end]))
+            run_starts.append(start)
+
+        # Merge the sorted chunks without copying them, and drop the IDs of
+        # media items that are in many albums
+        view = memoryview(hashes)
+        runs = [
+            view[start:end]
+            for start, end in zip(run_starts, run_starts[1:] + [len(hashes)])
+        ]
+        self.__hashes = array("Q", (value for value, _ in groupby(heapq.merge(*runs))))
+        self.__num_sorted = len(self.__hashes)
+
+    def __hash(self, media_item_id: str) -> int:
+        digest = hashlib.blake2b(media_item_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
@@ -0,0 +1,161 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from event_bus import EventBus
+
+from . import events as cleaner_events
+from . import sharded_gphotos_cleaner_events as events
+from .cleaner_state import CleanerState
+from .gphotos_cleaner import (
+    DEFAULT_FULL_SCAN_INTERVAL,
+    GPhotosCleaner,
+    GPhotosCleanerResults,
+)
+from sharded_google_photos.shared.gphotos_client import GPhotosClient
+
+
+logger = logging.getLogger(__name__)
+
+# The events of each account's cleaner that are passed on to the shared event bus
+CLEANER_EVENTS = [
+    cleaner_events.FOUND_TRASH_ALBUM,
+    cleaner_events.CREATED_TRASH_ALBUM,
+    cleaner_events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS,
+    cleaner_events.ADDED_MEDIA_ITEMS_TO_TRASH,
+    cleaner_events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH,
+    cleaner_events.FAILED_TO_ADD_MEDIA_ITEMS_TO_TRASH,
+]
+
+
+@dataclass
+class ShardedGPhotosCleanerResults:
+    # The results of each account that was cleaned, by the account's name
+    account_results: dict[str, GPhotosCleanerResults] = field(default_factory=dict)
+
+    # The error of each account that could not be cleaned, by the account's name
+    account_errors: dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def num_media_items_trashed(self) -> int:
+        return sum(r.num_media_items_trashed for r in self.account_results.values())
+
+    @property
+    def num_media_items_failed_to_trash(self) -> int:
+        return sum(
+            r.num_media_items_failed_to_trash for r in self.account_results.values()
+        )
+
+
+class ShardedGPhotosCleaner:
+    """
+    Puts the photos that are not in a shared album into the "Trash" album of
+    each Google Photos account in a list of accounts, like GPhotosCleaner does
+    for one account.
+
+    Up to max_clients_in_parallel accounts are cleaned at the same time. The
+    other parameters are given to the GPhotosCleaner of each account.
+
+    Example:
+        >>> cleaner = ShardedGPhotosCleaner(
+        >>>     [GPhotosClient(...), GPhotosClient(...), ...],
+        >>>     max_clients_in_parallel=4,
+        >>> )
+        >>> results = cleaner.mark_unalbumed_photos_to_trash()
+        >>> results.num_media_items_trashed
+        120
+    """
+
+    def __init__(
+        self,
+        gphoto_clients: list[GPhotosClient],
+        event_bus: EventBus = None,
+        max_clients_in_parallel: int = 1,
+        max_albums_in_parallel: int = 1,
+        cleaner_state: CleanerState | None = None,
+        max_trash_batches_in_parallel: int = 1,
+        max_trash_batches_per_second: float | None = None,
+        full_scan_interval: timedelta | None = DEFAULT_FULL_SCAN_INTERVAL,
+    ):
+        self.gphoto_clients = gphoto_clients
+        self.event_bus = event_bus if event_bus is not None else EventBus()
+        self.max_clients_in_parallel = max_clients_in_parallel
+        self.max_albums_in_parallel = max_albums_in_parallel
+        self.cleaner_state = cleaner_state
+        self.max_trash_batches_in_parallel = max_trash_batches_in_parallel
+        self.max_trash_batches_per_second = max_trash_batches_per_second
+        self.full_scan_interval = full_scan_interval
+
+        self.__lock = threading.Lock()
+
+    def mark_unalbumed_photos_to_trash(self) -> ShardedGPhotosCleanerResults:
+        """
+        Finds all of the photos that are not in an album in each account, and
+        puts them in the account's "Trash" album.
+
+        An account that fails to be cleaned does not stop the other accounts
+        from being cleaned, and its error is in the results.
+
+        Returns:
+            ShardedGPhotosCleanerResults: the results of each account.
+        """
+        results = ShardedGPhotosCleanerResults()
+
+        with ThreadPoolExecutor(max_workers=self.max_clients_in_parallel) as executor:
+            for gphoto_client, account_result in zip(
+                self.gphoto_clients,
+                executor.map(self.__clean_account, self.gphoto_clients),
+            ):
+                if isinstance(account_result, GPhotosCleanerResults):
+                    results.account_results[gphoto_client.name] = account_result
+                else:
+                    results.account_errors[gphoto_client.name] = account_result
+
+        logger.debug(
+            f"Moved {results.num_media_items_trashed} media items to trash "
+            + f"in {len(results.account_results)} accounts"
+        )
+        return results
+
+    def __clean_account(
+        self, gphoto_client: GPhotosClient
+    ) -> GPhotosCleanerResults | Exception:
+        account = gphoto_client.name
+        self.__emit(events.STARTED_CLEANING_ACCOUNT, account)
+
+        # Pass on the events of the account's cleaner along with the account
+        account_event_bus = EventBus()
+        for event in CLEANER_EVENTS:
+            account_event_bus.add_event(self.__get_forwarder(account, event), event)
+
+        cleaner = GPhotosCleaner(
+            gphoto_client,
+            account_event_bus,
+            self.max_albums_in_parallel,
+            self.cleaner_state,
+            self.max_trash_batches_in_parallel,
+            self.max_trash_batches_per_second,
+            self.full_scan_interval,
+        )
+
+        try:
+            account_results = cleaner.mark_unalbumed_photos_to_trash()
+        except Exception as error:
+            logger.error(f"Failed to clean {account}: {error}")
+            self.__emit(events.FAILED_TO_CLEAN_ACCOUNT, account, error)
+            return error
+
+        self.__emit(events.FINISHED_CLEANING_ACCOUNT, account, account_results)
+        return account_results
+
+    def __get_forwarder(self, account: str, event: str):
+        def forward(*args):
+            self.__emit(event, account, *args)
+
+        return forward
+
+    def __emit(self, event: str, *args):
+        # Accounts are cleaned on different threads, so emit one at a time
+        with self.__lock:
+            self.event_bus.emit(event, *args)
@@ -0,0 +1,10 @@
+"""
+A module used to store events emitted from the ShardedGPhotosCleaner class.
+
+It also emits the events in the events module of each account it cleans,
+with the account's name before the rest of the event's arguments.
+"""
+
+STARTED_CLEANING_ACCOUNT = "sharded_cleanup:started_cleaning_account"
+FINISHED_CLEANING_ACCOUNT = "sharded_cleanup:finished_cleaning_account"
+FAILED_TO_CLEAN_ACCOUNT = "sharded_cleanup:failed_to_clean_account"
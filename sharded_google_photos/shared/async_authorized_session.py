@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import aiohttp
+
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import Request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 100
+
+# The exceptions that the async clients retry on, like RequestException for
+# the blocking clients
+RETRYABLE_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class AsyncAuthorizedSession:
+    """
+    A non-blocking counterpart of google.auth's AuthorizedSession.
+
+    It attaches the access token of the credentials to every request, and
+    refreshes the token when it has expired or when the server rejects it
+    with a 401. Responses are returned with their bodies already read, so
+    res.json(), res.text() and res.read() can be awaited after the call.
+
+    Example:
+        >>> session = AsyncAuthorizedSession(credentials)
+        >>> res = await session.get("https://photoslibrary.googleapis.com/v1/albums")
+        >>> res.raise_for_status()
+        >>> await res.json()
+    """
+
+    def __init__(
+        self,
+        credentials: Credentials,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ):
+        self.credentials = credentials
+        self.max_connections = max_connections
+
+        self._session: aiohttp.ClientSession | None = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def get(self, url: str, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, data=None, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request("POST", url, data=data, **kwargs)
+
+    async def patch(self, url: str, data=None, **kwargs) -> aiohttp.ClientResponse:
+        return await self.request("PATCH", url, data=data, **kwargs)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        data=None,
+        params: dict | None = None,
+        headers: dict | None = None,
+    ) -> aiohttp.ClientResponse:
+        if not self.credentials.valid:
+            await self._refresh_token(self.credentials.token)
+
+        params = self._to_query_params(params)
+
+        token = self.credentials.token
+        res = await self._send(method, url, data, params, headers, token)
+
+        if res.status == 401:
+            logger.debug(f"Got 401 for {url}. Refreshing token and retrying")
+            await self._refresh_token(token)
+            token = self.credentials.token
+            res = await self._send(method, url, data, params, headers, token)
+
+        return res
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        data,
+        params: dict | None,
+        headers: dict | None,
+        token: str,
+    ) -> aiohttp.ClientResponse:
+        request_headers = dict(headers) if headers is not None else {}
+        request_headers["Authorization"] = f"Bearer {token}"
+
+        async with self._get_session().request(
+            method, url, data=data, params=params, headers=request_headers
+        ) as res:
+            await res.read()
+
+        return res
+
+    async def _refresh_token(self, stale_token: str | None) -> None:
+        async with self._refresh_lock:
+            # Another request may have refreshed the token while we waited
+            if self.credentials.token != stale_token and self.credentials.valid:
+                return
+
+            logger.debug("Refreshing access token")
+            await asyncio.to_thread(self.credentials.refresh, Request())
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    def _to_query_params(self, params: dict | None) -> dict | None:
+        # Match requests: skip params that are None and stringify the rest
+        if params is None:
+            return None
+
+        return {key: str(val) for key, val in params.items() if val is not None}
@@ -0,0 +1,204 @@
+import json
+import logging
+from collections.abc import AsyncIterator
+import backoff
+
+from .async_authorized_session import AsyncAuthorizedSession, RETRYABLE_EXCEPTIONS
+from .gphotos_album_client import MAX_ALBUMS_PAGE_SIZE
+from .page_prefetcher import async_prefetch_pages, get_page_fields
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGPhotosAlbumClient:
+    """
+    The asyncio counterpart of GPhotosAlbumClient. It has the same methods,
+    except that they need to be awaited, and the iter_ methods need `async for`.
+    """
+
+    def __init__(self, session: AsyncAuthorizedSession):
+        self._session = session
+
+    async def list_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return [
+            album
+            async for album in self.iter_shared_albums(
+                exclude_non_app_created_data, fields
+            )
+        ]
+
+    async def iter_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ) -> AsyncIterator[dict]:
+        """Yields the shared albums while fetching the next page in the background"""
+        logger.debug("Listing albums")
+
+        async for album in async_prefetch_pages(
+            lambda page_token: self._list_shared_albums_in_pages(
+                page_token, exclude_non_app_created_data, fields
+            ),
+            "sharedAlbums",
+        ):
+            yield album
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _list_shared_albums_in_pages(
+        self,
+        page_token: str | None,
+        exclude_non_app_created_data: bool,
+        fields: str | None = None,
+    ):
+        uri = "https://photoslibrary.googleapis.com/v1/sharedAlbums"
+        params = {
+            "pageToken": page_token,
+            "pageSize": MAX_ALBUMS_PAGE_SIZE,
+            "excludeNonAppCreatedData": exclude_non_app_created_data,
+            "fields": get_page_fields("sharedAlbums", fields),
+        }
+        res = await self._session.get(uri, params=params)
+        res.raise_for_status()
+
+        return await res.json()
+
+    async def list_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return [
+            album
+            async for album in self.iter_albums(exclude_non_app_created_data, fields)
+        ]
+
+    async def iter_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ) -> AsyncIterator[dict]:
+        """Yields the albums while fetching the next page in the background"""
+        logger.debug("Listing albums")
+
+        async for album in async_prefetch_pages(
+            lambda page_token: self._list_albums_in_pages(
+                page_token, exclude_non_app_created_data, fields
+            ),
+            "albums",
+        ):
+            yield album
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _list_albums_in_pages(
+        self,
+        page_token: str | None,
+        exclude_non_app_created_data: bool,
+        fields: str | None = None,
+    ):
+        uri = "https://photoslibrary.googleapis.com/v1/albums"
+        params = {
+            "pageToken": page_token,
+            "pageSize": MAX_ALBUMS_PAGE_SIZE,
+            "excludeNonAppCreatedData": exclude_non_app_created_data,
+            "fields": get_page_fields("albums", fields),
+        }
+        res = await self._session.get(uri, params=params)
+        res.raise_for_status()
+
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def create_album(self, album_name: str):
+        logger.debug(f"Creating album {album_name}")
+
+        request_body = json.dumps({"album": {"title": album_name}})
+        uri = "https://photoslibrary.googleapis.com/v1/albums"
+        res = await self._session.post(uri, request_body)
+        res.raise_for_status()
+
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def update_album(
+        self,
+        album_id: str,
+        new_title: str | None = None,
+        new_cover_media_item_id: str | None = None,
+    ):
+        uri = f"https://photoslibrary.googleapis.com/v1/albums/{album_id}"
+
+        if new_title is not None and new_cover_media_item_id is not None:
+            uri += "?updateMask=title&updateMask=coverPhotoMediaItemId"
+        elif new_title is not None:
+            uri += "?updateMask=title"
+        elif new_cover_media_item_id is not None:
+            uri += "?updateMask=coverPhotoMediaItemId"
+
+        request = {"title": new_title, "coverPhotoMediaItemId": new_cover_media_item_id}
+        res = await self._session.patch(uri, json.dumps(request))
+        res.raise_for_status()
+
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def share_album(
+        self,
+        album_id: str,
+        is_collaborative: bool = False,
+        is_commentable: bool = False,
+    ):
+        logger.debug(f"Sharing album {album_id}")
+        request_body = json.dumps(
+            {
+                "sharedAlbumOptions": {
+                    "isCollaborative": is_collaborative,
+                    "isCommentable": is_commentable,
+                }
+            }
+        )
+        uri = "https://photoslibrary.googleapis.com/v1/albums/{0}:share".format(
+            album_id
+        )
+        res = await self._session.post(uri, request_body)
+        res.raise_for_status()
+
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def join_album(self, share_token: str):
+        logger.debug(f"Joining shared album {share_token}")
+
+        request_body = json.dumps({"shareToken": share_token})
+        uri = "https://photoslibrary.googleapis.com/v1/sharedAlbums:join"
+        res = await self._session.post(uri, request_body)
+        res.raise_for_status()
+
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def unshare_album(self, album_id: str):
+        logger.debug(f"Unsharing shared album {album_id}")
+
+        uri = "https://photoslibrary.googleapis.com/v1/albums/{0}:unshare".format(
+            album_id
+        )
+        res = await self._session.post(uri)
+        res.raise_for_status()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def add_photos_to_album(self, album_id: str, media_item_ids: list[str]):
+        logger.debug(f"Add photos to album {album_id} {media_item_ids}")
+
+        request_body = json.dumps({"mediaItemIds": media_item_ids})
+        uri = "https://photoslibrary.googleapis.com/v1/albums/{0}:batchAddMediaItems".format(
+            album_id
+        )
+        res = await self._session.post(uri, request_body)
+        res.raise_for_status()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def remove_photos_from_album(self, album_id: str, media_item_ids: list[str]):
+        logger.debug(f"Removing photos from album {album_id} {media_item_ids}")
+
+        request_body = json.dumps({"mediaItemIds": media_item_ids})
+        uri = "https://photoslibrary.googleapis.com/v1/albums/{0}:batchRemoveMediaItems".format(
+            album_id
+        )
+        res = await self._session.post(uri, request_body)
+        res.raise_for_status()
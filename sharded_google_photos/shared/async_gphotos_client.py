@@ -0,0 +1,77 @@
+import logging
+import backoff
+
+from .async_authorized_session import (
+    AsyncAuthorizedSession,
+    DEFAULT_MAX_CONNECTIONS,
+    RETRYABLE_EXCEPTIONS,
+)
+from .async_gphotos_album_client import AsyncGPhotosAlbumClient
+from .async_gphotos_mediaitem_client import AsyncGPhotosMediaItemClient
+from .bandwidth_limiter import BandwidthLimiter
+from .gphotos_client import GPhotosClient, DEFAULT_CLIENT_SECRETS_FILE, DEFAULT_SCOPES
+from .upload_session_journal import UploadSessionJournal
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGPhotosClient(GPhotosClient):
+    """
+    The asyncio counterpart of GPhotosClient.
+
+    Authentication works the same way as GPhotosClient and stays blocking,
+    but every call to Google Photos goes through a non-blocking session, so
+    many requests across many accounts can be in flight on one event loop.
+
+    Example:
+        >>> client = AsyncGPhotosClient("bob@gmail.com", "credentials-1.json")
+        >>> client.authenticate()
+        >>> await client.albums().list_shared_albums()
+        >>> await client.close()
+    """
+
+    def __init__(
+        self,
+        name,
+        creds_file,
+        client_secret=DEFAULT_CLIENT_SECRETS_FILE,
+        scopes=DEFAULT_SCOPES,
+        upload_session_journal: UploadSessionJournal | None = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        bandwidth_limiters: list[BandwidthLimiter] | None = None,
+    ):
+        super().__init__(
+            name,
+            creds_file,
+            client_secret,
+            scopes,
+            upload_session_journal,
+            bandwidth_limiters,
+        )
+        self.max_connections = max_connections
+
+    def authenticate(self):
+        credentials = self.__load_credentials__()
+        self.session = AsyncAuthorizedSession(credentials, self.max_connections)
+
+        self._albums_client = AsyncGPhotosAlbumClient(self.session)
+        self._media_items_client = AsyncGPhotosMediaItemClient(
+            self.session,
+            self.upload_session_journal,
+            self.bandwidth_limiters,
+            self.name,
+        )
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def get_storage_quota(self):
+        params = {"fields": "storageQuota"}
+        uri = "https://www.googleapis.com/drive/v3/about"
+        res = await self.session.get(uri, params=params)
+        res.raise_for_status()
+
+        return (await res.json())["storageQuota"]
+
+    async def close(self):
+        """Closes the underlying connections. Call it before the event loop ends."""
+        if self.session is not None:
+            await self.session.close()
@@ -0,0 +1,355 @@
+import json
+import logging
+import os
+import asyncio
+from collections.abc import AsyncIterator
+import aiohttp
+import backoff
+
+from google.auth.transport import DEFAULT_RETRYABLE_STATUS_CODES
+
+from .async_authorized_session import AsyncAuthorizedSession, RETRYABLE_EXCEPTIONS
+from .bandwidth_limiter import BandwidthLimiter
+from .file_chunk_reader import FileChunkReader
+from .mime_type_resolver import MimeTypeResolver
+from .upload_session_journal import UploadSession, UploadSessionJournal
+from .gphotos_mediaitem_client import (
+    DEFAULT_RETRYABLE_ERROR_CODES_FOR_UPLOADED_PHOTOS,
+    MAX_MEDIA_ITEMS_PAGE_SIZE,
+    IllegalStateException,
+)
+from .page_prefetcher import async_prefetch_pages, get_page_fields
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGPhotosMediaItemClient:
+    """
+    The asyncio counterpart of GPhotosMediaItemClient. It has the same methods,
+    except that they need to be awaited, and the iter_ methods need `async for`.
+    """
+
+    def __init__(
+        self,
+        session: AsyncAuthorizedSession,
+        upload_session_journal: UploadSessionJournal | None = None,
+        bandwidth_limiters: list[BandwidthLimiter] | None = None,
+        account: str = "",
+    ):
+        self._session = session
+        self._upload_session_journal = upload_session_journal
+        self._account = account
+        self._bandwidth_limiters = bandwidth_limiters or []
+        self._mime_type_resolver = MimeTypeResolver()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def add_uploaded_photos_to_gphotos(
+        self, upload_tokens: list[str], album_id: str | None = None
+    ):
+        logger.debug(f"Add uploaded photos {upload_tokens} to album {album_id}")
+
+        create_body = json.dumps(
+            {
+                "albumId": album_id,
+                "newMediaItems": [
+                    {
+                        "description": "",
+                        "simpleMediaItem": {"uploadToken": upload_token},
+                    }
+                    for upload_token in upload_tokens
+                ],
+            },
+            indent=4,
+        )
+
+        res = await self._session.post(
+            "https://photoslibrary.googleapis.com/v1/mediaItems:batchCreate",
+            create_body,
+        )
+        res.raise_for_status()
+        res_json = await res.json()
+
+        logger.debug(f"{res_json}")
+
+        new_media_items = []
+        for result in res_json["newMediaItemResults"]:
+            if result["status"]["message"] == "Success":
+                new_media_items.append(result)
+            else:
+                code = result["status"]["code"]
+                message = result["status"]["message"]
+
+                if code == 6:
+                    continue
+                elif code in DEFAULT_RETRYABLE_ERROR_CODES_FOR_UPLOADED_PHOTOS:
+                    raise aiohttp.ClientError(f"code: {code}, message: {message}")
+                else:
+                    raise ValueError(f"code: {code}, message: {message}")
+
+        return {"newMediaItemResults": new_media_items}
+
+    async def search_for_media_items(
+        self,
+        album_id: str | None = None,
+        filters: str | None = None,
+        order_by: str | None = None,
+        fields: str | None = None,
+    ):
+        return [
+            media_item
+            async for media_item in self.iter_media_items(
+                album_id, filters, order_by, fields
+            )
+        ]
+
+    async def iter_media_items(
+        self,
+        album_id: str | None = None,
+        filters: str | None = None,
+        order_by: str | None = None,
+        fields: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """Yields the media items while fetching the next page in the background"""
+        logger.debug(
+            f"Listing media items with filter album_id={album_id} "
+            + f"filters={filters} order_by={order_by}"
+        )
+
+        async for media_item in async_prefetch_pages(
+            lambda page_token: self._search_media_items_in_pages(
+                album_id, filters, order_by, page_token, fields
+            ),
+            "mediaItems",
+        ):
+            yield media_item
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _search_media_items_in_pages(
+        self,
+        album_id: str | None,
+        filters: object | None,
+        order_by: object | None,
+        page_token: str | None,
+        fields: str | None = None,
+    ):
+        res = await self._session.post(
+            "https://photoslibrary.googleapis.com/v1/mediaItems:search",
+            json.dumps(
+                {
+                    "albumId": album_id,
+                    "filters": filters,
+                    "orderBy": order_by,
+                    "pageToken": page_token,
+                    "pageSize": MAX_MEDIA_ITEMS_PAGE_SIZE,
+                }
+            ),
+            params={"fields": get_page_fields("mediaItems", fields)},
+        )
+        res.raise_for_status()
+        return await res.json()
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def upload_photo(self, photo_file_path: str, file_name: str):
+        logger.debug(f"Uploading photo {photo_file_path}")
+
+        headers = {
+            "Content-type": "application/octet-stream",
+            "X-Goog-Upload-Protocol": "raw",
+            "X-Goog-Upload-File-Name": file_name,
+        }
+
+        await self._wait_for_bandwidth(os.stat(photo_file_path).st_size)
+
+        # Stream the file from disk instead of reading all of it into memory
+        with open(photo_file_path, mode="rb") as photo_file:
+            res = await self._session.post(
+                "https://photoslibrary.googleapis.com/v1/uploads",
+                photo_file,
+                headers=headers,
+            )
+        res.raise_for_status()
+
+        return (await res.read()).decode()
+
+    @backoff.on_exception(backoff.expo, (IllegalStateException), max_time=60)
+    async def upload_photo_in_chunks(
+        self,
+        photo_file_path: str,
+        file_name: str,
+    ):
+        upload_token = None
+        file_size_in_bytes = os.stat(photo_file_path).st_size
+
+        logger.debug(
+            f"Uploading {photo_file_path} in chunks ({file_size_in_bytes} bytes)"
+        )
+
+        upload_url, chunk_size, cur_offset = await self._start_or_resume_chunked_upload(
+            photo_file_path, file_name, file_size_in_bytes
+        )
+
+        logger.debug(f"Obtained upload url and chunk size: {upload_url} {chunk_size}")
+
+        with FileChunkReader(photo_file_path, chunk_size) as reader:
+            while cur_offset < file_size_in_bytes:
+                chunk = await asyncio.to_thread(reader.read_chunk, cur_offset)
+                chunk_read = len(chunk)
+                if chunk_read == 0:
+                    raise IllegalStateException(f"{photo_file_path} got smaller")
+
+                is_last_chunk = cur_offset + chunk_read >= file_size_in_bytes
+
+                logger.debug(
+                    f"Uploading chunk: {cur_offset} {chunk_read} {is_last_chunk}"
+                )
+
+                res_2 = await self._upload_photo_chunk(
+                    upload_url, cur_offset, chunk, is_last_chunk
+                )
+
+                if res_2.status != 200:
+                    logger.error(
+                        f"Failed uploading chunk: {res_2.status} {await res_2.read()}"
+                    )
+
+                    req_3 = await self._query_chunked_upload(upload_url)
+                    upload_status = req_3.headers["X-Goog-Upload-Status"]
+                    size_received = int(req_3.headers["X-Goog-Upload-Size-Received"])
+
+                    if upload_status != "active":
+                        await self._remove_upload_session(photo_file_path)
+                        raise IllegalStateException("Upload is no longer active")
+
+                    logger.debug(f"Adjusted seek to {size_received}")
+                    cur_offset = size_received
+                    continue
+
+                cur_offset += chunk_read
+
+                if is_last_chunk:
+                    upload_token = (await res_2.read()).decode()
+
+        await self._remove_upload_session(photo_file_path)
+        logger.debug(f"Chunk uploading finished: {photo_file_path}")
+
+        return upload_token
+
+    async def _start_or_resume_chunked_upload(
+        self, photo_file_path: str, file_name: str, file_size_in_bytes: int
+    ) -> tuple[str, int, int]:
+        """Returns the upload url, chunk size, and the offset to upload from"""
+        if self._upload_session_journal is not None:
+            session = await asyncio.to_thread(
+                self._upload_session_journal.get_session,
+                self._account,
+                photo_file_path,
+            )
+
+            if session is not None:
+                size_received = await self._get_size_received_by_chunked_upload(
+                    session.upload_url
+                )
+
+                if size_received is not None and size_received < file_size_in_bytes:
+                    logger.debug(
+                        f"Resuming upload of {photo_file_path} from {size_received}"
+                    )
+                    return session.upload_url, session.chunk_size, size_received
+
+        mime_type = await self._get_mime_type(photo_file_path)
+        res = await self._initialize_chunked_upload(
+            mime_type, file_name, file_size_in_bytes
+        )
+        upload_url = res.headers["X-Goog-Upload-URL"]
+        chunk_size = int(res.headers["X-Goog-Upload-Chunk-Granularity"])
+
+        if self._upload_session_journal is not None:
+            await asyncio.to_thread(
+                self._upload_session_journal.save_session,
+                self._account,
+                photo_file_path,
+                UploadSession(upload_url, chunk_size),
+            )
+
+        return upload_url, chunk_size, 0
+
+    async def _get_size_received_by_chunked_upload(self, upload_url: str) -> int | None:
+        """Returns the bytes received by an earlier upload, or None if it can't resume"""
+        headers = {"Content-Length": "0", "X-Goog-Upload-Command": "query"}
+        try:
+            res = await self._session.post(upload_url, headers=headers)
+        except RETRYABLE_EXCEPTIONS:
+            return None
+
+        if res.status != 200:
+            return None
+
+        if res.headers.get("X-Goog-Upload-Status") != "active":
+            return None
+
+        return int(res.headers["X-Goog-Upload-Size-Received"])
+
+    async def _remove_upload_session(self, photo_file_path: str):
+        if self._upload_session_journal is not None:
+            await asyncio.to_thread(
+                self._upload_session_journal.remove_session,
+                self._account,
+                photo_file_path,
+            )
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _initialize_chunked_upload(
+        self, mime_type: str, file_name: str, file_size_in_bytes: int
+    ):
+        headers = {
+            "Content-Length": "0",
+            "X-Goog-Upload-Command": "start",
+            "X-Goog-Upload-Content-Type": mime_type,
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-File-Name": file_name,
+            "X-Goog-Upload-Raw-Size": str(file_size_in_bytes),
+        }
+        res = await self._session.post(
+            "https://photoslibrary.googleapis.com/v1/uploads", headers=headers
+        )
+        res.raise_for_status()
+
+        return res
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _upload_photo_chunk(
+        self, upload_url: str, cur_offset: int, chunk: memoryview, is_last_chunk: bool
+    ):
+        headers = {
+            "X-Goog-Upload-Command": "upload, finalize" if is_last_chunk else "upload",
+            "X-Goog-Upload-Offset": str(cur_offset),
+        }
+        await self._wait_for_bandwidth(len(chunk))
+        res = await self._session.post(upload_url, chunk, headers=headers)
+        if res.status in DEFAULT_RETRYABLE_STATUS_CODES:
+            res.raise_for_status()
+
+        return res
+
+    @backoff.on_exception(backoff.expo, RETRYABLE_EXCEPTIONS, max_time=60)
+    async def _query_chunked_upload(self, upload_url):
+        headers = {"Content-Length": "0", "X-Goog-Upload-Command": "query"}
+        res = await self._session.post(upload_url, headers=headers)
+        res.raise_for_status()
+
+        return res
+
+    async def _wait_for_bandwidth(self, num_bytes: int):
+        # Reserve the bytes from every limiter, then wait for the slowest one
+        seconds_to_wait = max(
+            (limiter.reserve(num_bytes) for limiter in self._bandwidth_limiters),
+            default=0,
+        )
+        if seconds_to_wait > 0:
+            logger.debug(f"Throttling upload of {num_bytes} bytes")
+            await asyncio.sleep(seconds_to_wait)
+
+    async def _get_mime_type(self, file_path):
+        return await asyncio.to_thread(
+            self._mime_type_resolver.get_mime_type, file_path
+        )
@@ -0,0 +1,106 @@
+import time
+import threading
+
+
+class BandwidthLimiter:
+    """
+    A token bucket that limits how many bytes per second can be uploaded.
+
+    Uploads reserve bytes before sending them and wait for as long as the
+    reservation says. Reservations are handed out in order, so uploads that
+    share a limiter take turns instead of one of them using all of the
+    bandwidth. Give the same limiter to many GPhotosClients to limit them
+    together, or a different limiter to each one to limit them separately.
+
+    Example:
+        >>> limiter = BandwidthLimiter(1024 * 1024)
+        >>> limiter.acquire(256 * 1024)  # Returns once 256 KB can be sent
+        >>> limiter.set_bytes_per_second(None)  # Removes the limit
+    """
+
+    def __init__(self, bytes_per_second: float | None):
+        self.__check_bytes_per_second(bytes_per_second)
+        self.__lock = threading.Lock()
+        self.__bytes_per_second = bytes_per_second
+        self.__num_tokens = bytes_per_second if bytes_per_second is not None else 0
+        self.__last_refill_time = time.monotonic()
+
+    def get_bytes_per_second(self) -> float | None:
+        """
+        Returns the limit, or None if there is no limit.
+
+        Returns:
+            float | None: the number of bytes that can be sent per second.
+        """
+        return self.__bytes_per_second
+
+    def set_bytes_per_second(self, bytes_per_second: float | None) -> None:
+        """
+        Changes the limit. It can be called while uploads are running.
+
+        Parameters:
+            bytes_per_second (float | None): the new limit, or None for no limit.
+
+        Raises:
+            ValueError: if the limit is not positive.
+        """
+        self.__check_bytes_per_second(bytes_per_second)
+        with self.__lock:
+            self.__refill()
+            self.__bytes_per_second = bytes_per_second
+
+            if bytes_per_second is None:
+                self.__num_tokens = 0
+            else:
+                self.__num_tokens = min(self.__num_tokens, bytes_per_second)
+
+    def reserve(self, num_bytes: int) -> float:
+        """
+        Reserves bytes to send, and returns how long to wait before sending them.
+
+        Parameters:
+            num_bytes (int): the number of bytes to send.
+
+        Returns:
+            float: the number of seconds to wait.
+        """
+        with self.__lock:
+            if self.__bytes_per_second is None:
+                return 0
+
+            self.__refill()
+            self.__num_tokens -= num_bytes
+
+            if self.__num_tokens >= 0:
+                return 0
+
+            return -self.__num_tokens / self.__bytes_per_second
+
+    def acquire(self, num_bytes: int) -> None:
+        """
+        Blocks until bytes can be sent.
+
+        Parameters:
+            num_bytes (int): the number of bytes to send.
+        """
+        seconds_to_wait = self.reserve(num_bytes)
+        if seconds_to_wait > 0:
+            time.sleep(seconds_to_wait)
+
+    def __check_bytes_per_second(self, bytes_per_second: float | None):
+        # Waits are worked out from the limit, so a limit of 0 would never end
+        if bytes_per_second is not None and bytes_per_second <= 0:
+            raise ValueError(
+                f"Bytes per second must be positive or None, not {bytes_per_second}"
+            )
+
+    def __refill(self):
+        now = time.monotonic()
+        elapsed_seconds = now - self.__last_refill_time
+        self.__last_refill_time = now
+
+        if self.__bytes_per_second is not None:
+            self.__num_tokens = min(
+                self.__bytes_per_second,
+                self.__num_tokens + elapsed_seconds * self.__bytes_per_second,
+            )
@@ -0,0 +1,122 @@
+import asyncio
+import inspect
+import threading
+from collections.abc import AsyncGenerator
+
+from .async_gphotos_client import AsyncGPhotosClient
+
+
+def start_event_loop_in_background() -> asyncio.AbstractEventLoop:
+    """
+    Starts a new event loop that runs forever in a daemon thread.
+
+    Returns:
+        asyncio.AbstractEventLoop: the running event loop.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    return loop
+
+
+class _BlockingProxy:
+    """
+    Wraps an object so that calling its coroutine methods blocks until they
+    finish, and its async generator methods become regular generators.
+    """
+
+    def __init__(self, target, loop: asyncio.AbstractEventLoop):
+        self._target = target
+        self._loop = loop
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if inspect.isasyncgenfunction(attr):
+
+            def iterate_and_wait(*args, **kwargs):
+                return self._iterate(attr(*args, **kwargs))
+
+            return iterate_and_wait
+
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        def call_and_wait(*args, **kwargs):
+            return self._wait(attr(*args, **kwargs))
+
+        return call_and_wait
+
+    def _wait(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _iterate(self, async_generator: AsyncGenerator):
+        # run_coroutine_threadsafe() only takes coroutines, not other awaitables
+        async def get_next():
+            return await async_generator.__anext__()
+
+        async def close():
+            await async_generator.aclose()
+
+        try:
+            while True:
+                try:
+                    yield self._wait(get_next())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Let the async generator clean up if the caller stopped early
+            self._wait(close())
+
+
+class BlockingGPhotosClient:
+    """
+    Exposes an AsyncGPhotosClient through the same blocking interface as
+    GPhotosClient, so it can be given to GPhotosBackup, GPhotosUploader, and
+    GPhotosCleaner.
+
+    The requests run on an event loop in a background thread. Clients that
+    share the same loop share it for all of their requests, so uploading from
+    many threads across many accounts does not need a connection per thread.
+
+    Example:
+        >>> loop = start_event_loop_in_background()
+        >>> clients = [
+        >>>     BlockingGPhotosClient(AsyncGPhotosClient(...), loop),
+        >>>     BlockingGPhotosClient(AsyncGPhotosClient(...), loop),
+        >>> ]
+        >>> for client in clients:
+        >>>     client.authenticate()
+        >>> GPhotosBackup(clients).backup(diffs)
+    """
+
+    def __init__(
+        self,
+        async_client: AsyncGPhotosClient,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        self.async_client = async_client
+        self.name = async_client.name
+        self.loop = loop if loop is not None else start_event_loop_in_background()
+
+        self._client = _BlockingProxy(async_client, self.loop)
+        self._albums_client: _BlockingProxy | None = None
+        self._media_items_client: _BlockingProxy | None = None
+
+    def authenticate(self):
+        self.async_client.authenticate()
+        self._albums_client = _BlockingProxy(self.async_client.albums(), self.loop)
+        self._media_items_client = _BlockingProxy(
+            self.async_client.media_items(), self.loop
+        )
+
+    def get_storage_quota(self):
+        return self._client.get_storage_quota()
+
+    def close(self):
+        self._client.close()
+
+    def albums(self):
+        return self._albums_client
+
+    def media_items(self):
+        return self._media_items_client
@@ -0,0 +1,55 @@
+import io
+
+
+class FileChunkReader:
+    """
+    Reads chunks of a file into one reusable buffer.
+
+    Each chunk is a memoryview over that buffer, so reading a chunk does not
+    allocate a new bytes object and no more than chunk_size bytes of the file
+    are held in memory at once. A chunk is only valid until the next call to
+    read_chunk().
+
+    Example:
+        >>> with FileChunkReader("video.mp4", 262144) as reader:
+        >>>     chunk = reader.read_chunk(0)
+        >>>     len(chunk)
+        262144
+    """
+
+    def __init__(self, file_path: str, chunk_size: int):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+
+        self.__file_obj: io.BufferedReader | None = None
+        self.__buffer = bytearray(chunk_size)
+        self.__buffer_view = memoryview(self.__buffer)
+
+    def __enter__(self):
+        self.__file_obj = open(self.file_path, "rb")
+        return self
+
+    def __exit__(self, exc, value, tb):
+        if self.__file_obj is not None:
+            self.__file_obj.close()
+            self.__file_obj = None
+
+    def read_chunk(self, offset: int) -> memoryview:
+        """
+        Reads up to chunk_size bytes of the file, starting at an offset.
+
+        Parameters:
+            offset (int): the position in the file to start reading from.
+
+        Returns:
+            memoryview: the bytes read, which is empty at the end of the file.
+
+        Raises:
+            Exception: if the file has not been opened with a with statement.
+        """
+        if self.__file_obj is None:
+            raise Exception("The file needs to be opened with a with statement first")
+
+        self.__file_obj.seek(offset, 0)
+        num_bytes_read = self.__file_obj.readinto(self.__buffer)
+        return self.__buffer_view[:num_bytes_read]
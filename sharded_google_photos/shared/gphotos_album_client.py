@@ -1,83 +1,91 @@
 import json
 import logging
+from collections.abc import Iterator
 import backoff
 from requests.exceptions import RequestException
 
 from google.auth.transport.requests import AuthorizedSession
 
+from .page_prefetcher import get_page_fields, prefetch_pages
+
 logger = logging.getLogger(__name__)
 
+# The most albums that Google Photos returns in one page
+MAX_ALBUMS_PAGE_SIZE = 50
+
 
 class GPhotosAlbumClient:
     def __init__(self, session: AuthorizedSession):
         self._session = session
 
-    def list_shared_albums(self, exclude_non_app_created_data: bool = False):
-        logger.debug("Listing albums")
-
-        albums = []
-        cur_page_token = None
-        while True:
-            res_body = self._list_shared_albums_in_pages(
-                cur_page_token, exclude_non_app_created_data
-            )
-
-            if "sharedAlbums" not in res_body:
-                break
-
-            albums += res_body["sharedAlbums"]
+    def list_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return list(self.iter_shared_albums(exclude_non_app_created_data, fields))
 
-            if "nextPageToken" in res_body:
-                cur_page_token = res_body["nextPageToken"]
-            else:
-                break
+    def iter_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ) -> Iterator[dict]:
+        """Yields the shared albums while fetching the next page in the background"""
+        logger.debug("Listing albums")
 
-        return albums
+        return prefetch_pages(
+            lambda page_token: self._list_shared_albums_in_pages(
+                page_token, exclude_non_app_created_data, fields
+            ),
+            "sharedAlbums",
+        )
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _list_shared_albums_in_pages(
-        self, page_token: str | None, exclude_non_app_created_data: bool
+        self,
+        page_token: str | None,
+        exclude_non_app_created_data: bool,
+        fields: str | None = None,
     ):
         uri = "https://photoslibrary.googleapis.com/v1/sharedAlbums"
         params = {
             "pageToken": page_token,
+            "pageSize": MAX_ALBUMS_PAGE_SIZE,
             "excludeNonAppCreatedData": exclude_non_app_created_data,
+            "fields": get_page_fields("sharedAlbums", fields),
         }
         res = self._session.get(uri, params=params)
         res.raise_for_status()
 
         return res.json()
 
-    def list_albums(self, exclude_non_app_created_data: bool = False):
-        logger.debug("Listing albums")
-
-        albums = []
-        cur_page_token = None
-        while True:
-            res_json = self._list_albums_in_pages(
-                cur_page_token, exclude_non_app_created_data
-            )
-
-            if "albums" not in res_json:
-                break
-
-            albums += res_json["albums"]
+    def list_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return list(self.iter_albums(exclude_non_app_created_data, fields))
 
-            if "nextPageToken" in res_json:
-                cur_page_token = res_json["nextPageToken"]
-            else:
-                break
+    def iter_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ) -> Iterator[dict]:
+        """Yields the albums while fetching the next page in the background"""
+        logger.debug("Listing albums")
 
-        return albums
+        return prefetch_pages(
+            lambda page_token: self._list_albums_in_pages(
+                page_token, exclude_non_app_created_data, fields
+            ),
+            "albums",
+        )
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _list_albums_in_pages(
-        self, page_token: str | None, exclude_non_app_created_data: bool
+        self,
+        page_token: str | None,
+        exclude_non_app_created_data: bool,
+        fields: str | None = None,
     ):
         uri = "https://photoslibrary.googleapis.com/v1/albums"
         params = {
             "pageToken": page_token,
+            "pageSize": MAX_ALBUMS_PAGE_SIZE,
             "excludeNonAppCreatedData": exclude_non_app_created_data,
+            "fields": get_page_fields("albums", fields),
         }
         res = self._session.get(uri, params=params)
         res.raise_for_status()
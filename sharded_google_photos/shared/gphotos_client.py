@@ -7,8 +7,10 @@ from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import AuthorizedSession
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from sharded_google_photos.shared.bandwidth_limiter import BandwidthLimiter
 from sharded_google_photos.shared.gphotos_album_client import GPhotosAlbumClient
 from sharded_google_photos.shared.gphotos_mediaitem_client import GPhotosMediaItemClient
+from sharded_google_photos.shared.upload_session_journal import UploadSessionJournal
 
 logger = logging.getLogger(__name__)
 
@@ -30,17 +32,37 @@ class GPhotosClient:
         creds_file,
         client_secret=DEFAULT_CLIENT_SECRETS_FILE,
         scopes=DEFAULT_SCOPES,
+        upload_session_journal: UploadSessionJournal | None = None,
+        bandwidth_limiters: list[BandwidthLimiter] | None = None,
     ):
         self.name = name
         self.creds_file = creds_file
         self.client_secret = client_secret
         self.scopes = scopes
+        self.upload_session_journal = upload_session_journal
 
-        self.session: AuthorizedSession = None
-        self._albums_client: GPhotosAlbumClient = None
-        self._media_items_client: GPhotosMediaItemClient = None
+        # Uploads wait on every limiter, so share one limiter across clients to
+        # cap all of them together and give a client its own to cap it alone
+        self.bandwidth_limiters = bandwidth_limiters or []
+
+        self.session: AuthorizedSession | None = None
+        self._albums_client: GPhotosAlbumClient | None = None
+        self._media_items_client: GPhotosMediaItemClient | None = None
 
     def authenticate(self):
+        credentials = self.__load_credentials__()
+        self.session = AuthorizedSession(credentials)
+
+        self._albums_client = GPhotosAlbumClient(self.session)
+        self._media_items_client = GPhotosMediaItemClient(
+            self.session,
+            self.upload_session_journal,
+            self.bandwidth_limiters,
+            self.name,
+        )
+
+    def __load_credentials__(self) -> Credentials:
+        """Get the saved credentials, or new ones via oauth, and save them"""
         credentials = None
         try:
             credentials = self.__get_saved_credentials__()
@@ -50,10 +72,7 @@ class GPhotosClient:
             credentials = self.__get_credentials_via_oauth__()
 
         self.__save_credentials__(credentials)
-        self.session = AuthorizedSession(credentials)
-
-        self._albums_client = GPhotosAlbumClient(self.session)
-        self._media_items_client = GPhotosMediaItemClient(self.session)
+        return credentials
 
     def __get_saved_credentials__(self):
         """Read in any saved OAuth data/tokens"""
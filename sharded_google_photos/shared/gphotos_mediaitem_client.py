@@ -1,15 +1,25 @@
 import json
 import logging
 import os
+import time
+from collections.abc import Iterator
 import backoff
-import magic
 from requests.exceptions import HTTPError, RequestException
 
 from google.auth.transport.requests import AuthorizedSession
 from google.auth.transport import DEFAULT_RETRYABLE_STATUS_CODES
 
+from .bandwidth_limiter import BandwidthLimiter
+from .file_chunk_reader import FileChunkReader
+from .mime_type_resolver import MimeTypeResolver
+from .page_prefetcher import get_page_fields, prefetch_pages
+from .upload_session_journal import UploadSession, UploadSessionJournal
+
 logger = logging.getLogger(__name__)
 
+# The most media items that Google Photos returns in one page
+MAX_MEDIA_ITEMS_PAGE_SIZE = 100
+
 DEFAULT_RETRYABLE_ERROR_CODES_FOR_UPLOADED_PHOTOS = set(
     [
         1,  # Cancelled
@@ -50,8 +60,18 @@ class IllegalStateException(ValueError):
 
 
 class GPhotosMediaItemClient:
-    def __init__(self, session: AuthorizedSession):
+    def __init__(
+        self,
+        session: AuthorizedSession,
+        upload_session_journal: UploadSessionJournal | None = None,
+        bandwidth_limiters: list[BandwidthLimiter] | None = None,
+        account: str = "",
+    ):
         self._session = session
+        self._upload_session_journal = upload_session_journal
+        self._account = account
+        self._bandwidth_limiters = bandwidth_limiters or []
+        self._mime_type_resolver = MimeTypeResolver()
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def add_uploaded_photos_to_gphotos(
@@ -100,32 +120,33 @@ class GPhotosMediaItemClient:
         return {"newMediaItemResults": new_media_items}
 
     def search_for_media_items(
-        self, album_id: str = None, filters: str = None, order_by: str = None
+        self,
+        album_id: str = None,
+        filters: str = None,
+        order_by: str = None,
+        fields: str | None = None,
     ):
+        return list(self.iter_media_items(album_id, filters, order_by, fields))
+
+    def iter_media_items(
+        self,
+        album_id: str | None = None,
+        filters: str | None = None,
+        order_by: str | None = None,
+        fields: str | None = None,
+    ) -> Iterator[dict]:
+        """Yields the media items while fetching the next page in the background"""
         logger.debug(
             f"Listing media items with filter album_id={album_id} "
             + f"filters={filters} order_by={order_by}"
         )
 
-        page_token = None
-        media_items = []
-        while True:
-            res = self._search_media_items_in_pages(
-                album_id, filters, order_by, page_token
-            )
-            res_body = res.json()
-
-            if "mediaItems" not in res_body:
-                break
-
-            media_items += res_body["mediaItems"]
-
-            if "nextPageToken" in res_body:
-                page_token = res_body["nextPageToken"]
-            else:
-                break
-
-        return media_items
+        return prefetch_pages(
+            lambda page_token: self._search_media_items_in_pages(
+                album_id, filters, order_by, page_token, fields
+            ).json(),
+            "mediaItems",
+        )
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _search_media_items_in_pages(
@@ -134,6 +155,7 @@ class GPhotosMediaItemClient:
         filters: object | None,
         order_by: object | None,
         page_token: str | None,
+        fields: str | None = None,
     ):
         res = self._session.post(
             "https://photoslibrary.googleapis.com/v1/mediaItems:search",
@@ -143,8 +165,10 @@ class GPhotosMediaItemClient:
                     "filters": filters,
                     "orderBy": order_by,
                     "pageToken": page_token,
+                    "pageSize": MAX_MEDIA_ITEMS_PAGE_SIZE,
                 }
             ),
+            params={"fields": get_page_fields("mediaItems", fields)},
         )
         res.raise_for_status()
         return res
@@ -153,16 +177,21 @@ class GPhotosMediaItemClient:
     def upload_photo(self, photo_file_path: str, file_name: str):
         logger.debug(f"Uploading photo {photo_file_path}")
 
-        photo_file = open(photo_file_path, mode="rb")
-        photo_bytes = photo_file.read()
+        headers = {
+            "Content-type": "application/octet-stream",
+            "X-Goog-Upload-Protocol": "raw",
+            "X-Goog-Upload-File-Name": file_name,
+        }
 
-        self._session.headers["Content-type"] = "application/octet-stream"
-        self._session.headers["X-Goog-Upload-Protocol"] = "raw"
-        self._session.headers["X-Goog-Upload-File-Name"] = file_name
+        self._wait_for_bandwidth(os.stat(photo_file_path).st_size)
 
-        res = self._session.post(
-            "https://photoslibrary.googleapis.com/v1/uploads", photo_bytes
-        )
+        # Stream the file from disk instead of reading all of it into memory
+        with open(photo_file_path, mode="rb") as photo_file:
+            res = self._session.post(
+                "https://photoslibrary.googleapis.com/v1/uploads",
+                photo_file,
+                headers=headers,
+            )
         res.raise_for_status()
 
         return res.content.decode()
@@ -174,31 +203,26 @@ class GPhotosMediaItemClient:
         file_name: str,
     ):
         upload_token = None
-        mime_type = self._get_mime_type(photo_file_path)
         file_size_in_bytes = os.stat(photo_file_path).st_size
 
         logger.debug(
-            f"Uploading {photo_file_path} in chunks ({mime_type}, {file_size_in_bytes} bytes)"
+            f"Uploading {photo_file_path} in chunks ({file_size_in_bytes} bytes)"
         )
 
-        res_1 = self._initialize_chunked_upload(
-            mime_type, file_name, file_size_in_bytes
+        upload_url, chunk_size, cur_offset = self._start_or_resume_chunked_upload(
+            photo_file_path, file_name, file_size_in_bytes
         )
-        upload_url = res_1.headers["X-Goog-Upload-URL"]
-        chunk_size = int(res_1.headers["X-Goog-Upload-Chunk-Granularity"])
 
         logger.debug(f"Obtained upload url and chunk size: {upload_url} {chunk_size}")
 
-        num_bytes_uploaded = 0
-        with open(photo_file_path, "rb") as file_obj:
-            cur_offset = 0
-            chunk = file_obj.read(chunk_size)
-            while chunk:
+        with FileChunkReader(photo_file_path, chunk_size) as reader:
+            while cur_offset < file_size_in_bytes:
+                chunk = reader.read_chunk(cur_offset)
                 chunk_read = len(chunk)
-                next_chunk = file_obj.read(chunk_size)
+                if chunk_read == 0:
+                    raise IllegalStateException(f"{photo_file_path} got smaller")
 
-                # If there is no more chunks to read, then [chunk] is the last chunk
-                is_last_chunk = not next_chunk
+                is_last_chunk = cur_offset + chunk_read >= file_size_in_bytes
 
                 logger.debug(
                     f"Uploading chunk: {cur_offset} {chunk_read} {is_last_chunk}"
@@ -218,50 +242,104 @@ class GPhotosMediaItemClient:
                     size_received = int(req_3.headers["X-Goog-Upload-Size-Received"])
 
                     if upload_status != "active":
+                        self._remove_upload_session(photo_file_path)
                         raise IllegalStateException("Upload is no longer active")
 
                     logger.debug(f"Adjusted seek to {size_received}")
-                    file_obj.seek(size_received, 0)
                     cur_offset = size_received
-                    next_chunk = file_obj.read(chunk_size)
-                else:
-                    cur_offset += chunk_read
-                    num_bytes_uploaded += chunk_read
+                    continue
+
+                cur_offset += chunk_read
 
                 if is_last_chunk:
                     upload_token = res_2.content.decode()
 
-                chunk = next_chunk
-
+        self._remove_upload_session(photo_file_path)
         logger.debug(f"Chunk uploading finished: {photo_file_path}")
 
         return upload_token
 
+    def _start_or_resume_chunked_upload(
+        self, photo_file_path: str, file_name: str, file_size_in_bytes: int
+    ) -> tuple[str, int, int]:
+        """Returns the upload url, chunk size, and the offset to upload from"""
+        if self._upload_session_journal is not None:
+            session = self._upload_session_journal.get_session(
+                self._account, photo_file_path
+            )
+
+            if session is not None:
+                size_received = self._get_size_received_by_chunked_upload(
+                    session.upload_url
+                )
+
+                if size_received is not None and size_received < file_size_in_bytes:
+                    logger.debug(
+                        f"Resuming upload of {photo_file_path} from {size_received}"
+                    )
+                    return session.upload_url, session.chunk_size, size_received
+
+        mime_type = self._get_mime_type(photo_file_path)
+        res = self._initialize_chunked_upload(mime_type, file_name, file_size_in_bytes)
+        upload_url = res.headers["X-Goog-Upload-URL"]
+        chunk_size = int(res.headers["X-Goog-Upload-Chunk-Granularity"])
+
+        if self._upload_session_journal is not None:
+            self._upload_session_journal.save_session(
+                self._account, photo_file_path, UploadSession(upload_url, chunk_size)
+            )
+
+        return upload_url, chunk_size, 0
+
+    def _get_size_received_by_chunked_upload(self, upload_url: str) -> int | None:
+        """Returns the bytes received by an earlier upload, or None if it can't resume"""
+        headers = {"Content-Length": "0", "X-Goog-Upload-Command": "query"}
+        try:
+            res = self._session.post(upload_url, headers=headers)
+        except RequestException:
+            return None
+
+        if res.status_code != 200:
+            return None
+
+        if res.headers.get("X-Goog-Upload-Status") != "active":
+            return None
+
+        return int(res.headers["X-Goog-Upload-Size-Received"])
+
+    def _remove_upload_session(self, photo_file_path: str):
+        if self._upload_session_journal is not None:
+            self._upload_session_journal.remove_session(self._account, photo_file_path)
+
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _initialize_chunked_upload(
         self, mime_type: str, file_name: str, file_size_in_bytes: int
     ):
-        self._session.headers["Content-Length"] = "0"
-        self._session.headers["X-Goog-Upload-Command"] = "start"
-        self._session.headers["X-Goog-Upload-Content-Type"] = mime_type
-        self._session.headers["X-Goog-Upload-Protocol"] = "resumable"
-        self._session.headers["X-Goog-Upload-File-Name"] = file_name
-        self._session.headers["X-Goog-Upload-Raw-Size"] = str(file_size_in_bytes)
-
-        res = self._session.post("https://photoslibrary.googleapis.com/v1/uploads")
+        headers = {
+            "Content-Length": "0",
+            "X-Goog-Upload-Command": "start",
+            "X-Goog-Upload-Content-Type": mime_type,
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-File-Name": file_name,
+            "X-Goog-Upload-Raw-Size": str(file_size_in_bytes),
+        }
+        res = self._session.post(
+            "https://photoslibrary.googleapis.com/v1/uploads", headers=headers
+        )
         res.raise_for_status()
 
         return res
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _upload_photo_chunk(
-        self, upload_url: str, cur_offset: int, chunk: bytes, is_last_chunk: bool
+        self, upload_url: str, cur_offset: int, chunk: memoryview, is_last_chunk: bool
     ):
-        upload_cmd = "upload, finalize" if is_last_chunk else "upload"
-        self._session.headers["X-Goog-Upload-Command"] = upload_cmd
-        self._session.headers["X-Goog-Upload-Offset"] = str(cur_offset)
-
-        res = self._session.post(upload_url, chunk)
+        headers = {
+            "X-Goog-Upload-Command": "upload, finalize" if is_last_chunk else "upload",
+            "X-Goog-Upload-Offset": str(cur_offset),
+        }
+        self._wait_for_bandwidth(len(chunk))
+        res = self._session.post(upload_url, chunk, headers=headers)
         if res.status_code in DEFAULT_RETRYABLE_STATUS_CODES:
             res.raise_for_status()
 
@@ -269,13 +347,21 @@ class GPhotosMediaItemClient:
 
     @backoff.on_exception(backoff.expo, (RequestException), max_time=60)
     def _query_chunked_upload(self, upload_url):
-        self._session.headers["Content-Length"] = "0"
-        self._session.headers["X-Goog-Upload-Command"] = "query"
-
-        res = self._session.post(upload_url)
+        headers = {"Content-Length": "0", "X-Goog-Upload-Command": "query"}
+        res = self._session.post(upload_url, headers=headers)
         res.raise_for_status()
 
         return res
 
+    def _wait_for_bandwidth(self, num_bytes: int):
+        # Reserve the bytes from every limiter, then wait for the slowest one
+        seconds_to_wait = max(
+            (limiter.reserve(num_bytes) for limiter in self._bandwidth_limiters),
+            default=0,
+        )
+        if seconds_to_wait > 0:
+            logger.debug(f"Throttling upload of {num_bytes} bytes")
+            time.sleep(seconds_to_wait)
+
     def _get_mime_type(self, file_path):
-        return magic.from_file(file_path, mime=True)
+        return self._mime_type_resolver.get_mime_type(file_path)
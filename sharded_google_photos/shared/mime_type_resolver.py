@@ -0,0 +1,105 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+import magic
+
+logger = logging.getLogger(__name__)
+
+# File extensions that always map to the same mime type
+EXTENSION_TO_MIME_TYPE = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".webp": "image/webp",
+    ".heic": "image/heic",
+    ".heif": "image/heif",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".ico": "image/vnd.microsoft.icon",
+    ".mp4": "video/mp4",
+    ".m4v": "video/x-m4v",
+    ".mov": "video/quicktime",
+    ".qt": "video/quicktime",
+    ".avi": "video/x-msvideo",
+    ".wmv": "video/x-ms-wmv",
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+    ".3gp": "video/3gpp",
+    ".3g2": "video/3gpp2",
+    ".mpg": "video/mpeg",
+    ".mpeg": "video/mpeg",
+    ".mts": "video/mp2t",
+    ".m2ts": "video/mp2t",
+}
+
+DEFAULT_MAX_CACHE_SIZE = 4096
+
+
+class MimeTypeResolver:
+    """
+    Finds the mime type of a file.
+
+    It uses the file's extension when the extension maps to one mime type, and
+    only sniffs the file with libmagic otherwise. Sniffed mime types are cached
+    by the file's device, inode, and modified time.
+
+    Example:
+        >>> resolver = MimeTypeResolver()
+        >>> resolver.get_mime_type("dog.jpg")
+        'image/jpeg'
+    """
+
+    def __init__(self, max_cache_size: int = DEFAULT_MAX_CACHE_SIZE):
+        self.max_cache_size = max_cache_size
+
+        self.__magic: magic.Magic | None = None
+        self.__magic_lock = threading.Lock()
+
+        self.__file_key_to_mime_type: OrderedDict[tuple[int, int, int], str] = (
+            OrderedDict()
+        )
+        self.__cache_lock = threading.Lock()
+
+    def get_mime_type(self, file_path: str) -> str:
+        """
+        Returns the mime type of a file.
+
+        Parameters:
+            file_path (str): the path to the file.
+
+        Returns:
+            str: the mime type, like "image/jpeg".
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension in EXTENSION_TO_MIME_TYPE:
+            return EXTENSION_TO_MIME_TYPE[extension]
+
+        stat = os.stat(file_path)
+        file_key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+        with self.__cache_lock:
+            if file_key in self.__file_key_to_mime_type:
+                self.__file_key_to_mime_type.move_to_end(file_key)
+                return self.__file_key_to_mime_type[file_key]
+
+        mime_type = self.__sniff_mime_type(file_path)
+
+        with self.__cache_lock:
+            self.__file_key_to_mime_type[file_key] = mime_type
+            if len(self.__file_key_to_mime_type) > self.max_cache_size:
+                self.__file_key_to_mime_type.popitem(last=False)
+
+        return mime_type
+
+    def __sniff_mime_type(self, file_path: str) -> str:
+        logger.debug(f"Sniffing mime type of {file_path}")
+
+        # A libmagic handle can only be used by one thread at a time
+        with self.__magic_lock:
+            if self.__magic is None:
+                self.__magic = magic.Magic(mime=True)
+
+            return self.__magic.from_file(file_path)
@@ -0,0 +1,92 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def get_page_fields(items_key: str, fields: str | None) -> str | None:
+    """
+    Returns the field mask of a page that only has some fields of its items.
+
+    Parameters:
+        items_key (str): the key of the items in each page, like "mediaItems".
+        fields (str | None): the comma-separated fields of each item to
+          return, like "id,filename", or None to return all of the fields.
+
+    Returns:
+        str | None: the value of the "fields" query parameter, or None if
+          all of the fields should be returned.
+    """
+    if fields is None:
+        return None
+
+    # The page token is needed to keep paginating
+    return f"{items_key}({fields}),nextPageToken"
+
+
+def prefetch_pages(
+    fetch_page: Callable[[str | None], dict], items_key: str
+) -> Iterator[dict]:
+    """
+    Yields the items of a paginated listing, fetching the next page in the
+    background while the caller goes through the items of the current page.
+
+    Parameters:
+        fetch_page (Callable[[str | None], dict]): a function that takes a page
+          token, or None for the first page, and returns the page's response.
+        items_key (str): the key of the items in each page, like "mediaItems".
+
+    Returns:
+        Iterator[dict]: the items in all of the pages.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        next_page: Future | None = executor.submit(fetch_page, None)
+        while next_page is not None:
+            res_body = next_page.result()
+            next_page = None
+
+            if items_key not in res_body:
+                break
+
+            if "nextPageToken" in res_body:
+                next_page = executor.submit(fetch_page, res_body["nextPageToken"])
+
+            yield from res_body[items_key]
+    finally:
+        # Don't wait for a page that the caller no longer needs
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_prefetch_pages(
+    fetch_page: Callable[[str | None], Awaitable[dict]], items_key: str
+) -> AsyncIterator[dict]:
+    """
+    The asyncio counterpart of prefetch_pages(), fetching the next page in
+    another task.
+
+    Parameters:
+        fetch_page (Callable[[str | None], Awaitable[dict]]): a coroutine
+          function that takes a page token, or None for the first page, and
+          returns the page's response.
+        items_key (str): the key of the items in each page, like "mediaItems".
+
+    Returns:
+        AsyncIterator[dict]: the items in all of the pages.
+    """
+    next_page: asyncio.Task | None = asyncio.ensure_future(fetch_page(None))
+    try:
+        while next_page is not None:
+            res_body = await next_page
+            next_page = None
+
+            if items_key not in res_body:
+                break
+
+            if "nextPageToken" in res_body:
+                next_page = asyncio.ensure_future(fetch_page(res_body["nextPageToken"]))
+
+            for item in res_body[items_key]:
+                yield item
+    finally:
+        if next_page is not None:
+            next_page.cancel()
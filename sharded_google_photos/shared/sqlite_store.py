@@ -0,0 +1,34 @@
+import os
+import sqlite3
+
+
+def connect(db_file_path: str) -> sqlite3.Connection:
+    """
+    Opens a new connection to a SQLite database.
+
+    The stores open a connection per call instead of keeping one open, since
+    a SQLite connection cannot be used by many threads at once. Writers wait
+    for up to 30 seconds for each other to finish.
+
+    Parameters:
+        db_file_path (str): the file path to the database.
+
+    Returns:
+        sqlite3.Connection: the connection, which the caller closes.
+    """
+    return sqlite3.connect(db_file_path, timeout=30)
+
+
+def get_file_key(file_path: str) -> tuple[str, int, int]:
+    """
+    Returns the key of a file in a store, which changes when the file does.
+
+    Parameters:
+        file_path (str): the path to the file.
+
+    Returns:
+        tuple[str, int, int]: the absolute file path, the file size in bytes,
+          and the modification time of the file in nanoseconds.
+    """
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
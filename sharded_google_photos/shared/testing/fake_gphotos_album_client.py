@@ -8,12 +8,26 @@ class FakeGPhotosAlbumClient(GPhotosAlbumClient):
         self.id = id
         self.repository = repository
 
-    def list_shared_albums(self, exclude_non_app_created_data: bool = False):
+    def list_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
         return self.repository.list_shared_albums(self.id)
 
-    def list_albums(self, exclude_non_app_created_data: bool = False):
+    def list_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
         return self.repository.list_unshared_albums(self.id)
 
+    def iter_shared_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return iter(self.list_shared_albums(exclude_non_app_created_data, fields))
+
+    def iter_albums(
+        self, exclude_non_app_created_data: bool = False, fields: str | None = None
+    ):
+        return iter(self.list_albums(exclude_non_app_created_data, fields))
+
     def create_album(self, album_name: str):
         return self.repository.create_album(self.id, album_name)
 
@@ -18,6 +18,7 @@ class FakeGPhotosClient(GPhotosClient):
         self.is_authenticated = False
         self.repository = repository
         self.id = str(uuid.uuid4()) if id is None else id
+        self.name = self.id
         self.max_num_photos = max_num_photos
 
         self._albums_client = FakeGPhotosAlbumClient(self.id, repository)
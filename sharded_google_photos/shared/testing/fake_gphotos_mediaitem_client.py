@@ -19,12 +19,25 @@ class FakeGPhotosMediaItemClient(GPhotosMediaItemClient):
         )
 
     def search_for_media_items(
-        self, album_id: str = None, filters: str = None, order_by: str = None
+        self,
+        album_id: str | None = None,
+        filters: str | None = None,
+        order_by: str | None = None,
+        fields: str | None = None,
     ):
         return self.repository.search_for_media_items(
             self.id, album_id, filters, order_by
         )
 
+    def iter_media_items(
+        self,
+        album_id: str | None = None,
+        filters: str | None = None,
+        order_by: str | None = None,
+        fields: str | None = None,
+    ):
+        return iter(self.search_for_media_items(album_id, filters, order_by, fields))
+
     def upload_photo(self, photo_file_path: str, file_name: str):
         return self.repository.upload_photo(self.id, photo_file_path, file_name)
 
@@ -1,4 +1,5 @@
 import uuid
+from datetime import date, datetime
 
 
 class FakeItemsRepository:
@@ -105,6 +106,8 @@ class FakeItemsRepository:
 
             self.__album_id_to_media_item_ids[album_id].add(media_id)
 
+        self.__update_media_items_count(album_id)
+
     def remove_photos_from_album(self, client_id, album_id, media_item_ids):
         if client_id not in self.__album_id_to_accessible_client_ids[album_id]:
             raise Exception("Cannot remove photos from album it did not join")
@@ -121,6 +124,8 @@ class FakeItemsRepository:
 
             self.__album_id_to_media_item_ids[album_id].remove(media_id)
 
+        self.__update_media_items_count(album_id)
+
     def add_uploaded_photos_to_gphotos(self, client_id, upload_tokens, album_id=None):
         new_media_items_results = []
         for upload_token in upload_tokens:
@@ -130,6 +135,7 @@ class FakeItemsRepository:
                 if client_id not in self.__album_id_to_accessible_client_ids[album_id]:
                     raise Exception("Cannot add uploaded photos to inaccessible album")
                 self.__album_id_to_media_item_ids[album_id].add(new_media_item_id)
+                self.__update_media_items_count(album_id)
 
             new_media_item = {
                 "id": new_media_item_id,
@@ -173,6 +179,10 @@ class FakeItemsRepository:
 
         return {"newMediaItemResults": new_media_items_results}
 
+    def set_media_item_creation_time(self, media_item_id, creation_time):
+        media_item = self.__media_item_id_to_media_item[media_item_id]
+        media_item["mediaMetadata"]["creationTime"] = creation_time
+
     def upload_photo(self, client_id, photo_file_path, file_name):
         upload_token = str(uuid.uuid4())
         self.__upload_tokens_to_file_name[upload_token] = file_name
@@ -196,7 +206,7 @@ class FakeItemsRepository:
                     client_id
                     == self.__media_item_ids_to_owned_client_id[media_item["id"]]
                 )
-                return is_owned
+                return is_owned and self.__matches_filters(media_item, filters)
 
             all_media_items = list(self.__media_item_id_to_media_item.values())
             return list(filter(is_valid, all_media_items))
@@ -225,3 +235,22 @@ class FakeItemsRepository:
             "coverPhotoBaseUrl": album_info["coverPhotoBaseUrl"],
             "coverPhotoMediaItemId": album_info["coverPhotoMediaItemId"],
         }
+
+    def __matches_filters(self, media_item, filters):
+        if filters is None or "dateFilter" not in filters:
+            return True
+
+        creation_date = datetime.fromisoformat(
+            media_item["mediaMetadata"]["creationTime"]
+        ).date()
+        return any(
+            date(**date_range["startDate"])
+            <= creation_date
+            <= date(**date_range["endDate"])
+            for date_range in filters["dateFilter"]["ranges"]
+        )
+
+    def __update_media_items_count(self, album_id):
+        self.__album_id_to_album[album_id]["mediaItemsCount"] = len(
+            self.__album_id_to_media_item_ids[album_id]
+        )
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from yarl import URL
+
+from sharded_google_photos.shared.async_authorized_session import (
+    AsyncAuthorizedSession,
+)
+from sharded_google_photos.shared.blocking_gphotos_client import (
+    start_event_loop_in_background,
+)
+
+
+@dataclass
+class ReceivedRequest:
+    method: str
+    url: str
+    headers: dict
+    body: bytes
+
+
+class MockedGoogleApisServer:
+    """
+    Serves canned responses to the requests that the async clients send to
+    Google's APIs, from a local server that the requests are sent to instead.
+    """
+
+    def __enter__(self):
+        self.requests: list[ReceivedRequest] = []
+        self.__responses: dict[tuple, deque] = {}
+
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.__handle)
+
+        self.__loop = start_event_loop_in_background()
+        self.__server = TestServer(app, loop=self.__loop)
+        self.__run(self.__server.start_server())
+
+        original_send = AsyncAuthorizedSession._send
+        server_url = self.__server.make_url("/")
+
+        async def send_to_server(session, method, url, *args):
+            # Keep the host in the path so that the server can tell them apart
+            url = URL(url)
+            local_url = server_url.with_path(f"/{url.host}{url.path}")
+            return await original_send(session, method, str(local_url), *args)
+
+        self.__patcher = patch.object(AsyncAuthorizedSession, "_send", send_to_server)
+        self.__patcher.__enter__()
+
+        return self
+
+    def __exit__(self, exc, value, tb):
+        self.__patcher.__exit__(exc, value, tb)
+        self.__run(self.__server.close())
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+
+    def add_response(self, method, url, payload=None, status=200):
+        key = self.__get_key(method, URL(url))
+        self.__responses.setdefault(key, deque()).append((status, payload))
+
+    async def __handle(self, request):
+        host, _, path = request.path[1:].partition("/")
+        url = URL.build(scheme="https", host=host, path=f"/{path}").with_query(
+            request.query
+        )
+        self.requests.append(
+            ReceivedRequest(
+                method=request.method,
+                url=str(url),
+                headers=dict(request.headers),
+                body=await request.read(),
+            )
+        )
+
+        responses = self.__responses.get(self.__get_key(request.method, url))
+        if not responses:
+            return web.Response(status=404, text=f"No response for {url}")
+
+        status, payload = responses.popleft()
+        return web.Response(
+            status=status,
+            text=json.dumps(payload) if payload is not None else None,
+            content_type="application/json",
+        )
+
+    def __get_key(self, method, url):
+        return (method, str(url.with_query(None)), tuple(sorted(url.query.items())))
+
+    def __run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__loop).result()
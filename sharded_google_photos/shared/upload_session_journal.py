@@ -0,0 +1,133 @@
+import logging
+import os
+from contextlib import closing
+from dataclasses import dataclass
+
+from .sqlite_store import connect, get_file_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UploadSession:
+    # The url returned by Google Photos to upload the file's chunks to
+    upload_url: str
+
+    # The chunk granularity returned by Google Photos for the upload
+    chunk_size: int
+
+
+class UploadSessionJournal:
+    """
+    A journal on disk of the resumable uploads that have started but not
+    finished yet, so that an upload interrupted by a crash can be resumed by
+    the next run instead of starting from the beginning.
+
+    Uploads are keyed by the account, and by the file's absolute path, size,
+    and modified time, so a file that has changed since its upload started is
+    uploaded again, and an upload is only resumed by the account that
+    started it. Saving a new upload of a file drops the older uploads of it.
+
+    Example:
+        >>> journal = UploadSessionJournal("upload-sessions.db")
+        >>> session = UploadSession("https://...", 262144)
+        >>> journal.save_session("bob@gmail.com", "1.mp4", session)
+        >>> journal.get_session("bob@gmail.com", "1.mp4")
+        UploadSession(upload_url='https://...', chunk_size=262144)
+    """
+
+    def __init__(self, db_file_path: str):
+        self.db_file_path = db_file_path
+
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    account TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_size_in_bytes INTEGER NOT NULL,
+                    file_mtime_ns INTEGER NOT NULL,
+                    upload_url TEXT NOT NULL,
+                    chunk_size INTEGER NOT NULL,
+                    PRIMARY KEY (
+                        account, file_path, file_size_in_bytes, file_mtime_ns
+                    )
+                )
+                """
+            )
+
+    def get_session(self, account: str, file_path: str) -> UploadSession | None:
+        """
+        Returns the unfinished upload of a file, if there is one.
+
+        Parameters:
+            account (str): the name of the account that the file is uploaded to.
+            file_path (str): the path to the file being uploaded.
+
+        Returns:
+            UploadSession | None: the upload session, or None if the file has
+              no unfinished upload.
+        """
+        with closing(connect(self.db_file_path)) as conn:
+            row = conn.execute(
+                """
+                SELECT upload_url, chunk_size FROM upload_sessions
+                WHERE account = ? AND file_path = ? AND file_size_in_bytes = ?
+                    AND file_mtime_ns = ?
+                """,
+                (account,) + get_file_key(file_path),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return UploadSession(upload_url=row[0], chunk_size=row[1])
+
+    def save_session(
+        self, account: str, file_path: str, session: UploadSession
+    ) -> None:
+        """
+        Saves the upload session of a file.
+
+        Parameters:
+            account (str): the name of the account that the file is uploaded to.
+            file_path (str): the path to the file being uploaded.
+            session (UploadSession): the upload session.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            # An upload of the file from before it changed can never resume
+            conn.execute(
+                "DELETE FROM upload_sessions WHERE account = ? AND file_path = ?",
+                (account, os.path.abspath(file_path)),
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO upload_sessions
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (account,)
+                + get_file_key(file_path)
+                + (session.upload_url, session.chunk_size),
+            )
+
+        logger.debug(f"Saved upload session for {file_path}")
+
+    def remove_session(self, account: str, file_path: str) -> None:
+        """
+        Removes the upload session of a file, if there is one.
+
+        Parameters:
+            account (str): the name of the account that the file is uploaded to.
+            file_path (str): the path to the file being uploaded.
+        """
+        with closing(connect(self.db_file_path)) as conn, conn:
+            conn.execute(
+                """
+                DELETE FROM upload_sessions
+                WHERE account = ? AND file_path = ? AND file_size_in_bytes = ?
+                    AND file_mtime_ns = ?
+                """,
+                (account,) + get_file_key(file_path),
+            )
+
+        logger.debug(f"Removed upload session for {file_path}")
@@ -0,0 +1,51 @@
+import unittest
+
+from sharded_google_photos.backup.album_placement import (
+    place_new_albums,
+    WORST_FIT,
+    BEST_FIT,
+)
+
+
+class AlbumPlacementTests(unittest.TestCase):
+    def test_place_new_albums__worst_fit__puts_album_in_account_with_most_space(
+        self,
+    ):
+        placement = place_new_albums([5, 10, 7], {"A": 3}, WORST_FIT)
+
+        self.assertEqual(placement.album_title_to_client_idx, {"A": 1})
+        self.assertEqual(placement.space_remaining, [5, 7, 7])
+
+    def test_place_new_albums__best_fit__puts_album_in_account_with_least_space_that_fits(
+        self,
+    ):
+        placement = place_new_albums([5, 10, 2], {"A": 3}, BEST_FIT)
+
+        self.assertEqual(placement.album_title_to_client_idx, {"A": 0})
+        self.assertEqual(placement.space_remaining, [2, 10, 2])
+
+    def test_place_new_albums__albums_given_smallest_first__places_biggest_albums_first(
+        self,
+    ):
+        # Placing "A" first in the order given would leave no account for "B"
+        placement = place_new_albums([6, 4], {"A": 3, "B": 6, "C": 1}, BEST_FIT)
+
+        self.assertEqual(
+            list(placement.album_title_to_client_idx.items()),
+            [("B", 0), ("A", 1), ("C", 1)],
+        )
+        self.assertEqual(placement.space_remaining, [0, 0])
+
+    def test_place_new_albums__album_does_not_fit__returns_none_for_album(self):
+        for policy in [WORST_FIT, BEST_FIT]:
+            with self.subTest(policy=policy):
+                placement = place_new_albums([2, 0], {"A": 3, "B": 0}, policy)
+
+                self.assertEqual(
+                    placement.album_title_to_client_idx, {"A": None, "B": 0}
+                )
+                self.assertEqual(placement.space_remaining, [2, 0])
+
+    def test_place_new_albums__unknown_policy__raises_value_error(self):
+        with self.assertRaisesRegex(ValueError, "first_fit"):
+            place_new_albums([1], {"A": 1}, "first_fit")
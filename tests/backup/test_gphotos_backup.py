@@ -1,11 +1,18 @@
+import threading
+import time
 import unittest
 from unittest.mock import patch
 
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeGPhotosClient
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeItemsRepository
 from sharded_google_photos.shared.testing.fake_eventbus import FakeEventBus
+from sharded_google_photos.shared.testing.fake_gphotos_mediaitem_client import (
+    FakeGPhotosMediaItemClient,
+)
 
 from sharded_google_photos.backup.gphotos_backup import GPhotosBackup
+from sharded_google_photos.backup.storage_quota_tracker import StorageQuotaTracker
+from sharded_google_photos.backup.album_placement import BEST_FIT
 from sharded_google_photos.backup import gphotos_backup_events as events
 
 
@@ -50,6 +57,10 @@ class GPhotosBackupTests(unittest.TestCase):
             self.assertEqual(len(shared_albums_1), 1)
             self.assertEqual(len(shared_albums_2), 0)
             self.assertEqual(shared_albums_1[0]["title"], "Photos/2011/Trip to Chicago")
+            self.assertEqual(
+                backup_result.new_albums[0].shareable_url,
+                shared_albums_1[0]["shareInfo"]["shareableUrl"],
+            )
 
             # Test assertions: Check regular albums
             self.assertEqual(len(client_1.albums().list_albums()), 0)
@@ -237,6 +248,53 @@ class GPhotosBackupTests(unittest.TestCase):
             ):
                 backup_client.backup(diffs)
 
+    def test_backup__with_storage_quota_tracker__fetches_quota_once_and_counts_uploads(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_1.authenticate()
+        tracker = StorageQuotaTracker()
+        backup_client = GPhotosBackup([client_1], storage_quota_tracker=tracker)
+
+        with patch("os.stat") as os_stat, patch.object(
+            FakeGPhotosClient,
+            "get_storage_quota",
+            autospec=True,
+            side_effect=FakeGPhotosClient.get_storage_quota,
+        ) as fake_get_storage_quota:
+            os_stat.return_value.st_size = 1
+            backup_client.backup(
+                [
+                    {"modifier": "+", "path": "./Photos/2011/A/1.jpg"},
+                    {"modifier": "+", "path": "./Photos/2011/A/2.jpg"},
+                ]
+            )
+            backup_client.backup([{"modifier": "+", "path": "./Photos/2011/B/3.jpg"}])
+
+            self.assertEqual(fake_get_storage_quota.call_count, 1)
+            self.assertEqual(tracker.get_storage_quota(client_1), (10, 3))
+
+    def test_backup__with_outdated_storage_quota_tracker__fetches_quota_before_giving_up(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=3)
+        client_1.authenticate()
+        tracker = StorageQuotaTracker()
+        tracker.get_storage_quota(client_1)
+
+        # Make the cached quota think that the account is full
+        tracker.add_usage(client_1.name, 3)
+        backup_client = GPhotosBackup([client_1], storage_quota_tracker=tracker)
+
+        with patch("os.stat") as os_stat:
+            os_stat.return_value.st_size = 1
+            backup_client.backup([{"modifier": "+", "path": "./Photos/2011/A/1.jpg"}])
+
+        self.assertEqual(len(client_1.albums().list_shared_albums()), 1)
+        self.assertEqual(tracker.get_storage_quota(client_1), (3, 1))
+
     def test_backup__create_multiple_albums_at_once__creates_albums_correctly_and_emits_events_correctly(
         self,
     ):
@@ -1057,3 +1115,227 @@ class GPhotosBackupTests(unittest.TestCase):
             self.assertEqual(emitted_events[1].args[0], 1)
             self.assertEqual(emitted_events[2].name, events.FINISHED_UPLOADING)
             self.assertEqual(emitted_events[3].name, events.FINISHED_DELETING)
+
+    def test_backup__clients_in_parallel__creates_albums_correctly_and_emits_events_correctly(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_2 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_1.authenticate()
+        client_2.authenticate()
+        event_bus = FakeEventBus()
+        backup_client = GPhotosBackup(
+            [client_1, client_2],
+            event_bus,
+            max_clients_in_parallel=2,
+            max_albums_per_client=2,
+        )
+
+        with patch("os.stat") as os_stat:
+            os_stat.return_value.st_size = 1
+
+            diffs = [
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/1.jpeg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/2.jpeg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Toronto/3.jpeg"},
+                {"modifier": "+", "path": "./Photos/2011/At Toronto/4.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/At Toronto/5.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/At Toronto/6.jpg"},
+            ]
+            backup_result = backup_client.backup(diffs)
+
+            # Test assertions: Check the output of newly created shared albums
+            self.assertEqual(len(backup_result.new_albums), 3)
+
+            # Test assertions: Check each album has its photos
+            shared_albums = client_1.albums().list_shared_albums()
+            shared_albums += client_2.albums().list_shared_albums()
+            self.assertEqual(len(shared_albums), 3)
+            for client in [client_1, client_2]:
+                for shared_album in client.albums().list_shared_albums():
+                    items = client.media_items().search_for_media_items(
+                        shared_album["id"]
+                    )
+                    expected_num_items = {
+                        "Photos/2011/Trip to Chicago": 2,
+                        "Photos/2011/Trip to Toronto": 1,
+                        "Photos/2011/At Toronto": 3,
+                    }[shared_album["title"]]
+                    self.assertEqual(len(items), expected_num_items)
+
+            # Test assertions: Check the events being emitted
+            emitted_events = event_bus.get_events_emitted()
+            self.assertEqual(len(emitted_events), 10)
+            self.assertEqual(emitted_events[0].name, events.STARTED_UPLOADING)
+            self.assertEqual(emitted_events[0].args[0], 6)
+            self.assertEqual(emitted_events[1].name, events.STARTED_DELETING)
+            self.assertEqual(emitted_events[1].args[0], 0)
+            uploaded_paths = set()
+            for emitted_event in emitted_events[2:8]:
+                self.assertEqual(emitted_event.name, events.UPLOADED_PHOTO)
+                uploaded_paths.add(emitted_event.args[0])
+            self.assertEqual(len(uploaded_paths), 6)
+            self.assertEqual(emitted_events[8].name, events.FINISHED_UPLOADING)
+            self.assertEqual(emitted_events[9].name, events.FINISHED_DELETING)
+
+    def test_backup__albums_in_parallel__caps_uploads_per_client_across_albums(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+        backup_client = GPhotosBackup(
+            [client], max_uploads_per_client=2, max_albums_per_client=3
+        )
+
+        # Track the number of uploads running at the same time
+        original_upload_photo_in_chunks = (
+            FakeGPhotosMediaItemClient.upload_photo_in_chunks
+        )
+        lock = threading.Lock()
+        num_running_uploads = 0
+        max_num_running_uploads = 0
+
+        def fake_upload_photo_in_chunks(media_items_client, file_path, file_name):
+            nonlocal num_running_uploads, max_num_running_uploads
+            with lock:
+                num_running_uploads += 1
+                max_num_running_uploads = max(
+                    max_num_running_uploads, num_running_uploads
+                )
+            time.sleep(0.05)
+            with lock:
+                num_running_uploads -= 1
+            return original_upload_photo_in_chunks(
+                media_items_client, file_path, file_name
+            )
+
+        with patch("os.stat") as os_stat, patch.object(
+            FakeGPhotosMediaItemClient,
+            "upload_photo_in_chunks",
+            autospec=True,
+            side_effect=fake_upload_photo_in_chunks,
+        ):
+            os_stat.return_value.st_size = 1
+
+            diffs = [
+                {"modifier": "+", "path": f"./Photos/{album}/{i}.jpg"}
+                for album in ["A", "B", "C"]
+                for i in range(3)
+            ]
+            backup_client.backup(diffs)
+
+        self.assertEqual(max_num_running_uploads, 2)
+        self.assertEqual(len(client.media_items().search_for_media_items()), 9)
+
+    def test_backup__same_album_title_in_different_clients__emits_duplicate_album_title(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_2 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_1.authenticate()
+        client_2.authenticate()
+        album_1 = client_1.albums().create_album("Photos/2011/Trip to Chicago")
+        client_1.albums().share_album(album_1["id"])
+        album_2 = client_2.albums().create_album("Photos/2011/Trip to Chicago")
+        client_2.albums().share_album(album_2["id"])
+        event_bus = FakeEventBus()
+        backup_client = GPhotosBackup(
+            [client_1, client_2], event_bus, max_clients_in_parallel=2
+        )
+
+        with patch("os.stat") as os_stat:
+            os_stat.return_value.st_size = 1
+
+            diffs = [{"modifier": "+", "path": "./Photos/2012/Trip to Toronto/1.jpg"}]
+            backup_client.backup(diffs)
+
+            emitted_events = event_bus.get_events_emitted()
+            self.assertEqual(emitted_events[0].name, events.FOUND_DUPLICATE_ALBUM_TITLE)
+            self.assertEqual(emitted_events[0].args[0], "Photos/2011/Trip to Chicago")
+            self.assertEqual(
+                [album.id for album in emitted_events[0].args[1]],
+                [album_1["id"], album_2["id"]],
+            )
+            self.assertEqual(emitted_events[1].name, events.STARTED_UPLOADING)
+
+    def test_backup__only_new_photos_in_existing_album__does_not_list_album(self):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+        album = client.albums().create_album("Photos/2011/Trip to Chicago")
+        client.albums().share_album(album["id"])
+        upload_token = client.media_items().upload_photo("1.jpg", "1.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos([upload_token], album["id"])
+        backup_client = GPhotosBackup([client])
+
+        with patch("os.stat") as os_stat, patch.object(
+            FakeGPhotosMediaItemClient,
+            "search_for_media_items",
+            wraps=client.media_items().search_for_media_items,
+        ) as fake_search_for_media_items:
+            os_stat.return_value.st_size = 1
+
+            diffs = [{"modifier": "+", "path": "./Photos/2011/Trip to Chicago/2.jpg"}]
+            backup_client.backup(diffs)
+
+            album_ids_searched = [
+                call.kwargs.get("album_id")
+                for call in fake_search_for_media_items.call_args_list
+            ]
+            self.assertNotIn(album["id"], album_ids_searched)
+            self.assertEqual(
+                len(client.media_items().search_for_media_items(album["id"])), 2
+            )
+
+    def test_backup__best_fit_placement__creates_album_in_fullest_account_that_fits(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=5)
+        client_2 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_1.authenticate()
+        client_2.authenticate()
+        backup_client = GPhotosBackup(
+            [client_1, client_2], album_placement_policy=BEST_FIT
+        )
+
+        with patch("os.stat") as os_stat:
+            os_stat.return_value.st_size = 1
+
+            diffs = [
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/1.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/2.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/3.jpg"},
+            ]
+            results = backup_client.backup(diffs)
+
+            self.assertEqual(len(results.new_albums), 1)
+            self.assertEqual(results.new_albums[0].client_idx, 0)
+            self.assertEqual(results.fill_ratios, [0.6, 0.0])
+            self.assertEqual(len(client_1.media_items().search_for_media_items()), 3)
+
+    def test_backup__new_albums_placed_biggest_first__returns_new_albums_in_diff_order(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client_1.authenticate()
+        backup_client = GPhotosBackup([client_1])
+
+        with patch("os.stat") as os_stat:
+            os_stat.return_value.st_size = 1
+
+            diffs = [
+                {"modifier": "+", "path": "./Photos/2011/Trip to Chicago/1.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Toronto/2.jpg"},
+                {"modifier": "+", "path": "./Photos/2011/Trip to Toronto/3.jpg"},
+            ]
+            results = backup_client.backup(diffs)
+
+            self.assertEqual(
+                [album.title for album in results.new_albums],
+                ["Photos/2011/Trip to Chicago", "Photos/2011/Trip to Toronto"],
+            )
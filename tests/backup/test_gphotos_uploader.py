@@ -1,7 +1,12 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
+from sharded_google_photos.backup import gphotos_uploader
 from sharded_google_photos.backup.gphotos_uploader import GPhotosUploader
 from sharded_google_photos.backup import gphotos_uploader_events as events
+from sharded_google_photos.backup.upload_token_cache import UploadTokenCache
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeGPhotosClient
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeItemsRepository
 from sharded_google_photos.shared.testing.fake_eventbus import FakeEventBus
@@ -40,3 +45,132 @@ class GPhotosUploaderTests(unittest.TestCase):
         self.assertEqual(emitted_events[2].name, events.UPLOADED_PHOTO)
         self.assertEqual(emitted_events[2].args[0], file_paths[1])
         self.assertEqual(emitted_events[3].name, events.FINISHED_UPLOADING)
+
+    def test_upload_photos__multiple_workers__returns_upload_tokens_in_order_and_emits_events_correctly(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+
+        event_bus = FakeEventBus()
+        uploader = GPhotosUploader(client, event_bus, max_workers=4)
+        file_paths = [f"Photos/2011/Trip to Chicago/{i}.jpeg" for i in range(10)]
+        file_names = [f"{i}.jpeg" for i in range(10)]
+        upload_tokens = uploader.upload_photos(file_paths, file_names)
+
+        # Assert that the upload tokens are in the same order as the file paths
+        self.assertEqual(len(upload_tokens), 10)
+        for i, upload_token in enumerate(upload_tokens):
+            results = client.media_items().add_uploaded_photos_to_gphotos(
+                [upload_token]
+            )
+            media_item = results["newMediaItemResults"][0]["mediaItem"]
+            self.assertEqual(media_item["filename"], file_names[i])
+
+        # Assert events are emitted correctly
+        emitted_events = event_bus.get_events_emitted()
+        self.assertEqual(len(emitted_events), 12)
+        self.assertEqual(emitted_events[0].name, events.STARTED_UPLOADING)
+        self.assertEqual(set(e.args[0] for e in emitted_events[1:11]), set(file_paths))
+        for emitted_event in emitted_events[1:11]:
+            self.assertEqual(emitted_event.name, events.UPLOADED_PHOTO)
+        self.assertEqual(emitted_events[11].name, events.FINISHED_UPLOADING)
+
+    def test_upload_photos_in_batches__yields_upload_tokens_in_batches_and_emits_events_correctly(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+
+        event_bus = FakeEventBus()
+        uploader = GPhotosUploader(client, event_bus, max_workers=2)
+        file_paths = [f"Photos/2011/Trip to Chicago/{i}.jpeg" for i in range(5)]
+        file_names = [f"{i}.jpeg" for i in range(5)]
+        batches = list(uploader.upload_photos_in_batches(file_paths, file_names, 2))
+
+        # Assert that the upload tokens are split into batches
+        self.assertEqual([len(batch) for _, batch in batches], [2, 2, 1])
+        upload_tokens = [token for _, batch in batches for token in batch]
+        self.assertEqual(
+            sorted(idx for indices, _ in batches for idx in indices), list(range(5))
+        )
+        results = client.media_items().add_uploaded_photos_to_gphotos(upload_tokens)
+        self.assertEqual(
+            set(r["mediaItem"]["filename"] for r in results["newMediaItemResults"]),
+            set(file_names),
+        )
+
+        # Assert events are emitted correctly
+        emitted_events = event_bus.get_events_emitted()
+        self.assertEqual(len(emitted_events), 7)
+        self.assertEqual(emitted_events[0].name, events.STARTED_UPLOADING)
+        for emitted_event in emitted_events[1:6]:
+            self.assertEqual(emitted_event.name, events.UPLOADED_PHOTO)
+        self.assertEqual(emitted_events[6].name, events.FINISHED_UPLOADING)
+
+    def test_upload_photos__with_upload_token_cache__reuses_cached_upload_tokens(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_paths = []
+            for i in range(2):
+                file_paths.append(os.path.join(tmp_dir, f"{i}.jpeg"))
+                with open(file_paths[i], "wb") as file:
+                    file.write(b"photo")
+            file_names = ["0.jpeg", "1.jpeg"]
+            cache = UploadTokenCache(os.path.join(tmp_dir, "cache.db"))
+
+            uploader = GPhotosUploader(client, upload_token_cache=cache)
+            upload_tokens_1 = uploader.upload_photos(file_paths, file_names)
+
+            with patch.object(
+                client.media_items(), "upload_photo_in_chunks"
+            ) as mock_upload:
+                upload_tokens_2 = uploader.upload_photos(file_paths, file_names)
+
+            mock_upload.assert_not_called()
+            self.assertEqual(upload_tokens_1, upload_tokens_2)
+
+    def test_upload_photos__with_raw_upload_threshold__uploads_small_photos_in_one_request(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repo, max_num_photos=10)
+        client.authenticate()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_paths = [os.path.join(tmp_dir, "small.jpeg")]
+            file_paths.append(os.path.join(tmp_dir, "big.mp4"))
+            with open(file_paths[0], "wb") as file:
+                file.write(b"123")
+            with open(file_paths[1], "wb") as file:
+                file.write(b"1234")
+            file_names = ["small.jpeg", "big.mp4"]
+
+            uploader = GPhotosUploader(client, raw_upload_threshold_in_bytes=4)
+            with patch.object(
+                client.media_items(),
+                "upload_photo",
+                wraps=client.media_items().upload_photo,
+            ) as mock_upload_photo, patch.object(
+                client.media_items(),
+                "upload_photo_in_chunks",
+                wraps=client.media_items().upload_photo_in_chunks,
+            ) as mock_upload_photo_in_chunks:
+                upload_tokens = uploader.upload_photos(file_paths, file_names)
+
+            self.assertEqual(len(upload_tokens), 2)
+            mock_upload_photo.assert_called_once_with(file_paths[0], file_names[0])
+            mock_upload_photo_in_chunks.assert_called_once_with(
+                file_paths[1], file_names[1]
+            )
+            self.assertEqual(
+                uploader.upload_method_counts,
+                {gphotos_uploader.RAW_UPLOAD: 1, gphotos_uploader.RESUMABLE_UPLOAD: 1},
+            )
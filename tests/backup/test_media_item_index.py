@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from freezegun import freeze_time
+
+from sharded_google_photos.backup.media_item_index import MediaItemIndex
+
+MEDIA_ITEM_1 = {"id": "1", "filename": "1.jpg"}
+MEDIA_ITEM_2 = {"id": "2", "filename": "2.jpg"}
+MEDIA_ITEM_3 = {"id": "3", "filename": "3.jpg"}
+
+
+class MediaItemIndexTests(unittest.TestCase):
+    def test_get_media_items__set_media_items__returns_media_items(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_1])
+
+            # Reopen the index to check that it is persisted
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+
+            self.assertEqual(
+                index.get_media_items("bob@gmail.com", "album-1"), [MEDIA_ITEM_1]
+            )
+
+    def test_get_media_items__unknown_album__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_1])
+
+            self.assertIsNone(index.get_media_items("bob@gmail.com", "album-2"))
+            self.assertIsNone(index.get_media_items("alice@gmail.com", "album-1"))
+
+    def test_get_media_items__empty_album__returns_empty_list(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            index.set_media_items("bob@gmail.com", "album-1", [])
+
+            self.assertEqual(index.get_media_items("bob@gmail.com", "album-1"), [])
+
+    def test_get_media_items__expired_album__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(
+                os.path.join(tmp_dir, "index.db"), max_age_in_seconds=60
+            )
+            with freeze_time("Jan 14th, 2020 10:00:00"):
+                index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_1])
+
+            with freeze_time("Jan 14th, 2020 10:00:59"):
+                self.assertEqual(
+                    index.get_media_items("bob@gmail.com", "album-1"), [MEDIA_ITEM_1]
+                )
+
+            with freeze_time("Jan 14th, 2020 10:01:01"):
+                self.assertIsNone(index.get_media_items("bob@gmail.com", "album-1"))
+
+    def test_set_media_items__indexed_album__replaces_media_items(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_1])
+
+            index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_2])
+
+            self.assertEqual(
+                index.get_media_items("bob@gmail.com", "album-1"), [MEDIA_ITEM_2]
+            )
+
+    def test_add_media_items_and_remove_media_items__updates_media_items(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            index.set_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_1])
+
+            index.add_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_2])
+            index.add_media_items("bob@gmail.com", "album-1", [MEDIA_ITEM_3])
+            index.remove_media_items("bob@gmail.com", "album-1", ["1", "3"])
+
+            self.assertEqual(
+                index.get_media_items("bob@gmail.com", "album-1"), [MEDIA_ITEM_2]
+            )
@@ -1,7 +1,12 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
+from freezegun import freeze_time
 
+from sharded_google_photos.backup.media_item_index import MediaItemIndex
 from sharded_google_photos.backup.media_item_repository import MediaItemRepository
+from sharded_google_photos.backup.records import MediaItem
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeGPhotosClient
 from sharded_google_photos.shared.testing.fake_gphotos_mediaitem_client import (
     FakeGPhotosMediaItemClient,
@@ -27,7 +32,7 @@ class MediaItemRepositoryTest(unittest.TestCase):
 
         self.assertTrue(repo.contains_file_name("1.jpg"))
         fetched_media_item = repo.get_media_item_from_file_name("1.jpg")
-        self.assertEqual(fetched_media_item, media_item)
+        self.assertEqual(fetched_media_item, MediaItem.from_json(media_item))
 
     def test_contains_file_name__with_existing_photo__should_return_true(self):
         client = FakeGPhotosClient(FakeItemsRepository())
@@ -85,7 +90,7 @@ class MediaItemRepositoryTest(unittest.TestCase):
         repo.setup()
         fetched_media_item = repo.get_media_item_from_file_name("1.jpg")
 
-        self.assertEqual(fetched_media_item, media_item)
+        self.assertEqual(fetched_media_item, MediaItem.from_json(media_item))
 
     def test_get_media_item_from_file_name__unknown_name__should_throw_error(self):
         client = FakeGPhotosClient(FakeItemsRepository())
@@ -227,7 +232,7 @@ class MediaItemRepositoryTest(unittest.TestCase):
         repo.add_uploaded_photos([upload_token_1])
 
         fetched_media_item = repo.get_media_item_from_file_name("1.jpg")
-        self.assertEqual(fetched_media_item["filename"], "1.jpg")
+        self.assertEqual(fetched_media_item.file_name, "1.jpg")
 
     def test_add_uploaded_photos__with_no_upload_tokens__does_not_call_gphotos_client_api(
         self,
@@ -243,6 +248,130 @@ class MediaItemRepositoryTest(unittest.TestCase):
 
             self.assertEqual(fn.call_count, 0)
 
+    def test_setup__with_indexed_album__should_not_fetch_photos(self):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+        upload_token = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos([upload_token], album["id"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            MediaItemRepository(album["id"], client, index).setup()
+
+            repo = MediaItemRepository(album["id"], client, index)
+            with TrackFetchedMediaItemsCalls(client) as fake_search_for_media_items:
+                repo.setup()
+
+                self.assertEqual(fake_search_for_media_items.call_count, 0)
+                self.assertTrue(repo.contains_file_name("1.jpg"))
+
+    def test_setup__with_indexed_album__should_include_added_and_removed_photos(
+        self,
+    ):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+        upload_token_1 = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        upload_token_2 = client.media_items().upload_photo("A/2.jpg", "2.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos(
+            [upload_token_1], album["id"]
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(os.path.join(tmp_dir, "index.db"))
+            repo = MediaItemRepository(album["id"], client, index)
+            repo.setup()
+            repo.add_uploaded_photos([upload_token_2])
+            repo.remove_media_items([repo.get_media_item_from_file_name("1.jpg").id])
+
+            repo = MediaItemRepository(album["id"], client, index)
+            with TrackFetchedMediaItemsCalls(client) as fake_search_for_media_items:
+                repo.setup()
+
+                self.assertEqual(fake_search_for_media_items.call_count, 0)
+                self.assertFalse(repo.contains_file_name("1.jpg"))
+                self.assertTrue(repo.contains_file_name("2.jpg"))
+
+    def test_setup__with_expired_indexed_album__should_refetch_photos(self):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = MediaItemIndex(
+                os.path.join(tmp_dir, "index.db"), max_age_in_seconds=60
+            )
+            with freeze_time("Jan 14th, 2020 10:00:00"):
+                MediaItemRepository(album["id"], client, index).setup()
+
+            # Add a photo outside of the repository
+            upload_token = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+            client.media_items().add_uploaded_photos_to_gphotos(
+                [upload_token], album["id"]
+            )
+
+            repo = MediaItemRepository(album["id"], client, index)
+            with freeze_time("Jan 14th, 2020 10:01:01"), TrackFetchedMediaItemsCalls(
+                client
+            ) as fake_search_for_media_items:
+                repo.setup()
+
+                self.assertEqual(fake_search_for_media_items.call_count, 1)
+                self.assertTrue(repo.contains_file_name("1.jpg"))
+
+    def test_setup_lazily__add_uploaded_photos__should_count_without_fetching_photos(
+        self,
+    ):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+        upload_token_1 = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos(
+            [upload_token_1], album["id"]
+        )
+        upload_token_2 = client.media_items().upload_photo("A/2.jpg", "2.jpg")
+
+        repo = MediaItemRepository(album["id"], client)
+        with TrackFetchedMediaItemsCalls(client) as fake_search_for_media_items:
+            repo.setup_lazily(1)
+            repo.add_uploaded_photos([upload_token_2])
+
+            self.assertEqual(repo.get_num_media_items(), 2)
+            self.assertEqual(fake_search_for_media_items.call_count, 0)
+
+    def test_setup_lazily__contains_file_name__should_fetch_photos_once(self):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+        upload_token = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos([upload_token], album["id"])
+
+        repo = MediaItemRepository(album["id"], client)
+        with TrackFetchedMediaItemsCalls(client) as fake_search_for_media_items:
+            repo.setup_lazily(1)
+
+            self.assertTrue(repo.contains_file_name("1.jpg"))
+            self.assertFalse(repo.contains_file_name("2.jpg"))
+            self.assertEqual(repo.get_num_media_items(), 1)
+            self.assertEqual(fake_search_for_media_items.call_count, 1)
+
+    def test_setup_lazily__empty_count__should_fetch_photos_to_get_num_media_items(
+        self,
+    ):
+        client = FakeGPhotosClient(FakeItemsRepository())
+        client.authenticate()
+        album = client.albums().create_album("A")
+        upload_token = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        client.media_items().add_uploaded_photos_to_gphotos([upload_token], album["id"])
+
+        repo = MediaItemRepository(album["id"], client)
+        with TrackFetchedMediaItemsCalls(client) as fake_search_for_media_items:
+            repo.setup_lazily(0)
+
+            self.assertEqual(repo.get_num_media_items(), 1)
+            self.assertEqual(fake_search_for_media_items.call_count, 1)
+
 
 class TrackFetchedMediaItemsCalls:
     def __init__(self, client):
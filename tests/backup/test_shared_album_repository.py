@@ -23,7 +23,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo.setup()
 
         self.assertTrue(repo.contains_album_title("Photos/2011"))
-        self.assertEqual(repo.get_album_from_title("Photos/2011")["id"], album_id)
+        self.assertEqual(repo.get_album_from_title("Photos/2011").id, album_id)
 
     def test_contains_album_title__with_existing_albums__returns_correct_value(self):
         client = FakeGPhotosClient(FakeItemsRepository())
@@ -74,7 +74,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo.setup()
         fetched_album = repo.get_album_from_title("Photos/2011")
 
-        self.assertEqual(fetched_album["id"], album["id"])
+        self.assertEqual(fetched_album.id, album["id"])
 
     def test_get_album_from_title__with_existing_albums__does_not_refetch_new_albums(
         self,
@@ -112,8 +112,8 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo.setup()
         shared_album = repo.create_shared_album(0, "Photos/2011")
 
-        self.assertEqual(shared_album["title"], "Photos/2011")
-        self.assertIsNotNone(shared_album["shareInfo"])
+        self.assertEqual(shared_album.title, "Photos/2011")
+        self.assertIsNotNone(shared_album.shareable_url)
         shared_albums = client.albums().list_shared_albums()
         unshared_albums = client.albums().list_albums()
         self.assertEqual(len(shared_albums), 1)
@@ -179,10 +179,10 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo = SharedAlbumRepository([client])
         repo.setup()
         album = repo.create_shared_album(0, "Photos/2011")
-        new_album = repo.rename_album(album["id"], "Photos/2022")
+        new_album = repo.rename_album(album.id, "Photos/2022")
 
-        self.assertEqual(album["id"], new_album["id"])
-        self.assertEqual(new_album["title"], "Photos/2022")
+        self.assertEqual(album.id, new_album.id)
+        self.assertEqual(new_album.title, "Photos/2022")
         shared_albums = client.albums().list_shared_albums()
         self.assertEqual(len(shared_albums), 1)
         self.assertEqual(shared_albums[0]["title"], "Photos/2022")
@@ -208,7 +208,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         with self.assertRaisesRegex(
             Exception, "Album with name Photos/2011 already exists"
         ):
-            repo.rename_album(album_2["id"], "Photos/2011")
+            repo.rename_album(album_2.id, "Photos/2011")
 
     def test_rename_album__does_not_fetch_new_albums(self):
         client = FakeGPhotosClient(FakeItemsRepository())
@@ -219,7 +219,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         album = repo.create_shared_album(0, "Photos/2011")
 
         with TrackFetchedListSharedAlbumCalls(client) as fake_list_shared_albums:
-            repo.rename_album(album["id"], "Photos/2022")
+            repo.rename_album(album.id, "Photos/2022")
 
             self.assertEqual(0, fake_list_shared_albums.call_count)
 
@@ -232,7 +232,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo = SharedAlbumRepository([client])
         repo.setup()
         album = repo.create_shared_album(0, "Photos/2011")
-        repo.rename_album(album["id"], "Photos/2022")
+        repo.rename_album(album.id, "Photos/2022")
         contains_album_title = repo.contains_album_title("Photos/2022")
 
         self.assertTrue(contains_album_title)
@@ -246,7 +246,7 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo = SharedAlbumRepository([client])
         repo.setup()
         album = repo.create_shared_album(0, "Photos/2011")
-        repo.rename_album(album["id"], "Photos/2022")
+        repo.rename_album(album.id, "Photos/2022")
         contains_album_title = repo.contains_album_title("Photos/2011")
 
         self.assertFalse(contains_album_title)
@@ -260,11 +260,78 @@ class SharedAlbumRepositoryTests(unittest.TestCase):
         repo = SharedAlbumRepository([client])
         repo.setup()
         album = repo.create_shared_album(0, "Photos/2011")
-        new_album_info = repo.rename_album(album["id"], "Photos/2022")
+        new_album_info = repo.rename_album(album.id, "Photos/2022")
         fetched_album_info = repo.get_album_from_title("Photos/2022")
 
         self.assertEqual(new_album_info, fetched_album_info)
 
+    def test_setup__clients_in_parallel__indexes_albums_from_all_clients(self):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repo)
+        client_2 = FakeGPhotosClient(repo)
+        client_1.authenticate()
+        client_2.authenticate()
+        album_1 = client_1.albums().create_album("Photos/2011")
+        client_1.albums().share_album(album_1["id"])
+        album_2 = client_2.albums().create_album("Photos/2012")
+        client_2.albums().share_album(album_2["id"])
+
+        shared_album_repo = SharedAlbumRepository(
+            [client_1, client_2], max_clients_in_parallel=2
+        )
+        shared_album_repo.setup()
+
+        album_1_info = shared_album_repo.get_album_from_title("Photos/2011")
+        album_2_info = shared_album_repo.get_album_from_title("Photos/2012")
+        self.assertEqual(album_1_info.id, album_1["id"])
+        self.assertEqual(album_1_info.client_idx, 0)
+        self.assertEqual(album_2_info.id, album_2["id"])
+        self.assertEqual(album_2_info.client_idx, 1)
+        self.assertEqual(shared_album_repo.get_duplicate_album_titles(), {})
+
+    def test_setup__same_title_in_different_clients__reports_duplicate_title(self):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repo)
+        client_2 = FakeGPhotosClient(repo)
+        client_1.authenticate()
+        client_2.authenticate()
+        album_1 = client_1.albums().create_album("Photos/2011")
+        client_1.albums().share_album(album_1["id"])
+        album_2 = client_2.albums().create_album("Photos/2011")
+        client_2.albums().share_album(album_2["id"])
+
+        shared_album_repo = SharedAlbumRepository(
+            [client_1, client_2], max_clients_in_parallel=2
+        )
+        shared_album_repo.setup()
+
+        duplicate_album_titles = shared_album_repo.get_duplicate_album_titles()
+        self.assertEqual(list(duplicate_album_titles.keys()), ["Photos/2011"])
+        self.assertEqual(
+            [album.id for album in duplicate_album_titles["Photos/2011"]],
+            [album_1["id"], album_2["id"]],
+        )
+        self.assertEqual(
+            shared_album_repo.get_album_from_title("Photos/2011").id, album_2["id"]
+        )
+
+    def test_setup__album_shared_with_many_clients__does_not_report_duplicate_title(
+        self,
+    ):
+        repo = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repo)
+        client_2 = FakeGPhotosClient(repo)
+        client_1.authenticate()
+        client_2.authenticate()
+        album = client_1.albums().create_album("Photos/2011")
+        share_info = client_1.albums().share_album(album["id"])
+        client_2.albums().join_album(share_info["shareInfo"]["shareToken"])
+
+        shared_album_repo = SharedAlbumRepository([client_1, client_2])
+        shared_album_repo.setup()
+
+        self.assertEqual(shared_album_repo.get_duplicate_album_titles(), {})
+
 
 class TrackFetchedListSharedAlbumCalls:
     def __init__(self, client):
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+from freezegun import freeze_time
+
+from sharded_google_photos.backup.storage_quota_tracker import StorageQuotaTracker
+
+
+class StorageQuotaTrackerTests(unittest.TestCase):
+    def test_get_storage_quota__called_twice__fetches_quota_once(self):
+        client = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        tracker = StorageQuotaTracker()
+
+        self.assertEqual(tracker.get_storage_quota(client), (1000, 200))
+        self.assertEqual(tracker.get_storage_quota(client), (1000, 200))
+
+        self.assertEqual(client.get_storage_quota.call_count, 1)
+        self.assertTrue(tracker.is_cached("bob@gmail.com"))
+
+    def test_get_storage_quota__after_add_usage__returns_limit_and_new_usage(self):
+        client = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        tracker = StorageQuotaTracker()
+        tracker.get_storage_quota(client)
+
+        tracker.add_usage("bob@gmail.com", 300)
+
+        self.assertEqual(tracker.get_storage_quota(client), (1000, 500))
+
+    def test_get_storage_quota__expired_quota__fetches_quota_again(self):
+        client = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        tracker = StorageQuotaTracker(max_age_in_seconds=60)
+
+        with freeze_time("Jan 14th, 2020 10:00:00"):
+            tracker.get_storage_quota(client)
+
+        with freeze_time("Jan 14th, 2020 10:00:59"):
+            tracker.get_storage_quota(client)
+            self.assertEqual(client.get_storage_quota.call_count, 1)
+
+        with freeze_time("Jan 14th, 2020 10:01:01"):
+            self.assertFalse(tracker.is_cached("bob@gmail.com"))
+            tracker.get_storage_quota(client)
+            self.assertEqual(client.get_storage_quota.call_count, 2)
+
+    def test_add_usage__cached_quota__adds_to_usage(self):
+        client_1 = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        client_2 = self.__create_client("alice@gmail.com", limit=1000, usage=0)
+        tracker = StorageQuotaTracker()
+        tracker.get_storage_quota(client_1)
+        tracker.get_storage_quota(client_2)
+
+        tracker.add_usage("bob@gmail.com", 300)
+        tracker.add_usage("bob@gmail.com", 100)
+
+        self.assertEqual(tracker.get_storage_quota(client_1), (1000, 600))
+        self.assertEqual(tracker.get_storage_quota(client_2), (1000, 0))
+        self.assertEqual(client_1.get_storage_quota.call_count, 1)
+
+    def test_add_usage__unknown_account__does_nothing(self):
+        client = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        tracker = StorageQuotaTracker()
+
+        tracker.add_usage("bob@gmail.com", 300)
+
+        self.assertFalse(tracker.is_cached("bob@gmail.com"))
+        self.assertEqual(tracker.get_storage_quota(client), (1000, 200))
+
+    def test_expire__cached_quota__fetches_quota_again(self):
+        client = self.__create_client("bob@gmail.com", limit=1000, usage=200)
+        tracker = StorageQuotaTracker()
+        tracker.get_storage_quota(client)
+        tracker.add_usage("bob@gmail.com", 300)
+
+        tracker.expire("bob@gmail.com")
+
+        self.assertEqual(tracker.get_storage_quota(client), (1000, 200))
+        self.assertEqual(client.get_storage_quota.call_count, 2)
+
+    def __create_client(self, name: str, limit: int, usage: int):
+        client = MagicMock()
+        client.name = name
+        client.get_storage_quota.return_value = {
+            "limit": str(limit),
+            "usage": str(usage),
+        }
+        return client
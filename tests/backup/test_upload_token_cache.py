@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from freezegun import freeze_time
+
+from sharded_google_photos.backup.upload_token_cache import UploadTokenCache
+
+
+class UploadTokenCacheTests(unittest.TestCase):
+    def test_get_upload_token__saved_upload_token__returns_upload_token(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = self.__create_file(tmp_dir, "1.jpg")
+            cache = UploadTokenCache(os.path.join(tmp_dir, "cache.db"))
+            cache.save_upload_token("bob@gmail.com", file_path, "token-1")
+
+            # Reopen the cache to check that it is persisted
+            cache = UploadTokenCache(os.path.join(tmp_dir, "cache.db"))
+
+            self.assertEqual(
+                cache.get_upload_token("bob@gmail.com", file_path), "token-1"
+            )
+            self.assertIsNone(cache.get_upload_token("alice@gmail.com", file_path))
+
+    def test_get_upload_token__expired_upload_token__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = self.__create_file(tmp_dir, "1.jpg")
+            cache = UploadTokenCache(os.path.join(tmp_dir, "cache.db"), 60)
+
+            with freeze_time("Jan 14th, 2020 10:00:00"):
+                cache.save_upload_token("bob@gmail.com", file_path, "token-1")
+
+            with freeze_time("Jan 14th, 2020 10:00:59"):
+                self.assertEqual(
+                    cache.get_upload_token("bob@gmail.com", file_path), "token-1"
+                )
+
+            with freeze_time("Jan 14th, 2020 10:01:01"):
+                self.assertIsNone(cache.get_upload_token("bob@gmail.com", file_path))
+
+    def test_remove_upload_tokens__saved_upload_tokens__removes_upload_tokens(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path_1 = self.__create_file(tmp_dir, "1.jpg")
+            file_path_2 = self.__create_file(tmp_dir, "2.jpg")
+            cache = UploadTokenCache(os.path.join(tmp_dir, "cache.db"))
+            cache.save_upload_token("bob@gmail.com", file_path_1, "token-1")
+            cache.save_upload_token("bob@gmail.com", file_path_2, "token-2")
+
+            cache.remove_upload_tokens(["token-1"])
+
+            self.assertIsNone(cache.get_upload_token("bob@gmail.com", file_path_1))
+            self.assertEqual(
+                cache.get_upload_token("bob@gmail.com", file_path_2), "token-2"
+            )
+
+    def __create_file(self, dir: str, file_name: str) -> str:
+        file_path = os.path.join(dir, file_name)
+        with open(file_path, "wb") as file:
+            file.write(file_name.encode())
+        return file_path
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from sharded_google_photos.cleanup.cleaner_state import CleanerState
+
+
+class CleanerStateTests(unittest.TestCase):
+    def test_get_watermark__no_watermark__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+
+            self.assertIsNone(state.get_watermark("bob@gmail.com"))
+
+    def test_commit_staged_changes__returns_watermark_per_account(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            watermark = datetime(2024, 1, 5, 10, 30, tzinfo=timezone.utc)
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            state.commit_staged_changes("bob@gmail.com", watermark)
+
+            # Reopen the state to check that it is persisted
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+
+            self.assertEqual(state.get_watermark("bob@gmail.com"), watermark)
+            self.assertIsNone(state.get_watermark("alice@gmail.com"))
+
+    def test_commit_staged_changes__replaces_album_media_items(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 2, ["1", "2"])
+            state.stage_album_media_item_ids("bob@gmail.com", "album-2", 1, ["3"])
+            state.commit_staged_changes("bob@gmail.com", None)
+
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 1, ["2"])
+            state.commit_staged_changes("bob@gmail.com", None)
+
+            self.assertEqual(
+                state.get_album_media_items_counts("bob@gmail.com"),
+                {"album-1": 1, "album-2": 1},
+            )
+            self.assertEqual(
+                state.get_album_media_item_ids("bob@gmail.com", "album-1"), ["2"]
+            )
+            self.assertEqual(state.get_album_media_items_counts("alice@gmail.com"), {})
+
+    def test_commit_staged_changes__applies_staged_albums_and_watermark(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            watermark = datetime(2024, 1, 5, 10, 30, tzinfo=timezone.utc)
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 2, ["1", "2"])
+            state.stage_album_media_item_ids("bob@gmail.com", "album-2", 1, ["3"])
+            state.commit_staged_changes("bob@gmail.com", None)
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 1, ["2"])
+            state.stage_album_removal("bob@gmail.com", "album-2")
+
+            # Nothing changes until the staged albums are committed
+            self.assertEqual(
+                state.get_album_media_items_counts("bob@gmail.com"),
+                {"album-1": 2, "album-2": 1},
+            )
+
+            state.commit_staged_changes("bob@gmail.com", watermark)
+
+            self.assertEqual(
+                state.get_album_media_items_counts("bob@gmail.com"), {"album-1": 1}
+            )
+            self.assertEqual(
+                state.get_album_media_item_ids("bob@gmail.com", "album-1"), ["2"]
+            )
+            self.assertEqual(
+                state.get_album_media_item_ids("bob@gmail.com", "album-2"), []
+            )
+            self.assertEqual(state.get_watermark("bob@gmail.com"), watermark)
+
+    def test_discard_staged_changes__keeps_albums(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 2, ["1", "2"])
+            state.commit_staged_changes("bob@gmail.com", None)
+            state.stage_album_media_item_ids("bob@gmail.com", "album-1", 1, ["2"])
+
+            state.discard_staged_changes("bob@gmail.com")
+            state.commit_staged_changes("bob@gmail.com", None)
+
+            self.assertEqual(
+                state.get_album_media_items_counts("bob@gmail.com"), {"album-1": 2}
+            )
+            self.assertIsNone(state.get_watermark("bob@gmail.com"))
+
+    def test_commit_staged_changes__keeps_last_full_scan_time_unless_given(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            full_scan_time = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+            watermark = datetime(2024, 1, 5, 10, 30, tzinfo=timezone.utc)
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            state.commit_staged_changes("bob@gmail.com", full_scan_time, full_scan_time)
+
+            state.commit_staged_changes("bob@gmail.com", watermark)
+
+            self.assertEqual(
+                state.get_last_full_scan_time("bob@gmail.com"), full_scan_time
+            )
+            self.assertEqual(state.get_watermark("bob@gmail.com"), watermark)
+            self.assertIsNone(state.get_last_full_scan_time("alice@gmail.com"))
@@ -1,10 +1,23 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
+from unittest.mock import patch
+from freezegun import freeze_time
 
 from sharded_google_photos.cleanup import events
+from sharded_google_photos.cleanup.cleaner_state import CleanerState
 from sharded_google_photos.cleanup.gphotos_cleaner import GPhotosCleaner
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeGPhotosClient
 from sharded_google_photos.shared.testing.fake_gphotos_client import FakeItemsRepository
 from sharded_google_photos.shared.testing.fake_eventbus import FakeEventBus
+from sharded_google_photos.shared.testing.fake_gphotos_album_client import (
+    FakeGPhotosAlbumClient,
+)
+from sharded_google_photos.shared.testing.fake_gphotos_mediaitem_client import (
+    FakeGPhotosMediaItemClient,
+)
 
 num_found_trash_album_events_called = 0
 num_created_trash_album_events_called = 0
@@ -148,15 +161,18 @@ class GPhotosClientTests(unittest.TestCase):
 
         print(m1)
 
+        m1_id = m1["newMediaItemResults"][0]["mediaItem"]["id"]
         emitted_events = event_bus.get_events_emitted()
-        self.assertEqual(len(emitted_events), 3)
+        self.assertEqual(len(emitted_events), 4)
         self.assertEqual(emitted_events[0].name, events.CREATED_TRASH_ALBUM)
-        self.assertEqual(emitted_events[1].name, events.FOUND_MEDIA_ITEMS_IN_ALBUMS)
-        self.assertEqual(emitted_events[1].args[0], set())
-        self.assertEqual(emitted_events[2].name, events.ADDED_MEDIA_ITEMS_TO_TRASH)
+        self.assertEqual(emitted_events[1].name, events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS)
+        self.assertEqual(emitted_events[1].args[0], 0)
         self.assertEqual(
-            emitted_events[2].args[0], [m1["newMediaItemResults"][0]["mediaItem"]["id"]]
+            emitted_events[2].name, events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH
         )
+        self.assertEqual(emitted_events[2].args[0], [m1_id])
+        self.assertEqual(emitted_events[3].name, events.ADDED_MEDIA_ITEMS_TO_TRASH)
+        self.assertEqual(emitted_events[3].args[0], [m1_id])
 
     def test_mark_unalbumed_photos_to_trash__existing_trash_album__events_emitted(self):
         repository = FakeItemsRepository()
@@ -170,15 +186,622 @@ class GPhotosClientTests(unittest.TestCase):
         cleaner = GPhotosCleaner(client, event_bus)
         cleaner.mark_unalbumed_photos_to_trash()
 
+        m1_id = m1["newMediaItemResults"][0]["mediaItem"]["id"]
         emitted_events = event_bus.get_events_emitted()
-        self.assertEqual(len(emitted_events), 3)
+        self.assertEqual(len(emitted_events), 4)
         self.assertEqual(emitted_events[0].name, events.FOUND_TRASH_ALBUM)
-        self.assertEqual(emitted_events[1].name, events.FOUND_MEDIA_ITEMS_IN_ALBUMS)
-        self.assertEqual(emitted_events[1].args[0], set())
-        self.assertEqual(emitted_events[2].name, events.ADDED_MEDIA_ITEMS_TO_TRASH)
+        self.assertEqual(emitted_events[1].name, events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS)
+        self.assertEqual(emitted_events[1].args[0], 0)
         self.assertEqual(
-            emitted_events[2].args[0], [m1["newMediaItemResults"][0]["mediaItem"]["id"]]
+            emitted_events[2].name, events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH
         )
+        self.assertEqual(emitted_events[2].args[0], [m1_id])
+        self.assertEqual(emitted_events[3].name, events.ADDED_MEDIA_ITEMS_TO_TRASH)
+        self.assertEqual(emitted_events[3].args[0], [m1_id])
+
+    def test_mark_unalbumed_photos_to_trash__more_than_50_unalbumed_photos__emits_event_per_chunk(
+        self,
+    ):
+        repository = FakeItemsRepository()
+        client = FakeGPhotosClient(repository=repository)
+        client.authenticate()
+        u1 = client.media_items().upload_photo("A/1.jpg", "1.jpg")
+        a1 = client.albums().create_album("A")["id"]
+        client.albums().share_album(a1)
+        client.media_items().add_uploaded_photos_to_gphotos([u1], a1)
+        for i in range(0, 60):
+            item = client.media_items().upload_photo(f"B/{i}.jpg", f"{i}.jpg")
+            client.media_items().add_uploaded_photos_to_gphotos([item])
+        event_bus = FakeEventBus()
+
+        cleaner = GPhotosCleaner(client, event_bus)
+        cleaner.mark_unalbumed_photos_to_trash()
+
+        emitted_events = event_bus.get_events_emitted()
+        self.assertEqual(len(emitted_events), 5)
+        self.assertEqual(emitted_events[1].name, events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS)
+        self.assertEqual(emitted_events[1].args[0], 1)
+        self.assertEqual(
+            emitted_events[2].name, events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH
+        )
+        self.assertEqual(len(emitted_events[2].args[0]), 50)
+        self.assertEqual(
+            emitted_events[3].name, events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH
+        )
+        self.assertEqual(len(emitted_events[3].args[0]), 10)
+        self.assertEqual(emitted_events[4].name, events.ADDED_MEDIA_ITEMS_TO_TRASH)
+        self.assertEqual(len(emitted_events[4].args[0]), 60)
+
+    def test_mark_unalbumed_photos_to_trash__trash_batches_in_parallel__puts_photos_to_trash(
+        self,
+    ):
+        uploads = []
+        for i in range(0, 120):
+            item = self.client_1.media_items().upload_photo(f"A/{i}.jpg", f"{i}.jpg")
+            upload = self.client_1.media_items().add_uploaded_photos_to_gphotos([item])
+            uploads += upload["newMediaItemResults"]
+        event_bus = FakeEventBus()
+
+        cleaner = GPhotosCleaner(
+            self.client_1, event_bus, max_trash_batches_in_parallel=3
+        )
+        cleaner.mark_unalbumed_photos_to_trash()
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(
+            {"newMediaItemResults": uploads}
+        )
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+        added_events = [
+            e
+            for e in event_bus.get_events_emitted()
+            if e.name == events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH
+        ]
+        self.assertEqual(sorted(len(e.args[0]) for e in added_events), [20, 50, 50])
+
+    def test_mark_unalbumed_photos_to_trash__failed_trash_batch__reports_it_and_adds_other_batches(
+        self,
+    ):
+        for i in range(0, 60):
+            item = self.client_1.media_items().upload_photo(f"A/{i}.jpg", f"{i}.jpg")
+            self.client_1.media_items().add_uploaded_photos_to_gphotos([item])
+        event_bus = FakeEventBus()
+        error = Exception("Request failed")
+        original_add_photos_to_album = FakeGPhotosAlbumClient.add_photos_to_album
+
+        def fake_add_photos_to_album(albums_client, album_id, media_item_ids):
+            if len(media_item_ids) == 50:
+                raise error
+            return original_add_photos_to_album(albums_client, album_id, media_item_ids)
+
+        with patch.object(
+            FakeGPhotosAlbumClient,
+            "add_photos_to_album",
+            autospec=True,
+            side_effect=fake_add_photos_to_album,
+        ):
+            cleaner = GPhotosCleaner(
+                self.client_1, event_bus, max_trash_batches_in_parallel=2
+            )
+            cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(len(self.__get_media_item_ids_in_trash__(self.client_1)), 10)
+        failed_events = [
+            e
+            for e in event_bus.get_events_emitted()
+            if e.name == events.FAILED_TO_ADD_MEDIA_ITEMS_TO_TRASH
+        ]
+        self.assertEqual(len(failed_events), 1)
+        self.assertEqual(len(failed_events[0].args[0]), 50)
+        self.assertEqual(failed_events[0].args[1], error)
+        added_events = [
+            e
+            for e in event_bus.get_events_emitted()
+            if e.name == events.ADDED_MEDIA_ITEMS_TO_TRASH
+        ]
+        self.assertEqual(len(added_events), 1)
+        self.assertEqual(len(added_events[0].args[0]), 10)
+
+    def test_mark_unalbumed_photos_to_trash__max_trash_batches_per_second__waits_between_batches(
+        self,
+    ):
+        for i in range(0, 150):
+            item = self.client_1.media_items().upload_photo(f"A/{i}.jpg", f"{i}.jpg")
+            self.client_1.media_items().add_uploaded_photos_to_gphotos([item])
+
+        with patch(
+            "sharded_google_photos.shared.bandwidth_limiter.time.sleep"
+        ) as mock_sleep:
+            cleaner = GPhotosCleaner(self.client_1, max_trash_batches_per_second=1)
+            cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(len(self.__get_media_item_ids_in_trash__(self.client_1)), 150)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_mark_unalbumed_photos_to_trash__albums_in_parallel__puts_non_shared_photos_to_trash(
+        self,
+    ):
+        # Test setup: Add six photos in client 1 with four of them in shared albums
+        uploads = [
+            self.client_1.media_items().upload_photo(f"A/{i}.jpg", f"{i}.jpg")
+            for i in range(6)
+        ]
+        for i, title in enumerate(["A", "B", "C", "D"]):
+            album_id = self.client_1.albums().create_album(title)["id"]
+            self.client_1.albums().share_album(album_id)
+            self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                [uploads[i]], album_id
+            )
+        upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+            uploads[4:]
+        )
+
+        # Act: Clean on the client, listing every album at the same time
+        cleaner = GPhotosCleaner(self.client_1, max_albums_in_parallel=4)
+        cleaner.mark_unalbumed_photos_to_trash()
+
+        # Assertions: Check that only the photos outside of albums are in the trash
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__slow_album_scan__lists_all_media_items_at_the_same_time(
+        self,
+    ):
+        u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+        u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+        a1 = self.client_1.albums().create_album("A")["id"]
+        self.client_1.albums().share_album(a1)
+        self.client_1.media_items().add_uploaded_photos_to_gphotos([u1], a1)
+        upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos([u2])
+
+        # Hold the album scan until all of the media items start being listed
+        original_iter_media_items = FakeGPhotosMediaItemClient.iter_media_items
+        started_listing_all_media_items = threading.Event()
+        album_scan_waited = []
+
+        def fake_iter_media_items(media_items_client, album_id=None, **kwargs):
+            if album_id is None:
+                started_listing_all_media_items.set()
+            else:
+                album_scan_waited.append(started_listing_all_media_items.wait(5))
+            return original_iter_media_items(media_items_client, album_id, **kwargs)
+
+        with patch.object(
+            FakeGPhotosMediaItemClient,
+            "iter_media_items",
+            autospec=True,
+            side_effect=fake_iter_media_items,
+        ):
+            cleaner = GPhotosCleaner(self.client_1)
+            cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(album_scan_waited, [True])
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__slow_album_scan__holds_on_to_few_media_items(
+        self,
+    ):
+        for i in range(5):
+            item = self.client_1.media_items().upload_photo(f"A/{i}.jpg", f"{i}.jpg")
+            self.client_1.media_items().add_uploaded_photos_to_gphotos([item])
+        a1 = self.client_1.albums().create_album("A")["id"]
+        self.client_1.albums().share_album(a1)
+
+        # Count the media items listed by the time that the album is scanned
+        original_iter_media_items = FakeGPhotosMediaItemClient.iter_media_items
+        started_listing_all_media_items = threading.Event()
+        num_media_items_listed = 0
+        num_media_items_listed_before_album_scan = []
+
+        def iter_all_media_items(media_items_client, **kwargs):
+            nonlocal num_media_items_listed
+            started_listing_all_media_items.set()
+            for media_item in original_iter_media_items(media_items_client, **kwargs):
+                num_media_items_listed += 1
+                yield media_item
+
+        def fake_iter_media_items(media_items_client, album_id=None, **kwargs):
+            if album_id is None:
+                return iter_all_media_items(media_items_client, **kwargs)
+
+            started_listing_all_media_items.wait(5)
+            time.sleep(0.2)
+            num_media_items_listed_before_album_scan.append(num_media_items_listed)
+            return original_iter_media_items(media_items_client, album_id, **kwargs)
+
+        with patch.object(
+            FakeGPhotosMediaItemClient,
+            "iter_media_items",
+            autospec=True,
+            side_effect=fake_iter_media_items,
+        ), patch(
+            "sharded_google_photos.cleanup.gphotos_cleaner"
+            + ".MAX_MEDIA_ITEM_IDS_WAITING_FOR_ALBUM_SCANS",
+            2,
+        ):
+            cleaner = GPhotosCleaner(self.client_1)
+            results = cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(num_media_items_listed_before_album_scan, [2])
+        self.assertEqual(results.num_media_items_trashed, 5)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state__only_lists_new_media_items(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2]
+                )
+                self.__set_creation_time__(upload_2, "2024-01-05T10:00:00Z")
+
+                with TrackIterMediaItemsCalls(self.client_1) as fake_iter_media_items:
+                    GPhotosCleaner(
+                        self.client_1, cleaner_state=state
+                    ).mark_unalbumed_photos_to_trash()
+
+                # The unchanged album is only listed again to check the new
+                # media item that is in no album
+                self.assertEqual(fake_iter_media_items.call_count, 2)
+                self.assertEqual(fake_iter_media_items.call_args_list[1].args, (a1,))
+                self.assertEqual(
+                    fake_iter_media_items.call_args_list[0].kwargs["filters"],
+                    {
+                        "dateFilter": {
+                            "ranges": [
+                                {
+                                    "startDate": {"year": 2024, "month": 1, "day": 1},
+                                    "endDate": {"year": 2024, "month": 1, "day": 6},
+                                }
+                            ]
+                        }
+                    },
+                )
+                self.assertEqual(
+                    state.get_watermark(self.client_1.name).date().isoformat(),
+                    "2024-01-05",
+                )
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state__trashes_old_photos_removed_from_albums(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                u2 = self.client_1.media_items().upload_photo("B/2.jpg", "2.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                a2 = self.client_1.albums().create_album("B")["id"]
+                self.client_1.albums().share_album(a1)
+                self.client_1.albums().share_album(a2)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2], a2
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                self.__set_creation_time__(upload_2, "2024-01-01T10:00:00Z")
+
+            with freeze_time("Jan 3rd, 2024 10:00:00"):
+                u3 = self.client_1.media_items().upload_photo("A/3.jpg", "3.jpg")
+                upload_3 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u3], a1
+                )
+                self.__set_creation_time__(upload_3, "2024-01-03T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                self.client_1.albums().remove_photos_from_album(
+                    a1, list(self.__get_media_ids_from_uploaded_files__(upload_1))
+                )
+                self.client_1.albums().unshare_album(a2)
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(
+            upload_1
+        ) | self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_no_new_media_items__does_not_list_unchanged_albums(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                with TrackIterMediaItemsCalls(self.client_1) as fake_iter_media_items:
+                    GPhotosCleaner(
+                        self.client_1, cleaner_state=state
+                    ).mark_unalbumed_photos_to_trash()
+
+                self.assertEqual(fake_iter_media_items.call_count, 1)
+
+        self.assertEqual(self.__get_media_item_ids_in_trash__(self.client_1), set())
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_swapped_media_item__trashes_only_removed_media_item(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                self.__set_creation_time__(upload_2, "2024-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            # Replace a photo in the album, which keeps its number of photos
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                self.client_1.albums().remove_photos_from_album(
+                    a1, list(self.__get_media_ids_from_uploaded_files__(upload_1))
+                )
+                u3 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                upload_3 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u3], a1
+                )
+                self.__set_creation_time__(upload_3, "2024-01-05T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            self.assertEqual(
+                set(state.get_album_media_item_ids(self.client_1.name, a1)),
+                self.__get_media_ids_from_uploaded_files__(upload_2)
+                | self.__get_media_ids_from_uploaded_files__(upload_3),
+            )
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_1)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_crash__trashes_removed_photos_on_next_run(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1, u2], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+
+            with freeze_time("Jan 3rd, 2024 10:00:00"):
+                u3 = self.client_1.media_items().upload_photo("A/3.jpg", "3.jpg")
+                upload_3 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u3], a1
+                )
+                self.__set_creation_time__(upload_3, "2024-01-03T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                self.client_1.albums().remove_photos_from_album(
+                    a1, list(self.__get_media_ids_from_uploaded_files__(upload_1))
+                )
+                with patch.object(
+                    FakeGPhotosAlbumClient,
+                    "add_photos_to_album",
+                    autospec=True,
+                    side_effect=KeyboardInterrupt(),
+                ):
+                    with self.assertRaises(KeyboardInterrupt):
+                        GPhotosCleaner(
+                            self.client_1, cleaner_state=state
+                        ).mark_unalbumed_photos_to_trash()
+
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_1)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_failed_trash_batch__trashes_them_on_next_run(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            with freeze_time("Jan 3rd, 2024 10:00:00"):
+                self.client_1.albums().remove_photos_from_album(
+                    a1, list(self.__get_media_ids_from_uploaded_files__(upload_1))
+                )
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2], a1
+                )
+                self.__set_creation_time__(upload_2, "2024-01-03T10:00:00Z")
+                with patch.object(
+                    FakeGPhotosAlbumClient,
+                    "add_photos_to_album",
+                    autospec=True,
+                    side_effect=Exception("Request failed"),
+                ):
+                    results = GPhotosCleaner(
+                        self.client_1, cleaner_state=state
+                    ).mark_unalbumed_photos_to_trash()
+
+                self.assertEqual(results.num_media_items_failed_to_trash, 1)
+                self.assertEqual(
+                    state.get_watermark(self.client_1.name).date().isoformat(),
+                    "2024-01-01",
+                )
+
+            with freeze_time("Jan 5th, 2024 10:00:00"):
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_1)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_new_photo_taken_long_ago__trashes_it_on_next_full_scan(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                self.__set_creation_time__(upload_1, "2024-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+            # Upload a photo that was taken long before the last run
+            with freeze_time("Jan 3rd, 2024 10:00:00"):
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2]
+                )
+                self.__set_creation_time__(upload_2, "2014-10-02T15:01:23Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+                self.assertEqual(
+                    self.__get_media_item_ids_in_trash__(self.client_1), set()
+                )
+
+            with freeze_time("Jan 8th, 2024 10:00:00"):
+                with TrackIterMediaItemsCalls(self.client_1) as fake_iter_media_items:
+                    GPhotosCleaner(
+                        self.client_1, cleaner_state=state
+                    ).mark_unalbumed_photos_to_trash()
+
+                self.assertIsNone(
+                    fake_iter_media_items.call_args_list[0].kwargs["filters"]
+                )
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def test_mark_unalbumed_photos_to_trash__with_cleaner_state_and_photo_dated_in_future__caps_watermark_at_start_of_run(
+        self,
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = CleanerState(os.path.join(tmp_dir, "state.db"))
+            with freeze_time("Jan 1st, 2024 10:00:00"):
+                u1 = self.client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+                a1 = self.client_1.albums().create_album("A")["id"]
+                self.client_1.albums().share_album(a1)
+                upload_1 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u1], a1
+                )
+                self.__set_creation_time__(upload_1, "2030-01-01T10:00:00Z")
+                GPhotosCleaner(
+                    self.client_1, cleaner_state=state
+                ).mark_unalbumed_photos_to_trash()
+
+                self.assertEqual(
+                    state.get_watermark(self.client_1.name).isoformat(),
+                    "2024-01-01T10:00:00+00:00",
+                )
+
+            with freeze_time("Jan 3rd, 2024 10:00:00"):
+                u2 = self.client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+                upload_2 = self.client_1.media_items().add_uploaded_photos_to_gphotos(
+                    [u2]
+                )
+                self.__set_creation_time__(upload_2, "2024-01-02T10:00:00Z")
+
+                with TrackIterMediaItemsCalls(self.client_1) as fake_iter_media_items:
+                    GPhotosCleaner(
+                        self.client_1, cleaner_state=state
+                    ).mark_unalbumed_photos_to_trash()
+
+                self.assertEqual(
+                    fake_iter_media_items.call_args_list[0].kwargs["filters"],
+                    {
+                        "dateFilter": {
+                            "ranges": [
+                                {
+                                    "startDate": {"year": 2024, "month": 1, "day": 1},
+                                    "endDate": {"year": 2024, "month": 1, "day": 4},
+                                }
+                            ]
+                        }
+                    },
+                )
+
+        media_item_ids_in_trash = self.__get_media_item_ids_in_trash__(self.client_1)
+        expected_media_item_ids = self.__get_media_ids_from_uploaded_files__(upload_2)
+        self.assertEqual(media_item_ids_in_trash, expected_media_item_ids)
+
+    def __set_creation_time__(self, upload_results, creation_time):
+        for media_item_id in self.__get_media_ids_from_uploaded_files__(upload_results):
+            self.repository.set_media_item_creation_time(media_item_id, creation_time)
 
     def __get_media_item_ids_in_trash__(self, client):
         albums = client.albums().list_albums()
@@ -194,3 +817,19 @@ class GPhotosClientTests(unittest.TestCase):
                 for upload in upload_results["newMediaItemResults"]
             ]
         )
+
+
+class TrackIterMediaItemsCalls:
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        self.fake_iter_media_items = patch.object(
+            FakeGPhotosMediaItemClient,
+            "iter_media_items",
+            wraps=self.client.media_items().iter_media_items,
+        )
+        return self.fake_iter_media_items.__enter__()
+
+    def __exit__(self, exc, value, tb):
+        self.fake_iter_media_items.__exit__(exc, value, tb)
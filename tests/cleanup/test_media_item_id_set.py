@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+from sharded_google_photos.cleanup.media_item_id_set import MediaItemIdSet
+
+
+class MediaItemIdSetTests(unittest.TestCase):
+    def test_contains__added_ids__returns_true(self):
+        media_item_ids = MediaItemIdSet()
+        for i in range(1000):
+            media_item_ids.add(f"media-item-{i}")
+
+        for i in range(1000):
+            self.assertIn(f"media-item-{i}", media_item_ids)
+
+    def test_contains__unknown_id__returns_false(self):
+        media_item_ids = MediaItemIdSet()
+        media_item_ids.add("1")
+        media_item_ids.add("2")
+
+        self.assertNotIn("3", media_item_ids)
+        self.assertNotIn("", media_item_ids)
+
+    def test_contains__empty_set__returns_false(self):
+        self.assertNotIn("1", MediaItemIdSet())
+
+    def test_add__after_lookup__returns_new_id(self):
+        media_item_ids = MediaItemIdSet()
+        media_item_ids.add("1")
+        self.assertNotIn("2", media_item_ids)
+
+        media_item_ids.add("2")
+
+        self.assertIn("1", media_item_ids)
+        self.assertIn("2", media_item_ids)
+
+    def test_len__duplicate_ids__counts_each_id_once(self):
+        media_item_ids = MediaItemIdSet()
+        media_item_ids.add("1")
+        media_item_ids.add("2")
+        media_item_ids.add("1")
+
+        self.assertEqual(len(media_item_ids), 2)
+
+    def test_contains__ids_added_over_many_chunks_and_lookups__returns_each_id_once(
+        self,
+    ):
+        with patch(
+            "sharded_google_photos.cleanup.media_item_id_set.SORT_CHUNK_SIZE", 3
+        ):
+            media_item_ids = MediaItemIdSet()
+            for i in range(10):
+                media_item_ids.add(f"media-item-{i}")
+            self.assertIn("media-item-0", media_item_ids)
+
+            for i in range(5, 20):
+                media_item_ids.add(f"media-item-{i}")
+
+            self.assertEqual(len(media_item_ids), 20)
+            for i in range(20):
+                self.assertIn(f"media-item-{i}", media_item_ids)
+            self.assertNotIn("media-item-20", media_item_ids)
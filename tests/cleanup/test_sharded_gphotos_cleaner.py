@@ -0,0 +1,142 @@
+import unittest
+
+from sharded_google_photos.cleanup import events as cleaner_events
+from sharded_google_photos.cleanup import sharded_gphotos_cleaner_events as events
+from sharded_google_photos.cleanup.sharded_gphotos_cleaner import (
+    ShardedGPhotosCleaner,
+)
+from sharded_google_photos.shared.testing.fake_gphotos_client import FakeGPhotosClient
+from sharded_google_photos.shared.testing.fake_gphotos_client import FakeItemsRepository
+from sharded_google_photos.shared.testing.fake_eventbus import FakeEventBus
+
+
+class ShardedGPhotosCleanerTests(unittest.TestCase):
+    def test_mark_unalbumed_photos_to_trash__many_clients__puts_photos_to_trash_in_each_client(
+        self,
+    ):
+        repository = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository, "bob@gmail.com")
+        client_2 = FakeGPhotosClient(repository, "alice@gmail.com")
+        client_1.authenticate()
+        client_2.authenticate()
+        u1 = client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+        u2 = client_1.media_items().upload_photo("A/2.jpg", "2.jpg")
+        a1 = client_1.albums().create_album("A")["id"]
+        client_1.albums().share_album(a1)
+        client_1.media_items().add_uploaded_photos_to_gphotos([u1], a1)
+        m2 = client_1.media_items().add_uploaded_photos_to_gphotos([u2])
+        u3 = client_2.media_items().upload_photo("B/3.jpg", "3.jpg")
+        u4 = client_2.media_items().upload_photo("B/4.jpg", "4.jpg")
+        m3 = client_2.media_items().add_uploaded_photos_to_gphotos([u3, u4])
+
+        cleaner = ShardedGPhotosCleaner([client_1, client_2], max_clients_in_parallel=2)
+        results = cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(
+            self.__get_media_item_ids_in_trash__(client_1),
+            self.__get_media_ids_from_uploaded_files__(m2),
+        )
+        self.assertEqual(
+            self.__get_media_item_ids_in_trash__(client_2),
+            self.__get_media_ids_from_uploaded_files__(m3),
+        )
+        self.assertEqual(results.num_media_items_trashed, 3)
+        self.assertEqual(results.num_media_items_failed_to_trash, 0)
+        self.assertEqual(
+            results.account_results["bob@gmail.com"].num_media_items_trashed, 1
+        )
+        self.assertEqual(
+            results.account_results["alice@gmail.com"].num_media_items_trashed, 2
+        )
+        self.assertEqual(results.account_errors, {})
+
+    def test_mark_unalbumed_photos_to_trash__many_clients__emits_events_of_each_client(
+        self,
+    ):
+        repository = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository, "bob@gmail.com")
+        client_2 = FakeGPhotosClient(repository, "alice@gmail.com")
+        client_1.authenticate()
+        client_2.authenticate()
+        u1 = client_1.media_items().upload_photo("A/1.jpg", "1.jpg")
+        m1 = client_1.media_items().add_uploaded_photos_to_gphotos([u1])
+        client_2.albums().create_album("Trash")
+        event_bus = FakeEventBus()
+
+        cleaner = ShardedGPhotosCleaner([client_1, client_2], event_bus)
+        cleaner.mark_unalbumed_photos_to_trash()
+
+        emitted_events = [(e.name, e.args) for e in event_bus.get_events_emitted()]
+        bob_events = [e for e in emitted_events if e[1][0] == "bob@gmail.com"]
+        alice_events = [e for e in emitted_events if e[1][0] == "alice@gmail.com"]
+        self.assertEqual(
+            [name for name, _ in bob_events],
+            [
+                events.STARTED_CLEANING_ACCOUNT,
+                cleaner_events.CREATED_TRASH_ALBUM,
+                cleaner_events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS,
+                cleaner_events.ADDED_MEDIA_ITEMS_TO_TRASH_BATCH,
+                cleaner_events.ADDED_MEDIA_ITEMS_TO_TRASH,
+                events.FINISHED_CLEANING_ACCOUNT,
+            ],
+        )
+        self.assertEqual(
+            bob_events[4][1][1], [m1["newMediaItemResults"][0]["mediaItem"]["id"]]
+        )
+        self.assertEqual(
+            [name for name, _ in alice_events],
+            [
+                events.STARTED_CLEANING_ACCOUNT,
+                cleaner_events.FOUND_TRASH_ALBUM,
+                cleaner_events.FOUND_NUM_MEDIA_ITEMS_IN_ALBUMS,
+                cleaner_events.ADDED_MEDIA_ITEMS_TO_TRASH,
+                events.FINISHED_CLEANING_ACCOUNT,
+            ],
+        )
+
+    def test_mark_unalbumed_photos_to_trash__failed_client__cleans_other_clients(
+        self,
+    ):
+        repository = FakeItemsRepository()
+        client_1 = FakeGPhotosClient(repository, "bob@gmail.com")
+        client_2 = FakeGPhotosClient(repository, "alice@gmail.com")
+        client_2.authenticate()
+        u1 = client_2.media_items().upload_photo("A/1.jpg", "1.jpg")
+        m1 = client_2.media_items().add_uploaded_photos_to_gphotos([u1])
+        event_bus = FakeEventBus()
+
+        # Client 1 fails since it is not authenticated
+        cleaner = ShardedGPhotosCleaner([client_1, client_2], event_bus)
+        results = cleaner.mark_unalbumed_photos_to_trash()
+
+        self.assertEqual(
+            self.__get_media_item_ids_in_trash__(client_2),
+            self.__get_media_ids_from_uploaded_files__(m1),
+        )
+        self.assertEqual(list(results.account_results.keys()), ["alice@gmail.com"])
+        self.assertEqual(list(results.account_errors.keys()), ["bob@gmail.com"])
+        failed_events = [
+            e
+            for e in event_bus.get_events_emitted()
+            if e.name == events.FAILED_TO_CLEAN_ACCOUNT
+        ]
+        self.assertEqual(len(failed_events), 1)
+        self.assertEqual(failed_events[0].args[0], "bob@gmail.com")
+        self.assertEqual(
+            failed_events[0].args[1], results.account_errors["bob@gmail.com"]
+        )
+
+    def __get_media_item_ids_in_trash__(self, client):
+        albums = client.albums().list_albums()
+        trash_id = next(x["id"] for x in albums if x["title"] == "Trash")
+        media_items = client.media_items().search_for_media_items(trash_id)
+
+        return set([media_item["id"] for media_item in media_items])
+
+    def __get_media_ids_from_uploaded_files__(self, upload_results):
+        return set(
+            [
+                upload["mediaItem"]["id"]
+                for upload in upload_results["newMediaItemResults"]
+            ]
+        )
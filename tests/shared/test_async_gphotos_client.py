@@ -0,0 +1,183 @@
+import unittest
+from unittest.mock import patch
+
+from sharded_google_photos.shared.async_gphotos_client import AsyncGPhotosClient
+from sharded_google_photos.shared.blocking_gphotos_client import (
+    BlockingGPhotosClient,
+    start_event_loop_in_background,
+)
+from sharded_google_photos.shared.testing.mocked_google_apis_server import (
+    MockedGoogleApisServer,
+)
+from sharded_google_photos.shared.testing.mocked_saved_credentials_file import (
+    MockedSavedCredentialsFile,
+)
+
+MOCK_STORAGE_QUOTA_RESPONSE = {
+    "storageQuota": {
+        "limit": "1234",
+        "usage": "123",
+        "usageInDrive": "0",
+        "usageInDriveTrash": "0",
+    }
+}
+
+
+class AsyncGPhotosClientTests(unittest.IsolatedAsyncioTestCase):
+    async def test_get_storage_quota__returns_storage_quota(self):
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            client = AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            mocker.add_response(
+                "GET",
+                "https://www.googleapis.com/drive/v3/about?fields=storageQuota",
+                payload=MOCK_STORAGE_QUOTA_RESPONSE,
+            )
+
+            client.authenticate()
+            storage_quota = await client.get_storage_quota()
+            await client.close()
+
+            self.assertEqual(storage_quota, MOCK_STORAGE_QUOTA_RESPONSE["storageQuota"])
+
+    async def test_get_storage_quota__401__refreshes_token_and_retries(self):
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            client = AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            uri = "https://www.googleapis.com/drive/v3/about?fields=storageQuota"
+            mocker.add_response("GET", uri, status=401)
+            mocker.add_response("GET", uri, payload=MOCK_STORAGE_QUOTA_RESPONSE)
+
+            client.authenticate()
+
+            def refresh(request):
+                client.session.credentials.token = "5678"
+
+            with patch.object(
+                client.session.credentials, "refresh", side_effect=refresh
+            ) as mock_refresh:
+                storage_quota = await client.get_storage_quota()
+            await client.close()
+
+            mock_refresh.assert_called_once()
+            self.assertEqual(storage_quota, MOCK_STORAGE_QUOTA_RESPONSE["storageQuota"])
+            self.assertEqual(
+                mocker.requests[-1].headers["Authorization"], "Bearer 5678"
+            )
+
+    async def test_list_shared_albums__multiple_pages__returns_shared_albums_list(
+        self,
+    ):
+        albums = [
+            {"id": "1", "title": "Photos/2011"},
+            {"id": "2", "title": "Photos/2012"},
+        ]
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            client = AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            mocker.add_response(
+                "GET",
+                "https://photoslibrary.googleapis.com/v1/sharedAlbums?excludeNonAppCreatedData=False&pageSize=50",
+                payload={"sharedAlbums": [albums[0]], "nextPageToken": "a"},
+            )
+            mocker.add_response(
+                "GET",
+                "https://photoslibrary.googleapis.com/v1/sharedAlbums?excludeNonAppCreatedData=False&pageSize=50&pageToken=a",
+                payload={"sharedAlbums": [albums[1]]},
+            )
+
+            client.authenticate()
+            shared_albums = await client.albums().list_shared_albums()
+            await client.close()
+
+            self.assertEqual(shared_albums, albums)
+
+    async def test_search_for_media_items__multiple_pages__returns_media_items(self):
+        media_items = [
+            {"id": "1", "filename": "dog.jpeg"},
+            {"id": "2", "filename": "cat.jpeg"},
+        ]
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            client = AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            uri = "https://photoslibrary.googleapis.com/v1/mediaItems:search"
+            mocker.add_response(
+                "POST",
+                uri,
+                payload={"mediaItems": [media_items[0]], "nextPageToken": "a"},
+            )
+            mocker.add_response("POST", uri, payload={"mediaItems": [media_items[1]]})
+
+            client.authenticate()
+            actual_media_items = await client.media_items().search_for_media_items()
+            await client.close()
+
+            self.assertEqual(actual_media_items, media_items)
+
+    async def test_iter_media_items__multiple_pages__yields_media_items(self):
+        media_items = [
+            {"id": "1", "filename": "dog.jpeg"},
+            {"id": "2", "filename": "cat.jpeg"},
+        ]
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            client = AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            uri = "https://photoslibrary.googleapis.com/v1/mediaItems:search"
+            mocker.add_response(
+                "POST",
+                uri,
+                payload={"mediaItems": [media_items[0]], "nextPageToken": "a"},
+            )
+            mocker.add_response("POST", uri, payload={"mediaItems": [media_items[1]]})
+
+            client.authenticate()
+            actual_media_items = [
+                media_item
+                async for media_item in client.media_items().iter_media_items()
+            ]
+            await client.close()
+
+            self.assertEqual(actual_media_items, media_items)
+
+
+class BlockingGPhotosClientTests(unittest.TestCase):
+    def test_get_storage_quota__returns_storage_quota(self):
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            loop = start_event_loop_in_background()
+            client = BlockingGPhotosClient(
+                AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json"),
+                loop,
+            )
+            mocker.add_response(
+                "GET",
+                "https://www.googleapis.com/drive/v3/about?fields=storageQuota",
+                payload=MOCK_STORAGE_QUOTA_RESPONSE,
+            )
+
+            client.authenticate()
+            storage_quota = client.get_storage_quota()
+            client.close()
+            loop.call_soon_threadsafe(loop.stop)
+
+            self.assertEqual(storage_quota, MOCK_STORAGE_QUOTA_RESPONSE["storageQuota"])
+
+    def test_iter_shared_albums__stopped_early__yields_albums_from_first_page(self):
+        albums = [
+            {"id": "1", "title": "Photos/2011"},
+            {"id": "2", "title": "Photos/2012"},
+        ]
+        with MockedSavedCredentialsFile() as creds_file_path, MockedGoogleApisServer() as mocker:
+            loop = start_event_loop_in_background()
+            client = BlockingGPhotosClient(
+                AsyncGPhotosClient("bob@gmail.com", creds_file_path, "123.json"),
+                loop,
+            )
+            mocker.add_response(
+                "GET",
+                "https://photoslibrary.googleapis.com/v1/sharedAlbums?excludeNonAppCreatedData=False&pageSize=50",
+                payload={"sharedAlbums": albums, "nextPageToken": "a"},
+            )
+
+            client.authenticate()
+            shared_albums = client.albums().iter_shared_albums()
+            first_album = next(shared_albums)
+            shared_albums.close()
+            client.close()
+            loop.call_soon_threadsafe(loop.stop)
+
+            self.assertEqual(first_album, albums[0])
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+from freezegun import freeze_time
+
+from sharded_google_photos.shared.bandwidth_limiter import BandwidthLimiter
+
+
+class BandwidthLimiterTests(unittest.TestCase):
+    def test_reserve__within_limit__returns_no_wait(self):
+        with freeze_time("Jan 14th, 2020"):
+            limiter = BandwidthLimiter(100)
+
+            self.assertEqual(limiter.reserve(60), 0)
+            self.assertEqual(limiter.reserve(40), 0)
+
+    def test_reserve__over_limit__returns_time_until_bytes_are_available(self):
+        with freeze_time("Jan 14th, 2020"):
+            limiter = BandwidthLimiter(100)
+
+            self.assertEqual(limiter.reserve(100), 0)
+            self.assertEqual(limiter.reserve(50), 0.5)
+            self.assertEqual(limiter.reserve(50), 1)
+
+    def test_reserve__time_passed__refills_up_to_one_second_of_bytes(self):
+        with freeze_time("Jan 14th, 2020") as frozen_time:
+            limiter = BandwidthLimiter(100)
+            limiter.reserve(100)
+
+            frozen_time.tick(10)
+
+            self.assertEqual(limiter.reserve(100), 0)
+            self.assertEqual(limiter.reserve(100), 1)
+
+    def test_reserve__no_limit__returns_no_wait(self):
+        limiter = BandwidthLimiter(None)
+
+        self.assertEqual(limiter.reserve(10**12), 0)
+
+    def test_set_bytes_per_second__while_throttled__uses_new_limit(self):
+        with freeze_time("Jan 14th, 2020") as frozen_time:
+            limiter = BandwidthLimiter(100)
+            limiter.reserve(100)
+
+            limiter.set_bytes_per_second(10)
+            frozen_time.tick(1)
+
+            self.assertEqual(limiter.get_bytes_per_second(), 10)
+            self.assertEqual(limiter.reserve(20), 1)
+
+    def test_set_bytes_per_second__to_none__removes_limit(self):
+        with freeze_time("Jan 14th, 2020"):
+            limiter = BandwidthLimiter(100)
+            limiter.reserve(1000)
+
+            limiter.set_bytes_per_second(None)
+
+            self.assertEqual(limiter.reserve(1000), 0)
+
+    def test_set_bytes_per_second__to_zero__raises_value_error_and_keeps_limit(
+        self,
+    ):
+        limiter = BandwidthLimiter(100)
+
+        with self.assertRaises(ValueError):
+            limiter.set_bytes_per_second(0)
+
+        self.assertEqual(limiter.get_bytes_per_second(), 100)
+
+    def test_init__negative_limit__raises_value_error(self):
+        with self.assertRaises(ValueError):
+            BandwidthLimiter(-1)
+
+    def test_acquire__over_limit__sleeps(self):
+        with freeze_time("Jan 14th, 2020"), patch(
+            "sharded_google_photos.shared.bandwidth_limiter.time.sleep"
+        ) as mock_sleep:
+            limiter = BandwidthLimiter(100)
+
+            limiter.acquire(100)
+            limiter.acquire(200)
+
+            mock_sleep.assert_called_once_with(2)
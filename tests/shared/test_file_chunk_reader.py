@@ -0,0 +1,27 @@
+import tempfile
+import unittest
+
+from sharded_google_photos.shared.file_chunk_reader import FileChunkReader
+
+
+class FileChunkReaderTests(unittest.TestCase):
+    def test_read_chunk__reads_chunks_at_offsets_into_the_same_buffer(self):
+        with tempfile.NamedTemporaryFile(mode="wb") as file:
+            file.write(b"abcdefghij")
+            file.flush()
+
+            with FileChunkReader(file.name, 4) as reader:
+                chunk_1 = reader.read_chunk(0)
+                self.assertEqual(bytes(chunk_1), b"abcd")
+
+                chunk_2 = reader.read_chunk(4)
+                self.assertEqual(bytes(chunk_2), b"efgh")
+
+                chunk_3 = reader.read_chunk(8)
+                self.assertEqual(bytes(chunk_3), b"ij")
+
+                chunk_4 = reader.read_chunk(10)
+                self.assertEqual(len(chunk_4), 0)
+
+                # Chunks share one buffer, so older chunks see newer reads
+                self.assertEqual(bytes(chunk_1), b"ijgh")
@@ -48,6 +48,24 @@ class GPhotosAlbumClientTests(unittest.TestCase):
 
             self.assertEqual(shared_albums, albums)
 
+    def test_list_shared_albums__with_fields__requests_only_those_fields(self):
+        albums = [{"id": "1", "title": "Photos/2011"}]
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker:
+            client = GPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            request_mocker.get(
+                "https://photoslibrary.googleapis.com/v1/sharedAlbums",
+                json={"sharedAlbums": albums},
+            )
+
+            client.authenticate()
+            shared_albums = client.albums().list_shared_albums(fields="id,title")
+
+            self.assertEqual(shared_albums, albums)
+            self.assertEqual(
+                request_mocker.request_history[0].qs["fields"],
+                ["sharedalbums(id,title),nextpagetoken"],
+            )
+
     def test_list_albums__multiple_pages__returns_albums_list(self):
         albums = [
             {
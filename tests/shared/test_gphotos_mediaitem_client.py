@@ -1,11 +1,18 @@
+import os
 import json
 import tempfile
 import unittest
+from unittest.mock import patch
 import requests_mock
 from freezegun import freeze_time
 
 
+from sharded_google_photos.shared.bandwidth_limiter import BandwidthLimiter
 from sharded_google_photos.shared.gphotos_client import GPhotosClient
+from sharded_google_photos.shared.upload_session_journal import (
+    UploadSession,
+    UploadSessionJournal,
+)
 from sharded_google_photos.shared.testing.mocked_saved_credentials_file import (
     MockedSavedCredentialsFile,
 )
@@ -271,6 +278,43 @@ class GPhotosMediaItemClientTests(unittest.TestCase):
 
                 self.assertEqual(response, "u1")
 
+    def test_upload_photo_in_chunks__then_add_uploaded_photos__does_not_leak_upload_headers(
+        self,
+    ):
+        get_upload_link_url = "https://photoslibrary.googleapis.com/v1/uploads"
+        upload_url = "https://photoslibrary.googleapis.com/v1/upload-url/1"
+        batch_create_url = (
+            "https://photoslibrary.googleapis.com/v1/mediaItems:batchCreate"
+        )
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker:
+            request_mocker.post(
+                get_upload_link_url,
+                status_code=200,
+                headers={
+                    "X-Goog-Upload-URL": upload_url,
+                    "X-Goog-Upload-Chunk-Granularity": "234567",
+                },
+                text="",
+            )
+            request_mocker.post(upload_url, status_code=200, text="u1")
+            request_mocker.post(batch_create_url, json=MOCK_NEW_MEDIA_ITEMS_RESPONSE)
+
+            client = GPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            client.authenticate()
+            upload_token = client.media_items().upload_photo_in_chunks(
+                photo_file_path="./tests/shared/resources/small-image.jpg",
+                file_name="small-image.jpg",
+            )
+            client.media_items().add_uploaded_photos_to_gphotos([upload_token], "123")
+
+            for header in client.session.headers:
+                self.assertFalse(header.startswith("X-Goog-Upload"))
+            batch_create_req = request_mocker.request_history[-1]
+            self.assertEqual(batch_create_req.url, batch_create_url)
+            for header in batch_create_req.headers:
+                self.assertFalse(header.startswith("X-Goog-Upload"))
+            self.assertNotEqual(batch_create_req.headers["Content-Length"], "0")
+
     def test_search_for_media_items__2xx__returns_media_items(self):
         with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker:
             client = GPhotosClient("bob@gmail.com", creds_file_path, "123.json")
@@ -284,6 +328,50 @@ class GPhotosMediaItemClientTests(unittest.TestCase):
 
             self.assertEqual(response, MOCK_GET_MEDIA_ITEMS_RESPONSE["mediaItems"])
 
+    def test_iter_media_items__multiple_pages__requests_pages_of_max_size(self):
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker:
+            client = GPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            request_mocker.post(
+                "https://photoslibrary.googleapis.com/v1/mediaItems:search",
+                [
+                    {"json": {**MOCK_GET_MEDIA_ITEMS_RESPONSE, "nextPageToken": "a"}},
+                    {"json": MOCK_GET_MEDIA_ITEMS_RESPONSE},
+                ],
+            )
+
+            client.authenticate()
+            media_items = list(client.media_items().iter_media_items(album_id="123"))
+
+            self.assertEqual(
+                media_items, MOCK_GET_MEDIA_ITEMS_RESPONSE["mediaItems"] * 2
+            )
+            self.assertEqual(len(request_mocker.request_history), 2)
+            req_1 = request_mocker.request_history[0].json()
+            req_2 = request_mocker.request_history[1].json()
+            self.assertEqual(req_1["pageSize"], 100)
+            self.assertIsNone(req_1["pageToken"])
+            self.assertEqual(req_2["pageSize"], 100)
+            self.assertEqual(req_2["pageToken"], "a")
+
+    def test_search_for_media_items__with_fields__requests_only_those_fields(self):
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker:
+            client = GPhotosClient("bob@gmail.com", creds_file_path, "123.json")
+            request_mocker.post(
+                "https://photoslibrary.googleapis.com/v1/mediaItems:search",
+                json=MOCK_GET_MEDIA_ITEMS_RESPONSE,
+            )
+
+            client.authenticate()
+            client.media_items().search_for_media_items(
+                album_id="123", fields="id,filename"
+            )
+
+            req = request_mocker.request_history[0]
+            self.assertEqual(
+                req.qs["fields"], ["mediaitems(id,filename),nextpagetoken"]
+            )
+            self.assertEqual(req.json()["albumId"], "123")
+
     @freeze_time("Jan 14th, 2020", auto_tick_seconds=59.99)
     def test_search_for_media_items__first_call_returns_5xx_second_call_returns_2xx__retries_and_returns_response(
         self,
@@ -356,6 +444,44 @@ class GPhotosMediaItemClientTests(unittest.TestCase):
             )
             self.assertEqual(req_13.headers["X-Goog-Upload-Offset"], "2580237")
 
+    @freeze_time("Jan 14th, 2020")
+    def test_upload_photo_in_chunks__bandwidth_limiters__waits_for_slowest_limiter(
+        self,
+    ):
+        get_upload_link_url = "https://photoslibrary.googleapis.com/v1/uploads"
+        upload_url = "https://photoslibrary.googleapis.com/v1/upload-url/1"
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker, patch(
+            "sharded_google_photos.shared.gphotos_mediaitem_client.time.sleep"
+        ) as mock_sleep:
+            request_mocker.post(
+                get_upload_link_url,
+                status_code=200,
+                headers={
+                    "X-Goog-Upload-URL": upload_url,
+                    "X-Goog-Upload-Chunk-Granularity": "234567",
+                },
+                text="",
+            )
+            request_mocker.post(upload_url, status_code=200, text="1234-upload-token")
+            global_limiter = BandwidthLimiter(1000000)
+            account_limiter = BandwidthLimiter(2000000)
+
+            client = GPhotosClient(
+                "bob@gmail.com",
+                creds_file_path,
+                "123.json",
+                bandwidth_limiters=[global_limiter, account_limiter],
+            )
+            client.authenticate()
+            upload_token = client.media_items().upload_photo_in_chunks(
+                photo_file_path="./tests/shared/resources/small-image.jpg",
+                file_name="small-image.jpg",
+            )
+
+            self.assertEqual(upload_token, "1234-upload-token")
+            self.assertEqual(mock_sleep.call_count, 8)
+            self.assertAlmostEqual(mock_sleep.call_args.args[0], 1.622777)
+
     @freeze_time("Jan 14th, 2020", auto_tick_seconds=10000)
     def test_upload_photo_in_chunks__uploading_middle_chunk_failed__makes_api_calls_correctly_and_returns_upload_token(
         self,
@@ -443,3 +569,106 @@ class GPhotosMediaItemClientTests(unittest.TestCase):
                 req_15.headers["X-Goog-Upload-Command"], "upload, finalize"
             )
             self.assertEqual(req_15.headers["X-Goog-Upload-Offset"], "2580237")
+
+    def test_upload_photo_in_chunks__has_unfinished_upload_in_journal__resumes_upload_and_removes_it_from_journal(
+        self,
+    ):
+        get_upload_link_url = "https://photoslibrary.googleapis.com/v1/uploads"
+        upload_url = "https://photoslibrary.googleapis.com/v1/upload-url/1"
+        photo_file_path = "./tests/shared/resources/small-image.jpg"
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker, tempfile.TemporaryDirectory() as tmp_dir:
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", photo_file_path, UploadSession(upload_url, 234567)
+            )
+
+            def post_upload_url_callback(request, context):
+                context.status_code = 200
+                if request.headers["X-Goog-Upload-Command"] == "query":
+                    context.headers["X-Goog-Upload-Size-Received"] = "2345670"
+                    context.headers["X-Goog-Upload-Status"] = "active"
+                    return ""
+                return "1234-upload-token"
+
+            request_mocker.post(get_upload_link_url, status_code=500)
+            request_mocker.register_uri(
+                "POST", upload_url, text=post_upload_url_callback
+            )
+
+            client = GPhotosClient(
+                "bob@gmail.com",
+                creds_file_path,
+                "123.json",
+                upload_session_journal=journal,
+            )
+            client.authenticate()
+            upload_token = client.media_items().upload_photo_in_chunks(
+                photo_file_path=photo_file_path,
+                file_name="small-image.jpg",
+            )
+
+            self.assertEqual(upload_token, "1234-upload-token")
+            self.assertEqual(len(request_mocker.request_history), 3)
+
+            # First request is to query the unfinished upload
+            req_1 = request_mocker.request_history[0]
+            self.assertEqual(req_1.url, upload_url)
+            self.assertEqual(req_1.headers["X-Goog-Upload-Command"], "query")
+
+            # The rest of the requests upload the chunks after what was received
+            req_2 = request_mocker.request_history[1]
+            self.assertEqual(req_2.headers["X-Goog-Upload-Command"], "upload")
+            self.assertEqual(req_2.headers["X-Goog-Upload-Offset"], "2345670")
+            req_3 = request_mocker.request_history[2]
+            self.assertEqual(req_3.headers["X-Goog-Upload-Command"], "upload, finalize")
+            self.assertEqual(req_3.headers["X-Goog-Upload-Offset"], "2580237")
+
+            self.assertIsNone(journal.get_session("bob@gmail.com", photo_file_path))
+
+    def test_upload_photo_in_chunks__with_journal__saves_upload_while_uploading(
+        self,
+    ):
+        get_upload_link_url = "https://photoslibrary.googleapis.com/v1/uploads"
+        upload_url = "https://photoslibrary.googleapis.com/v1/upload-url/1"
+        photo_file_path = "./tests/shared/resources/small-image.jpg"
+        with MockedSavedCredentialsFile() as creds_file_path, requests_mock.Mocker() as request_mocker, tempfile.TemporaryDirectory() as tmp_dir:
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            request_mocker.post(
+                get_upload_link_url,
+                status_code=200,
+                headers={
+                    "X-Goog-Upload-URL": upload_url,
+                    "X-Goog-Upload-Chunk-Granularity": "234567",
+                },
+                text="",
+            )
+
+            sessions_while_uploading = []
+
+            def post_upload_url_callback(request, context):
+                sessions_while_uploading.append(
+                    journal.get_session("bob@gmail.com", photo_file_path)
+                )
+                context.status_code = 200
+                return "1234-upload-token"
+
+            request_mocker.register_uri(
+                "POST", upload_url, text=post_upload_url_callback
+            )
+
+            client = GPhotosClient(
+                "bob@gmail.com",
+                creds_file_path,
+                "123.json",
+                upload_session_journal=journal,
+            )
+            client.authenticate()
+            client.media_items().upload_photo_in_chunks(
+                photo_file_path=photo_file_path,
+                file_name="small-image.jpg",
+            )
+
+            self.assertEqual(len(sessions_while_uploading), 12)
+            for session in sessions_while_uploading:
+                self.assertEqual(session, UploadSession(upload_url, 234567))
+            self.assertIsNone(journal.get_session("bob@gmail.com", photo_file_path))
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sharded_google_photos.shared.mime_type_resolver import MimeTypeResolver
+
+
+class MimeTypeResolverTests(unittest.TestCase):
+    def test_get_mime_type__known_extension__returns_mime_type_without_sniffing(
+        self,
+    ):
+        with patch("magic.Magic") as mock_magic:
+            resolver = MimeTypeResolver()
+
+            self.assertEqual(resolver.get_mime_type("Photos/dog.JPG"), "image/jpeg")
+            self.assertEqual(
+                resolver.get_mime_type("Videos/cat.mov"), "video/quicktime"
+            )
+            mock_magic.assert_not_called()
+
+    def test_get_mime_type__unknown_extension__sniffs_file_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch(
+            "magic.Magic"
+        ) as mock_magic:
+            file_path = os.path.join(tmp_dir, "dog")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+            mock_magic.return_value.from_file.return_value = "image/png"
+            resolver = MimeTypeResolver()
+
+            self.assertEqual(resolver.get_mime_type(file_path), "image/png")
+            self.assertEqual(resolver.get_mime_type(file_path), "image/png")
+            mock_magic.assert_called_once_with(mime=True)
+            mock_magic.return_value.from_file.assert_called_once_with(file_path)
+
+    def test_get_mime_type__unknown_extension__returns_mime_type_from_libmagic(self):
+        resolver = MimeTypeResolver()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "small-image")
+            with open("./tests/shared/resources/small-image.jpg", "rb") as src:
+                with open(file_path, "wb") as dst:
+                    dst.write(src.read())
+
+            self.assertEqual(resolver.get_mime_type(file_path), "image/jpeg")
@@ -0,0 +1,78 @@
+import threading
+import unittest
+
+from sharded_google_photos.shared.page_prefetcher import (
+    async_prefetch_pages,
+    get_page_fields,
+    prefetch_pages,
+)
+
+PAGES = {
+    None: {"items": [1, 2], "nextPageToken": "a"},
+    "a": {"items": [3], "nextPageToken": "b"},
+    "b": {"items": [4]},
+}
+
+
+class GetPageFieldsTests(unittest.TestCase):
+    def test_get_page_fields__with_fields__keeps_next_page_token(self):
+        self.assertEqual(
+            get_page_fields("mediaItems", "id,filename"),
+            "mediaItems(id,filename),nextPageToken",
+        )
+
+    def test_get_page_fields__no_fields__returns_none(self):
+        self.assertIsNone(get_page_fields("mediaItems", None))
+
+
+class PrefetchPagesTests(unittest.TestCase):
+    def test_prefetch_pages__multiple_pages__yields_all_items(self):
+        items = list(prefetch_pages(PAGES.get, "items"))
+
+        self.assertEqual(items, [1, 2, 3, 4])
+
+    def test_prefetch_pages__no_items_in_page__stops(self):
+        pages = {None: {"nextPageToken": "a"}, "a": {"items": [1]}}
+
+        items = list(prefetch_pages(pages.get, "items"))
+
+        self.assertEqual(items, [])
+
+    def test_prefetch_pages__reading_first_page__fetches_next_page(self):
+        fetched_next_page = threading.Event()
+
+        def fetch_page(page_token):
+            if page_token == "a":
+                fetched_next_page.set()
+            return PAGES[page_token]
+
+        items = prefetch_pages(fetch_page, "items")
+        first_item = next(items)
+
+        self.assertEqual(first_item, 1)
+        self.assertTrue(fetched_next_page.wait(timeout=5))
+        items.close()
+
+
+class AsyncPrefetchPagesTests(unittest.IsolatedAsyncioTestCase):
+    async def test_async_prefetch_pages__multiple_pages__yields_all_items(self):
+        async def fetch_page(page_token):
+            return PAGES[page_token]
+
+        items = [item async for item in async_prefetch_pages(fetch_page, "items")]
+
+        self.assertEqual(items, [1, 2, 3, 4])
+
+    async def test_async_prefetch_pages__stopped_early__cancels_next_page(self):
+        page_tokens_fetched = []
+
+        async def fetch_page(page_token):
+            page_tokens_fetched.append(page_token)
+            return PAGES[page_token]
+
+        items = async_prefetch_pages(fetch_page, "items")
+        first_item = await items.__anext__()
+        await items.aclose()
+
+        self.assertEqual(first_item, 1)
+        self.assertEqual(page_tokens_fetched, [None])
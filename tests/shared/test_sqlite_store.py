@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from contextlib import closing
+
+from sharded_google_photos.shared.sqlite_store import connect, get_file_key
+
+
+class SqliteStoreTests(unittest.TestCase):
+    def test_connect__returns_new_connection_each_time(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_file_path = os.path.join(tmp_dir, "store.db")
+            with closing(connect(db_file_path)) as conn, conn:
+                conn.execute("CREATE TABLE items (id TEXT)")
+                conn.execute("INSERT INTO items VALUES ('1')")
+
+            with closing(connect(db_file_path)) as conn:
+                rows = conn.execute("SELECT id FROM items").fetchall()
+
+            self.assertEqual(rows, [("1",)])
+
+    def test_get_file_key__file_changed__returns_new_key(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.jpg")
+            with open(file_path, "wb") as file_obj:
+                file_obj.write(b"abc")
+            key = get_file_key(file_path)
+
+            with open(file_path, "ab") as file_obj:
+                file_obj.write(b"d")
+
+            self.assertEqual(key[0], os.path.abspath(file_path))
+            self.assertEqual(key[1], 3)
+            self.assertNotEqual(get_file_key(file_path), key)
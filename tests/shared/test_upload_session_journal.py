@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from sharded_google_photos.shared.upload_session_journal import (
+    UploadSession,
+    UploadSessionJournal,
+)
+
+
+class UploadSessionJournalTests(unittest.TestCase):
+    def test_get_session__saved_session__returns_session(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.mp4")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/1", 2)
+            )
+
+            # Reopen the journal to check that it is persisted
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            session = journal.get_session("bob@gmail.com", file_path)
+
+            self.assertEqual(session, UploadSession("http://upload/1", 2))
+
+    def test_get_session__file_changed__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.mp4")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/1", 2)
+            )
+
+            with open(file_path, "ab") as file:
+                file.write(b"5678")
+
+            self.assertIsNone(journal.get_session("bob@gmail.com", file_path))
+
+    def test_remove_session__saved_session__removes_session(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.mp4")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/1", 2)
+            )
+            journal.remove_session("bob@gmail.com", file_path)
+
+            self.assertIsNone(journal.get_session("bob@gmail.com", file_path))
+
+    def test_get_session__other_account__returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.mp4")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/1", 2)
+            )
+
+            self.assertIsNone(journal.get_session("alice@gmail.com", file_path))
+
+    def test_save_session__file_changed__drops_session_of_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1.mp4")
+            with open(file_path, "wb") as file:
+                file.write(b"1234")
+            old_stat = os.stat(file_path)
+
+            journal = UploadSessionJournal(os.path.join(tmp_dir, "journal.db"))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/1", 2)
+            )
+
+            with open(file_path, "wb") as file:
+                file.write(b"5678")
+            os.utime(file_path, ns=(old_stat.st_atime_ns, old_stat.st_mtime_ns + 1))
+            journal.save_session(
+                "bob@gmail.com", file_path, UploadSession("http://upload/2", 2)
+            )
+
+            # Put the old file back to look for its session
+            os.utime(file_path, ns=(old_stat.st_atime_ns, old_stat.st_mtime_ns))
+
+            self.assertIsNone(journal.get_session("bob@gmail.com", file_path))